@@ -2,6 +2,7 @@ import base64
 import json
 import logging
 import secrets
+import time
 from typing import Any
 
 import click
@@ -14,6 +15,7 @@ from sqlalchemy.exc import SQLAlchemyError
 from configs import dify_config
 from constants.languages import languages
 from core.plugin.entities.plugin import ToolProviderID
+from core.rag.datasource.keyword.jieba.jieba_keyword_postings import POSTINGS_DATA_SOURCE_TYPE, JiebaKeywordPostings
 from core.rag.datasource.vdb.vector_factory import Vector
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.index_processor.constant.built_in_field import BuiltInField
@@ -27,7 +29,15 @@ from libs.helper import email as email_validate
 from libs.password import hash_password, password_pattern, valid_password
 from libs.rsa import generate_key_pair
 from models import Tenant
-from models.dataset import Dataset, DatasetCollectionBinding, DatasetMetadata, DatasetMetadataBinding, DocumentSegment
+from models.dataset import (
+    Dataset,
+    DatasetCollectionBinding,
+    DatasetKeywordTable,
+    DatasetMetadata,
+    DatasetMetadataBinding,
+    DocumentSegment,
+    Embedding,
+)
 from models.dataset import Document as DatasetDocument
 from models.model import Account, App, AppAnnotationSetting, AppMode, Conversation, MessageAnnotation
 from models.provider import Provider, ProviderModel
@@ -1352,3 +1362,140 @@ def cleanup_orphaned_draft_variables(
                 continue
 
     logger.info("Cleanup completed. Total deleted: %s variables across %s apps", total_deleted, processed_apps)
+
+
+@click.command("migrate-embedding-storage-format", help="Convert pickled embedding cache rows to the compact format.")
+@click.option("--batch-size", default=1000, help="Number of embedding rows to scan per batch (default 1000)")
+@click.option("--sleep", default=0.0, help="Seconds to sleep between batches to limit database load (default 0)")
+def migrate_embedding_storage_format(batch_size: int, sleep: float):
+    """
+    Re-encode legacy pickled rows in the embeddings table using the compact binary format.
+
+    Rows are scanned by primary key so the command can be interrupted and re-run safely
+    while the application keeps serving traffic; already converted rows are skipped.
+    """
+    click.echo(click.style("Start migrating embedding storage format.", fg="green"))
+    last_id: str | None = None
+    scanned_count = 0
+    migrated_count = 0
+    start_at = time.perf_counter()
+    while True:
+        stmt = select(Embedding.id, Embedding.embedding).order_by(Embedding.id).limit(batch_size)
+        if last_id is not None:
+            stmt = stmt.where(Embedding.id > last_id)
+        rows = db.session.execute(stmt).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        scanned_count += len(rows)
+
+        updates = []
+        for row in rows:
+            if Embedding.is_compact_format(row.embedding):
+                continue
+            try:
+                legacy = Embedding(embedding=row.embedding)
+                updates.append({"id": row.id, "embedding": Embedding.encode_embedding(legacy.get_embedding())})
+            except Exception:
+                logger.exception("Failed to decode embedding %s", row.id)
+        if updates:
+            db.session.execute(sa.update(Embedding), updates)
+        db.session.commit()
+        migrated_count += len(updates)
+        click.echo(f"Scanned {scanned_count} embeddings, migrated {migrated_count}.")
+        if sleep:
+            time.sleep(sleep)
+
+    click.echo(
+        click.style(
+            f"Embedding storage format migration completed. Migrated {migrated_count} of {scanned_count} "
+            f"embeddings in {time.perf_counter() - start_at:.2f}s.",
+            fg="green",
+        )
+    )
+
+
+@click.command("migrate-keyword-tables-to-postings", help="Move Jieba keyword tables to the sharded postings store.")
+@click.option("--batch-size", default=100, help="Number of keyword tables to scan per batch (default 100)")
+@click.option("--sleep", default=0.0, help="Seconds to sleep between batches to limit database load (default 0)")
+def migrate_keyword_tables_to_postings(batch_size: int, sleep: float):
+    """
+    Copy the JSON keyword tables, stored in the database or in files, to the keyword postings table
+    and switch their datasets to the sharded data source type.
+
+    Each table is migrated under the keyword indexing lock of its dataset, so it is not written meanwhile.
+    Tables are scanned by primary key and migrated ones are skipped, so the command can be interrupted
+    and re-run safely.
+    """
+    click.echo(click.style("Start migrating keyword tables to postings.", fg="green"))
+    last_id: str | None = None
+    migrated_count = 0
+    failed_count = 0
+    start_at = time.perf_counter()
+    while True:
+        stmt = (
+            select(DatasetKeywordTable.id, DatasetKeywordTable.dataset_id)
+            .where(DatasetKeywordTable.data_source_type != POSTINGS_DATA_SOURCE_TYPE)
+            .order_by(DatasetKeywordTable.id)
+            .limit(batch_size)
+        )
+        if last_id is not None:
+            stmt = stmt.where(DatasetKeywordTable.id > last_id)
+        rows = db.session.execute(stmt).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        for row in rows:
+            try:
+                with redis_client.lock(f"keyword_indexing_lock_{row.dataset_id}", timeout=600):
+                    postings_count = _migrate_keyword_table_to_postings(row.id)
+                if postings_count is not None:
+                    migrated_count += 1
+                    click.echo(f"Migrated {postings_count} keyword postings of dataset {row.dataset_id}.")
+            except Exception:
+                db.session.rollback()
+                failed_count += 1
+                logger.exception("Failed to migrate the keyword table of dataset %s", row.dataset_id)
+        if sleep:
+            time.sleep(sleep)
+
+    click.echo(
+        click.style(
+            f"Keyword table migration completed. Migrated {migrated_count} keyword tables, {failed_count} failed, "
+            f"in {time.perf_counter() - start_at:.2f}s.",
+            fg="green",
+        )
+    )
+
+
+def _migrate_keyword_table_to_postings(keyword_table_id: str) -> int | None:
+    """Migrate one keyword table, returning the number of postings or None if it is not to be migrated."""
+    db.session.expire_all()
+    keyword_table = db.session.get(DatasetKeywordTable, keyword_table_id)
+    if keyword_table is None or keyword_table.data_source_type == POSTINGS_DATA_SOURCE_TYPE:
+        return None
+    dataset = db.session.get(Dataset, keyword_table.dataset_id)
+    if dataset is None:
+        return None
+
+    keyword_table_dict = keyword_table.keyword_table_dict
+    table = keyword_table_dict["__data__"]["table"] if keyword_table_dict else {}
+    entries = [(node_id, [keyword]) for keyword, node_ids in table.items() for node_id in node_ids]
+    postings = JiebaKeywordPostings(dataset.id)
+    # postings left by an interrupted run are written again
+    postings.delete_all()
+    for i in range(0, len(entries), 10000):
+        postings.add(entries[i : i + 10000])
+
+    previous_data_source_type = keyword_table.data_source_type
+    keyword_table.data_source_type = POSTINGS_DATA_SOURCE_TYPE
+    keyword_table.keyword_table = ""
+    db.session.commit()
+    if previous_data_source_type != "database":
+        file_key = "keyword_files/" + dataset.tenant_id + "/" + dataset.id + ".txt"
+        try:
+            storage.delete(file_key)
+        except Exception:
+            logger.exception("Failed to delete keyword table file %s", file_key)
+    return len(entries)
@@ -5,6 +5,7 @@ from pydantic import (
     Field,
     HttpUrl,
     NegativeInt,
+    NonNegativeFloat,
     NonNegativeInt,
     PositiveFloat,
     PositiveInt,
@@ -80,6 +81,35 @@ class AppExecutionConfig(BaseSettings):
         description="Maximum number of requests per app per day",
         default=5000,
     )
+    APP_STOP_FLAG_CHECK_INTERVAL: PositiveInt = Field(
+        description="Interval in seconds at which running tasks also read their stop flag from Redis,"
+        " as a fallback for stop signals missed by the pub/sub subscription",
+        default=10,
+    )
+
+
+class AppStatisticsConfig(BaseSettings):
+    """
+    Configuration for the daily statistics of applications
+    """
+
+    APP_STATISTICS_ROLLUP_ENABLED: bool = Field(
+        description="Serve the daily statistics of past days from the app_daily_statistics rollup table"
+        " instead of aggregating the messages of the whole requested range",
+        default=True,
+    )
+
+    APP_STATISTICS_ROLLUP_SETTLE_HOURS: NonNegativeInt = Field(
+        description="Hours after the end of a day before its statistics are rolled up, so that late messages"
+        " and feedbacks of that day are counted",
+        default=24,
+    )
+
+    APP_STATISTICS_ROLLUP_TASK_DAYS: PositiveInt = Field(
+        description="Maximum number of missing days the rollup task precomputes per run for each app and timezone"
+        " whose statistics are viewed, the most recent first, so older history is backfilled over several runs",
+        default=90,
+    )
 
 
 class CodeExecutionSandboxConfig(BaseSettings):
@@ -168,6 +198,22 @@ class PluginConfig(BaseSettings):
         default="plugin-api-key",
     )
 
+    PLUGIN_DAEMON_POOL_MAXSIZE: PositiveInt = Field(
+        description="Maximum number of keep-alive connections kept open to the plugin daemon per process",
+        default=100,
+    )
+
+    PLUGIN_DAEMON_CONNECT_TIMEOUT: PositiveFloat = Field(
+        description="Timeout in seconds for connecting to the plugin daemon",
+        default=10.0,
+    )
+
+    PLUGIN_DAEMON_READ_TIMEOUT: PositiveFloat | None = Field(
+        description="Timeout in seconds between two reads of a plugin daemon response, unlimited if not set,"
+        " it also bounds the pauses of streamed responses",
+        default=None,
+    )
+
     INNER_API_KEY_FOR_PLUGIN: str = Field(description="Inner api key for plugin", default="inner-api-key")
 
     PLUGIN_REMOTE_INSTALL_HOST: str = Field(
@@ -403,6 +449,26 @@ class HttpConfig(BaseSettings):
         default=5,
     )
 
+    SSRF_POOL_MAX_CONNECTIONS: PositiveInt = Field(
+        description="Maximum number of concurrent connections of the shared SSRF proxy client pool",
+        default=100,
+    )
+
+    SSRF_POOL_MAX_KEEPALIVE_CONNECTIONS: NonNegativeInt = Field(
+        description="Maximum number of idle keep-alive connections kept by the shared SSRF proxy client pool",
+        default=20,
+    )
+
+    SSRF_POOL_KEEPALIVE_EXPIRY: NonNegativeFloat = Field(
+        description="Seconds after which an idle keep-alive connection of the SSRF proxy client pool is closed",
+        default=5.0,
+    )
+
+    SSRF_POOL_HTTP2_ENABLED: bool = Field(
+        description="Enable HTTP/2 for the shared SSRF proxy client pool, requires the h2 package",
+        default=False,
+    )
+
     RESPECT_XFORWARD_HEADERS_ENABLED: bool = Field(
         description="Enable handling of X-Forwarded-For, X-Forwarded-Proto, and X-Forwarded-Port headers"
         " when the app is behind a single trusted reverse proxy.",
@@ -546,9 +612,59 @@ class WorkflowNodeExecutionConfig(BaseSettings):
         default=100,
     )
 
+    GRAPH_ENGINE_MAX_WORKERS: PositiveInt = Field(
+        description="Number of threads shared by all workflow runs for parallel branch and iteration execution",
+        default=100,
+    )
+
+    GRAPH_ENGINE_MAX_QUEUE_SIZE: PositiveInt = Field(
+        description="Maximum number of parallel tasks waiting for a shared thread; beyond it, tasks run in their"
+        " caller's thread",
+        default=1000,
+    )
+
+    GRAPH_ENGINE_MAX_WORKERS_PER_RUN: PositiveInt = Field(
+        description="Maximum number of shared threads a single workflow run may use at once",
+        default=10,
+    )
+
     WORKFLOW_NODE_EXECUTION_STORAGE: str = Field(
         default="rdbms",
-        description="Storage backend for WorkflowNodeExecution. Options: 'rdbms', 'hybrid'",
+        description="Storage backend for WorkflowNodeExecution. Options: 'rdbms', 'hybrid'."
+        " 'hybrid' writes large inputs, process data and outputs compressed to the storage instead of the database",
+    )
+
+    WORKFLOW_NODE_EXECUTION_OFFLOAD_THRESHOLD: NonNegativeInt = Field(
+        description="Size in bytes above which a node execution payload is written to the storage in the 'hybrid'"
+        " storage mode",
+        default=64 * 1024,
+    )
+
+    WORKFLOW_NODE_EXECUTION_PREVIEW_LENGTH: NonNegativeInt = Field(
+        description="Number of characters of an offloaded node execution payload kept in the database as a preview",
+        default=1024,
+    )
+
+    WORKFLOW_NODE_EXECUTION_WRITE_BATCH_SIZE: PositiveInt = Field(
+        description="Maximum number of node executions upserted in one statement by the write-behind repository",
+        default=100,
+    )
+
+    WORKFLOW_NODE_EXECUTION_WRITE_INTERVAL: PositiveFloat = Field(
+        description="Seconds the write-behind repository waits to collect node execution updates before writing"
+        " a batch that is not full",
+        default=0.2,
+    )
+
+    WORKFLOW_NODE_EXECUTION_WRITE_MAX_PENDING: PositiveInt = Field(
+        description="Maximum number of node executions waiting to be written by the write-behind repository,"
+        " saves block when it is reached",
+        default=10000,
+    )
+
+    WORKFLOW_NODE_EXECUTION_FLUSH_TIMEOUT: PositiveFloat = Field(
+        description="Maximum seconds a finishing workflow run waits for its node executions to be written",
+        default=30.0,
     )
 
 
@@ -569,7 +685,9 @@ class RepositoryConfig(BaseSettings):
         "'core.repositories.sqlalchemy_workflow_node_execution_repository."
         "SQLAlchemyWorkflowNodeExecutionRepository' (default), "
         "'core.repositories.celery_workflow_node_execution_repository."
-        "CeleryWorkflowNodeExecutionRepository'",
+        "CeleryWorkflowNodeExecutionRepository', "
+        "'core.repositories.write_behind_workflow_node_execution_repository."
+        "WriteBehindWorkflowNodeExecutionRepository'",
         default="core.repositories.sqlalchemy_workflow_node_execution_repository.SQLAlchemyWorkflowNodeExecutionRepository",
     )
 
@@ -752,7 +870,7 @@ class RagEtlConfig(BaseSettings):
 
     KEYWORD_DATA_SOURCE_TYPE: str = Field(
         description="Data source type for keyword extraction"
-        " ('database' or other supported types), default to 'database'",
+        " ('database', 'sharded' for a per-keyword postings table, or other supported types), default to 'database'",
         default="database",
     )
 
@@ -807,6 +925,16 @@ class DataSetConfig(BaseSettings):
         default=30,
     )
 
+    CLEAN_MESSAGES_BATCH_SIZE: PositiveInt = Field(
+        description="Number of expired messages scanned and deleted per batch by the message cleanup task",
+        default=1000,
+    )
+
+    CLEAN_MESSAGES_BATCH_INTERVAL: NonNegativeFloat = Field(
+        description="Seconds to sleep between two batches of the message cleanup task, to throttle database load",
+        default=0.0,
+    )
+
     DSL_EXPORT_ENCRYPT_DATASET_ID: bool = Field(
         description="Enable or disable dataset ID encryption when exporting DSL files",
         default=True,
@@ -839,6 +967,64 @@ class IndexingConfig(BaseSettings):
         default=50,
     )
 
+    EMBEDDING_CACHE_LOOKUP_BATCH_SIZE: PositiveInt = Field(
+        description="Number of text hashes looked up per query against the document embedding cache",
+        default=1000,
+    )
+
+    EMBEDDING_CACHE_STORAGE_DTYPE: Literal["float32", "float16"] = Field(
+        description="Element type used to store cached document embeddings ('float32' or 'float16')",
+        default="float32",
+    )
+
+    EMBEDDING_QUERY_CACHE_TTL: PositiveInt = Field(
+        description="Time-to-live in seconds for query embeddings cached in Redis",
+        default=600,
+    )
+
+    EMBEDDING_QUERY_CACHE_LOCAL_SIZE: NonNegativeInt = Field(
+        description="Maximum number of query embeddings kept in the in-process cache, 0 to disable it",
+        default=1024,
+    )
+
+    EMBEDDING_QUERY_CACHE_LOCAL_TTL: PositiveInt = Field(
+        description="Time-to-live in seconds for query embeddings kept in the in-process cache",
+        default=60,
+    )
+
+    INDEXING_PIPELINE_ENABLED: bool = Field(
+        description="Split, embed and store document pages as a stream instead of one whole-document phase after"
+        " another (paragraph and paragraph-mode parent-child documents only)",
+        default=False,
+    )
+
+    INDEXING_PIPELINE_BATCH_SIZE: PositiveInt = Field(
+        description="Number of segments embedded and written to the index per batch by the indexing pipeline",
+        default=100,
+    )
+
+    INDEXING_PIPELINE_WORKERS: PositiveInt = Field(
+        description="Number of threads embedding and writing segment batches per document in the indexing pipeline",
+        default=10,
+    )
+
+    INDEXING_PIPELINE_MAX_PENDING_BATCHES: PositiveInt = Field(
+        description="Maximum number of batches waiting for each indexing pipeline thread before splitting pauses",
+        default=2,
+    )
+
+    VECTOR_CREATE_PIPELINE_DEPTH: NonNegativeInt = Field(
+        description="Number of batches embedded ahead of the batch being written to the vector store when creating"
+        " an index, 0 to embed and write batches one after another",
+        default=1,
+    )
+
+    VECTOR_CREATE_EMBEDDING_CONCURRENCY_PER_PROVIDER: PositiveInt = Field(
+        description="Maximum number of embedding batches of index creations requested concurrently to the same model"
+        " provider in a process",
+        default=8,
+    )
+
 
 class MultiModalTransferConfig(BaseSettings):
     MULTIMODAL_SEND_FORMAT: Literal["base64", "url"] = Field(
@@ -887,6 +1073,10 @@ class CeleryScheduleTasksConfig(BaseSettings):
         description="Enable check upgradable plugin task",
         default=True,
     )
+    ENABLE_APP_STATISTICS_ROLLUP_TASK: bool = Field(
+        description="Enable app daily statistics rollup task",
+        default=True,
+    )
 
 
 class PositionConfig(BaseSettings):
@@ -990,6 +1180,9 @@ class WorkflowLogConfig(BaseSettings):
     WORKFLOW_LOG_CLEANUP_BATCH_SIZE: int = Field(
         default=100, description="Batch size for workflow run log cleanup operations"
     )
+    WORKFLOW_LOG_CLEANUP_BATCH_INTERVAL: float = Field(
+        default=0.0, description="Seconds to sleep between batches of workflow run log cleanup operations"
+    )
 
 
 class SwaggerUIConfig(BaseSettings):
@@ -1007,6 +1200,7 @@ class SwaggerUIConfig(BaseSettings):
 class FeatureConfig(
     # place the configs in alphabet order
     AppExecutionConfig,
+    AppStatisticsConfig,
     AuthConfig,  # Changed from OAuthConfig to AuthConfig
     BillingConfig,
     CodeExecutionSandboxConfig,
@@ -94,6 +94,17 @@ class VectorStoreConfig(BaseSettings):
         default="Vector_index",
     )
 
+    VECTOR_STORE_POOL_TIMEOUT: PositiveFloat = Field(
+        description="Maximum seconds to wait for a free connection of a shared SQL vector store connection pool",
+        default=30.0,
+    )
+
+    VECTOR_STORE_POOL_HEALTH_CHECK_INTERVAL: NonNegativeFloat = Field(
+        description="Seconds a pooled SQL vector store connection may stay idle before it is checked with a ping"
+        " on checkout, 0 to check it every time",
+        default=60.0,
+    )
+
 
 class KeywordStoreConfig(BaseSettings):
     KEYWORD_STORE: str = Field(
@@ -187,9 +198,21 @@ class DatabaseConfig(BaseSettings):
         default=False,
     )
 
-    RETRIEVAL_SERVICE_EXECUTORS: NonNegativeInt = Field(
-        description="Number of processes for the retrieval service, default to CPU cores.",
-        default=os.cpu_count() or 1,
+    RETRIEVAL_SEARCH_EXECUTORS: PositiveInt = Field(
+        description="Number of threads shared by all requests for running the searches of the datasets in parallel,"
+        " each retrieval runs one search per dataset and retrieval method, so it is sized above the dataset pool.",
+        default=64,
+    )
+
+    RETRIEVAL_DATASET_EXECUTORS: PositiveInt = Field(
+        description="Number of threads shared by all requests for retrieving from multiple datasets in parallel.",
+        default=32,
+    )
+
+    RETRIEVAL_EXECUTOR_MAX_TASKS_PER_TENANT: PositiveInt = Field(
+        description="Maximum number of retrieval tasks a single tenant may have queued or running"
+        " in each shared retrieval thread pool.",
+        default=16,
     )
 
     @computed_field  # type: ignore[misc]
@@ -46,3 +46,17 @@ class PGVectorConfig(BaseSettings):
         description="Whether to use pg_bigm module for full text search",
         default=False,
     )
+
+    PGVECTOR_HNSW_EF_SEARCH: PositiveInt | None = Field(
+        description="Size of the candidate list of HNSW searches (hnsw.ef_search), higher values improve recall"
+        " at the cost of speed. Can be overridden per dataset with 'hnsw_ef_search' in its index struct."
+        " Uses the server setting if not set.",
+        default=None,
+    )
+
+    PGVECTOR_IVFFLAT_PROBES: PositiveInt | None = Field(
+        description="Number of lists probed by IVFFlat searches (ivfflat.probes)."
+        " Can be overridden per dataset with 'ivfflat_probes' in its index struct."
+        " Uses the server setting if not set.",
+        default=None,
+    )
@@ -3,6 +3,7 @@ from typing import cast
 from flask_login import current_user
 from flask_restx import Resource, marshal_with, reqparse
 from flask_restx.inputs import int_range
+from werkzeug.exceptions import NotFound
 
 from controllers.console import api, console_ns
 from controllers.console.app.wraps import get_app_model
@@ -10,6 +11,7 @@ from controllers.console.wraps import account_initialization_required, setup_req
 from fields.workflow_run_fields import (
     advanced_chat_workflow_run_pagination_fields,
     workflow_run_detail_fields,
+    workflow_run_node_execution_fields,
     workflow_run_node_execution_list_fields,
     workflow_run_pagination_fields,
 )
@@ -124,3 +126,29 @@ class WorkflowRunNodeExecutionListApi(Resource):
         )
 
         return {"data": node_executions}
+
+
+@console_ns.route("/apps/<uuid:app_id>/workflow-runs/<uuid:run_id>/node-executions/<uuid:node_execution_id>")
+class WorkflowRunNodeExecutionApi(Resource):
+    @api.doc("get_workflow_run_node_execution")
+    @api.doc(description="Get workflow run node execution detail, with its full inputs, process data and outputs")
+    @api.doc(params={"app_id": "Application ID", "run_id": "Workflow run ID", "node_execution_id": "Node execution ID"})
+    @api.response(200, "Node execution retrieved successfully", workflow_run_node_execution_fields)
+    @api.response(404, "Node execution not found")
+    @setup_required
+    @login_required
+    @account_initialization_required
+    @get_app_model(mode=[AppMode.ADVANCED_CHAT, AppMode.WORKFLOW])
+    @marshal_with(workflow_run_node_execution_fields)
+    def get(self, app_model: App, run_id, node_execution_id):
+        """
+        Get workflow run node execution detail
+        """
+        node_execution = WorkflowRunService().get_workflow_run_node_execution(
+            app_model=app_model,
+            run_id=str(run_id),
+            node_execution_id=str(node_execution_id),
+        )
+        if node_execution is None:
+            raise NotFound("Node execution not found")
+        return node_execution
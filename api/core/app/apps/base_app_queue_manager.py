@@ -1,4 +1,5 @@
 import queue
+import threading
 import time
 from abc import abstractmethod
 from enum import IntEnum, auto
@@ -7,6 +8,7 @@ from typing import Any
 from sqlalchemy.orm import DeclarativeMeta
 
 from configs import dify_config
+from core.app.apps.task_stop_signal import task_stop_signal_listener
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.entities.queue_entities import (
     AppQueueEvent,
@@ -18,6 +20,8 @@ from core.app.entities.queue_entities import (
 )
 from extensions.ext_redis import redis_client
 
+PING_INTERVAL = 10
+
 
 class PublishFrom(IntEnum):
     APPLICATION_MANAGER = auto()
@@ -42,6 +46,9 @@ class AppQueueManager:
         q: queue.Queue[WorkflowQueueMessage | MessageQueueMessage | None] = queue.Queue()
 
         self._q = q
+        self._stopped = threading.Event()
+        self._last_stop_flag_check_time = time.time()
+        task_stop_signal_listener.register(self._task_id, self._on_stop_signal)
 
     def listen(self):
         """
@@ -52,27 +59,33 @@ class AppQueueManager:
         listen_timeout = dify_config.APP_MAX_EXECUTION_TIME
         start_time = time.time()
         last_ping_time: int | float = 0
-        while True:
-            try:
-                message = self._q.get(timeout=1)
-                if message is None:
-                    break
-
-                yield message
-            except queue.Empty:
-                continue
-            finally:
+        try:
+            while True:
+                # stop signals are published to the queue, so only wake up for the next ping or the timeout
                 elapsed_time = time.time() - start_time
-                if elapsed_time >= listen_timeout or self._is_stopped():
-                    # publish two messages to make sure the client can receive the stop signal
-                    # and stop listening after the stop signal processed
-                    self.publish(
-                        QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL), PublishFrom.TASK_PIPELINE
-                    )
-
-                if elapsed_time // 10 > last_ping_time:
-                    self.publish(QueuePingEvent(), PublishFrom.TASK_PIPELINE)
-                    last_ping_time = elapsed_time // 10
+                wait_time = min(PING_INTERVAL - elapsed_time % PING_INTERVAL, listen_timeout - elapsed_time)
+                try:
+                    message = self._q.get(timeout=max(wait_time, 0.1))
+                    if message is None:
+                        break
+
+                    yield message
+                except queue.Empty:
+                    continue
+                finally:
+                    elapsed_time = time.time() - start_time
+                    if elapsed_time >= listen_timeout or self._is_stopped():
+                        # publish two messages to make sure the client can receive the stop signal
+                        # and stop listening after the stop signal processed
+                        self.publish(
+                            QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL), PublishFrom.TASK_PIPELINE
+                        )
+
+                    if elapsed_time // PING_INTERVAL > last_ping_time:
+                        self.publish(QueuePingEvent(), PublishFrom.TASK_PIPELINE)
+                        last_ping_time = elapsed_time // PING_INTERVAL
+        finally:
+            task_stop_signal_listener.unregister(self._task_id)
 
     def stop_listen(self):
         """
@@ -126,15 +139,36 @@ class AppQueueManager:
 
         stopped_cache_key = cls._generate_stopped_cache_key(task_id)
         redis_client.setex(stopped_cache_key, 600, 1)
+        task_stop_signal_listener.publish(task_id)
+
+    def _on_stop_signal(self):
+        """
+        Handle the stop signal received by the process-wide subscription
+        :return:
+        """
+        self._stopped.set()
+        self.publish(QueueStopEvent(stopped_by=QueueStopEvent.StopBy.USER_MANUAL), PublishFrom.TASK_PIPELINE)
 
     def _is_stopped(self) -> bool:
         """
         Check if task is stopped
         :return:
         """
+        if self._stopped.is_set():
+            return True
+
+        # the stop flag is only read from Redis now and then, to catch signals the subscription missed
+        now = time.time()
+        if task_stop_signal_listener.subscribed and now - self._last_stop_flag_check_time < (
+            dify_config.APP_STOP_FLAG_CHECK_INTERVAL
+        ):
+            return False
+        self._last_stop_flag_check_time = now
+
         stopped_cache_key = AppQueueManager._generate_stopped_cache_key(self._task_id)
         result = redis_client.get(stopped_cache_key)
         if result is not None:
+            self._stopped.set()
             return True
 
         return False
@@ -0,0 +1,88 @@
+import logging
+import threading
+import time
+import weakref
+from collections.abc import Callable
+
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+TASK_STOP_CHANNEL = "generate_task_stopped"
+
+
+class TaskStopSignalListener:
+    """
+    Process-wide Redis pub/sub subscription delivering task stop signals to the tasks running in this process.
+
+    A single background thread holds the subscription, so waiting tasks neither poll Redis nor wake up
+    periodically to find out that they have been stopped.
+    """
+
+    def __init__(self, channel: str = TASK_STOP_CHANNEL):
+        self._channel = channel
+        self._lock = threading.Lock()
+        self._callbacks: dict[str, weakref.WeakMethod] = {}
+        self._thread: threading.Thread | None = None
+        self._subscribed = threading.Event()
+
+    @property
+    def subscribed(self) -> bool:
+        return self._subscribed.is_set()
+
+    def register(self, task_id: str, callback: Callable[[], None]):
+        """
+        Call the bound method `callback` when a stop signal for the task is received.
+
+        Only a weak reference to the callback's owner is kept, so forgotten tasks are not kept alive.
+        """
+        with self._lock:
+            self._callbacks[task_id] = weakref.WeakMethod(callback)  # type: ignore[arg-type]
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="task_stop_signal_listener", daemon=True)
+                self._thread.start()
+
+    def unregister(self, task_id: str):
+        with self._lock:
+            self._callbacks.pop(task_id, None)
+
+    def publish(self, task_id: str):
+        redis_client.publish(self._channel, task_id)
+
+    def _dispatch(self, task_id: str):
+        with self._lock:
+            ref = self._callbacks.pop(task_id, None)
+        callback = ref() if ref is not None else None
+        if callback is None:
+            return
+        try:
+            callback()
+        except Exception:
+            logger.exception("Failed to deliver stop signal of task %s", task_id)
+
+    def _run(self):
+        backoff = 1
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self._channel)
+                self._subscribed.set()
+                backoff = 1
+                for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    data = message["data"]
+                    self._dispatch(data.decode("utf-8") if isinstance(data, bytes) else str(data))
+            except Exception:
+                logger.exception("Task stop signal subscription failed, reconnecting in %ss", backoff)
+            finally:
+                self._subscribed.clear()
+                try:
+                    pubsub.close()
+                except Exception:
+                    logger.debug("Failed to close task stop signal subscription", exc_info=True)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+
+task_stop_signal_listener = TaskStopSignalListener()
@@ -6,17 +6,43 @@ from datetime import timedelta
 from typing import Any, Union
 
 from core.errors.error import AppInvokeQuotaExceededError
-from extensions.ext_redis import redis_client
+from extensions.ext_redis import RedisScript, redis_client
 
 logger = logging.getLogger(__name__)
 
 
+# Admits a request if fewer than the max active requests are in the sorted set of active requests scored by their
+# expiry, so that checking the limit and recording the request is one atomic round trip. Expired requests, never
+# exited because of a crash, are dropped first.
+_ENTER_SCRIPT = RedisScript("""
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + tonumber(ARGV[4]), ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+""")
+
+# Stores the local max active requests if asked to or if none is stored, returns the stored one otherwise.
+_FLUSH_MAX_ACTIVE_REQUESTS_SCRIPT = RedisScript("""
+if ARGV[2] == '1' or redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+    return ARGV[1]
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return redis.call('GET', KEYS[1])
+""")
+
+
 class RateLimit:
     _MAX_ACTIVE_REQUESTS_KEY = "dify:rate_limit:{}:max_active_requests"
-    _ACTIVE_REQUESTS_KEY = "dify:rate_limit:{}:active_requests"
+    _ACTIVE_REQUESTS_KEY = "dify:rate_limit:{}:active_requests_by_expiry"
     _UNLIMITED_REQUEST_ID = "unlimited_request_id"
     _REQUEST_MAX_ALIVE_TIME = 10 * 60  # 10 minutes
-    _ACTIVE_REQUESTS_COUNT_FLUSH_INTERVAL = 5 * 60  # recalculate request_count from request_detail every 5 minutes
+    _MAX_ACTIVE_REQUESTS_FLUSH_INTERVAL = 5 * 60  # sync max_active_requests with redis every 5 minutes
+    _MAX_ACTIVE_REQUESTS_TTL = int(timedelta(days=1).total_seconds())
     _instance_dict: dict[str, "RateLimit"] = {}
 
     def __new__(cls, client_id: str, max_active_requests: int):
@@ -43,47 +69,38 @@ class RateLimit:
         if self.disabled():
             return
         self.last_recalculate_time = time.time()
-        # flush max active requests
-        if use_local_value or not redis_client.exists(self.max_active_requests_key):
-            redis_client.setex(self.max_active_requests_key, timedelta(days=1), self.max_active_requests)
-        else:
-            self.max_active_requests = int(redis_client.get(self.max_active_requests_key).decode("utf-8"))
-            redis_client.expire(self.max_active_requests_key, timedelta(days=1))
-
-        # flush max active requests (in-transit request list)
-        if not redis_client.exists(self.active_requests_key):
-            return
-        request_details = redis_client.hgetall(self.active_requests_key)
-        redis_client.expire(self.active_requests_key, timedelta(days=1))
-        timeout_requests = [
-            k
-            for k, v in request_details.items()
-            if time.time() - float(v.decode("utf-8")) > RateLimit._REQUEST_MAX_ALIVE_TIME
-        ]
-        if timeout_requests:
-            redis_client.hdel(self.active_requests_key, *timeout_requests)
+        # timed out requests are dropped on enter, only max active requests needs to be synced
+        max_active_requests = _FLUSH_MAX_ACTIVE_REQUESTS_SCRIPT(
+            redis_client,
+            keys=[self.max_active_requests_key],
+            args=[self.max_active_requests, int(use_local_value), self._MAX_ACTIVE_REQUESTS_TTL],
+        )
+        self.max_active_requests = int(max_active_requests)
 
     def enter(self, request_id: str | None = None) -> str:
         if self.disabled():
             return RateLimit._UNLIMITED_REQUEST_ID
-        if time.time() - self.last_recalculate_time > RateLimit._ACTIVE_REQUESTS_COUNT_FLUSH_INTERVAL:
+        if time.time() - self.last_recalculate_time > RateLimit._MAX_ACTIVE_REQUESTS_FLUSH_INTERVAL:
             self.flush_cache()
         if not request_id:
             request_id = RateLimit.gen_request_key()
 
-        active_requests_count = redis_client.hlen(self.active_requests_key)
-        if active_requests_count >= self.max_active_requests:
+        admitted = _ENTER_SCRIPT(
+            redis_client,
+            keys=[self.active_requests_key],
+            args=[time.time(), request_id, self.max_active_requests, RateLimit._REQUEST_MAX_ALIVE_TIME],
+        )
+        if not admitted:
             raise AppInvokeQuotaExceededError(
                 f"Too many requests. Please try again later. The current maximum concurrent requests allowed "
                 f"for {self.client_id} is {self.max_active_requests}."
             )
-        redis_client.hset(self.active_requests_key, request_id, str(time.time()))
         return request_id
 
     def exit(self, request_id: str):
         if request_id == RateLimit._UNLIMITED_REQUEST_ID:
             return
-        redis_client.hdel(self.active_requests_key, request_id)
+        redis_client.zrem(self.active_requests_key, request_id)
 
     def disabled(self):
         return self.max_active_requests <= 0
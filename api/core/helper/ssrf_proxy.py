@@ -2,8 +2,13 @@
 Proxy requests to avoid SSRF
 """
 
+import atexit
+import http.cookiejar
 import logging
+import os
+import threading
 import time
+from typing import Any
 
 import httpx
 
@@ -36,7 +41,149 @@ class MaxRetriesExceededError(ValueError):
     pass
 
 
-def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+class _RejectCookiePolicy(http.cookiejar.DefaultCookiePolicy):
+    """Cookie policy never storing the cookies set by responses."""
+
+    def set_ok(self, cookie: http.cookiejar.Cookie, request: Any) -> bool:
+        return False
+
+
+class SSRFProxyClientPool:
+    """
+    Process-wide pooled httpx clients, one per proxy and SSL verification configuration.
+
+    Connections to the proxy are kept alive and reused across requests instead of paying a new
+    TCP and TLS handshake per request. Clients are recreated after a fork.
+
+    The clients are shared by all tenants, so they never store the cookies set by responses: a
+    cookie received by a request would otherwise be sent on the next requests to the same host.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._clients: dict[tuple, httpx.Client] = {}
+        self._requests = 0
+        self._active_requests = 0
+        self._failed_requests = 0
+        self._retries = 0
+
+    def get_client(self, ssl_verify: bool) -> httpx.Client:
+        key = self._client_key(ssl_verify)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            self._reset_after_fork()
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = httpx.Client(**self._client_kwargs(ssl_verify))
+        return client
+
+    def record_request(self, started: bool = False, finished: bool = False, failed: bool = False, retry: bool = False):
+        with self._lock:
+            if started:
+                self._requests += 1
+                self._active_requests += 1
+            if finished:
+                self._active_requests -= 1
+            if failed:
+                self._failed_requests += 1
+            if retry:
+                self._retries += 1
+
+    def stats(self) -> dict[str, int]:
+        """Request counters and utilization of the connections of the sync clients."""
+        connections = 0
+        idle_connections = 0
+        with self._lock:
+            transports = [
+                transport
+                for client in self._clients.values()
+                for transport in [client._transport, *client._mounts.values()]
+                if transport is not None
+            ]
+            stats = {
+                "requests": self._requests,
+                "active_requests": self._active_requests,
+                "failed_requests": self._failed_requests,
+                "retries": self._retries,
+                "clients": len(self._clients),
+            }
+        for transport in transports:
+            pool = getattr(transport, "_pool", None)
+            for connection in getattr(pool, "connections", []):
+                connections += 1
+                if connection.is_idle():
+                    idle_connections += 1
+        stats["connections"] = connections
+        stats["idle_connections"] = idle_connections
+        stats["max_connections"] = dify_config.SSRF_POOL_MAX_CONNECTIONS
+        return stats
+
+    def close(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+
+    def _reset_after_fork(self):
+        # connections inherited from the parent process must not be shared with it
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._clients = {}
+
+    @staticmethod
+    def _client_key(ssl_verify: bool) -> tuple:
+        return (
+            dify_config.SSRF_PROXY_ALL_URL,
+            dify_config.SSRF_PROXY_HTTP_URL,
+            dify_config.SSRF_PROXY_HTTPS_URL,
+            ssl_verify,
+        )
+
+    @staticmethod
+    def _client_kwargs(ssl_verify: bool) -> dict[str, Any]:
+        limits = httpx.Limits(
+            max_connections=dify_config.SSRF_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=dify_config.SSRF_POOL_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=dify_config.SSRF_POOL_KEEPALIVE_EXPIRY,
+        )
+        http2 = dify_config.SSRF_POOL_HTTP2_ENABLED and _is_http2_available()
+        transport_kwargs: dict[str, Any] = {"verify": ssl_verify, "limits": limits, "http2": http2}
+        client_kwargs: dict[str, Any] = {
+            "verify": ssl_verify,
+            "limits": limits,
+            "http2": http2,
+            "cookies": http.cookiejar.CookieJar(policy=_RejectCookiePolicy()),
+        }
+        if dify_config.SSRF_PROXY_ALL_URL:
+            client_kwargs["proxy"] = dify_config.SSRF_PROXY_ALL_URL
+        elif dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL:
+            client_kwargs["mounts"] = {
+                "http://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTP_URL, **transport_kwargs),
+                "https://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTPS_URL, **transport_kwargs),
+            }
+        return client_kwargs
+
+
+def _is_http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("SSRF_POOL_HTTP2_ENABLED is set but the h2 package is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
+ssrf_proxy_client_pool = SSRFProxyClientPool()
+atexit.register(ssrf_proxy_client_pool.close)
+
+
+def _prepare_request_kwargs(kwargs: dict[str, Any]) -> bool:
+    """Normalize the request arguments in place and return the SSL verification setting."""
     if "allow_redirects" in kwargs:
         allow_redirects = kwargs.pop("allow_redirects")
         if "follow_redirects" not in kwargs:
@@ -53,24 +200,18 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
     if "ssl_verify" not in kwargs:
         kwargs["ssl_verify"] = http_request_node_ssl_verify
 
-    ssl_verify = kwargs.pop("ssl_verify")
+    return kwargs.pop("ssl_verify")
+
+
+def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
+    ssl_verify = _prepare_request_kwargs(kwargs)
+    client = ssrf_proxy_client_pool.get_client(ssl_verify)
 
     retries = 0
     while retries <= max_retries:
+        ssrf_proxy_client_pool.record_request(started=True)
         try:
-            if dify_config.SSRF_PROXY_ALL_URL:
-                with httpx.Client(proxy=dify_config.SSRF_PROXY_ALL_URL, verify=ssl_verify) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            elif dify_config.SSRF_PROXY_HTTP_URL and dify_config.SSRF_PROXY_HTTPS_URL:
-                proxy_mounts = {
-                    "http://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTP_URL, verify=ssl_verify),
-                    "https://": httpx.HTTPTransport(proxy=dify_config.SSRF_PROXY_HTTPS_URL, verify=ssl_verify),
-                }
-                with httpx.Client(mounts=proxy_mounts, verify=ssl_verify) as client:
-                    response = client.request(method=method, url=url, **kwargs)
-            else:
-                with httpx.Client(verify=ssl_verify) as client:
-                    response = client.request(method=method, url=url, **kwargs)
+            response = client.request(method=method, url=url, **kwargs)
 
             if response.status_code not in STATUS_FORCELIST:
                 return response
@@ -80,12 +221,16 @@ def make_request(method, url, max_retries=SSRF_DEFAULT_MAX_RETRIES, **kwargs):
                 )
 
         except httpx.RequestError as e:
+            ssrf_proxy_client_pool.record_request(failed=True)
             logger.warning("Request to URL %s failed on attempt %s: %s", url, retries + 1, e)
             if max_retries == 0:
                 raise
+        finally:
+            ssrf_proxy_client_pool.record_request(finished=True)
 
         retries += 1
         if retries <= max_retries:
+            ssrf_proxy_client_pool.record_request(retry=True)
             time.sleep(BACKOFF_FACTOR * (2 ** (retries - 1)))
     raise MaxRetriesExceededError(f"Reached maximum retries ({max_retries}) for URL {url}")
 
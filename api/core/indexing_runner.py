@@ -1,14 +1,16 @@
 import concurrent.futures
 import json
 import logging
+import queue
 import re
 import threading
 import time
 import uuid
+from collections import deque
 from typing import Any
 
 from flask import current_app
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.orm.exc import ObjectDeletedError
 
 from configs import dify_config
@@ -39,10 +41,13 @@ from libs.datetime_utils import naive_utc_now
 from models.dataset import ChildChunk, Dataset, DatasetProcessRule, DocumentSegment
 from models.dataset import Document as DatasetDocument
 from models.model import UploadFile
+from services.entities.knowledge_entities.knowledge_entities import ParentMode
 from services.feature_service import FeatureService
 
 logger = logging.getLogger(__name__)
 
+INDEXING_PIPELINE_CHECKPOINT_TTL = 24 * 60 * 60
+
 
 class IndexingRunner:
     def __init__(self):
@@ -70,6 +75,12 @@ class IndexingRunner:
                 # extract
                 text_docs = self._extract(index_processor, dataset_document, processing_rule.to_dict())
 
+                if self._can_run_pipeline(dataset_document, processing_rule.to_dict()):
+                    # a new run never resumes from an earlier checkpoint
+                    redis_client.delete(self._pipeline_checkpoint_key(dataset_document.id))
+                    self._run_pipeline(index_processor, dataset, dataset_document, text_docs, processing_rule.to_dict())
+                    continue
+
                 # transform
                 documents = self._transform(
                     index_processor, dataset, text_docs, dataset_document.doc_language, processing_rule.to_dict()
@@ -109,12 +120,23 @@ class IndexingRunner:
             if not dataset:
                 raise ValueError("no dataset found")
 
+            # get the process rule
+            stmt = select(DatasetProcessRule).where(DatasetProcessRule.id == dataset_document.dataset_process_rule_id)
+            processing_rule = db.session.scalar(stmt)
+            if not processing_rule:
+                raise ValueError("no process rule found")
+
+            can_run_pipeline = self._can_run_pipeline(dataset_document, processing_rule.to_dict())
+            checkpoint = self._get_pipeline_checkpoint(dataset_document.id) if can_run_pipeline else None
+
             # get exist document_segment list and delete
-            document_segments = (
-                db.session.query(DocumentSegment)
-                .filter_by(dataset_id=dataset.id, document_id=dataset_document.id)
-                .all()
+            segment_query = db.session.query(DocumentSegment).filter_by(
+                dataset_id=dataset.id, document_id=dataset_document.id
             )
+            if checkpoint:
+                # keep the segments of the pages saved before the interruption
+                segment_query = segment_query.where(DocumentSegment.position > checkpoint["position"])
+            document_segments = segment_query.all()
 
             for document_segment in document_segments:
                 db.session.delete(document_segment)
@@ -122,17 +144,18 @@ class IndexingRunner:
                     # delete child chunks
                     db.session.query(ChildChunk).where(ChildChunk.segment_id == document_segment.id).delete()
             db.session.commit()
-            # get the process rule
-            stmt = select(DatasetProcessRule).where(DatasetProcessRule.id == dataset_document.dataset_process_rule_id)
-            processing_rule = db.session.scalar(stmt)
-            if not processing_rule:
-                raise ValueError("no process rule found")
 
             index_type = dataset_document.doc_form
             index_processor = IndexProcessorFactory(index_type).init_index_processor()
             # extract
             text_docs = self._extract(index_processor, dataset_document, processing_rule.to_dict())
 
+            if can_run_pipeline:
+                self._run_pipeline(
+                    index_processor, dataset, dataset_document, text_docs, processing_rule.to_dict(), checkpoint
+                )
+                return
+
             # transform
             documents = self._transform(
                 index_processor, dataset, text_docs, dataset_document.doc_language, processing_rule.to_dict()
@@ -174,37 +197,7 @@ class IndexingRunner:
                 .all()
             )
 
-            documents = []
-            if document_segments:
-                for document_segment in document_segments:
-                    # transform segment to node
-                    if document_segment.status != "completed":
-                        document = Document(
-                            page_content=document_segment.content,
-                            metadata={
-                                "doc_id": document_segment.index_node_id,
-                                "doc_hash": document_segment.index_node_hash,
-                                "document_id": document_segment.document_id,
-                                "dataset_id": document_segment.dataset_id,
-                            },
-                        )
-                        if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
-                            child_chunks = document_segment.get_child_chunks()
-                            if child_chunks:
-                                child_documents = []
-                                for child_chunk in child_chunks:
-                                    child_document = ChildDocument(
-                                        page_content=child_chunk.content,
-                                        metadata={
-                                            "doc_id": child_chunk.index_node_id,
-                                            "doc_hash": child_chunk.index_node_hash,
-                                            "document_id": document_segment.document_id,
-                                            "dataset_id": document_segment.dataset_id,
-                                        },
-                                    )
-                                    child_documents.append(child_document)
-                                document.children = child_documents
-                        documents.append(document)
+            documents = self._get_unfinished_segment_documents(dataset_document, document_segments)
             # build index
             index_type = dataset_document.doc_form
             index_processor = IndexProcessorFactory(index_type).init_index_processor()
@@ -225,6 +218,45 @@ class IndexingRunner:
             dataset_document.stopped_at = naive_utc_now()
             db.session.commit()
 
+    @staticmethod
+    def _get_unfinished_segment_documents(
+        dataset_document: DatasetDocument, document_segments: list[DocumentSegment]
+    ) -> list[Document]:
+        """
+        Transform the segments that are not completed yet back to nodes.
+        """
+        documents = []
+        for document_segment in document_segments:
+            # transform segment to node
+            if document_segment.status != "completed":
+                document = Document(
+                    page_content=document_segment.content,
+                    metadata={
+                        "doc_id": document_segment.index_node_id,
+                        "doc_hash": document_segment.index_node_hash,
+                        "document_id": document_segment.document_id,
+                        "dataset_id": document_segment.dataset_id,
+                    },
+                )
+                if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
+                    child_chunks = document_segment.get_child_chunks()
+                    if child_chunks:
+                        child_documents = []
+                        for child_chunk in child_chunks:
+                            child_document = ChildDocument(
+                                page_content=child_chunk.content,
+                                metadata={
+                                    "doc_id": child_chunk.index_node_id,
+                                    "doc_hash": child_chunk.index_node_hash,
+                                    "document_id": document_segment.document_id,
+                                    "dataset_id": document_segment.dataset_id,
+                                },
+                            )
+                            child_documents.append(child_document)
+                        document.children = child_documents
+                documents.append(document)
+        return documents
+
     def indexing_estimate(
         self,
         tenant_id: str,
@@ -614,7 +646,14 @@ class IndexingRunner:
                 db.session.commit()
 
     def _process_chunk(
-        self, flask_app, index_processor, chunk_documents, dataset, dataset_document, embedding_model_instance
+        self,
+        flask_app,
+        index_processor,
+        chunk_documents,
+        dataset,
+        dataset_document,
+        embedding_model_instance,
+        with_keywords=False,
     ):
         with flask_app.app_context():
             # check document is paused
@@ -626,7 +665,7 @@ class IndexingRunner:
                 tokens += sum(embedding_model_instance.get_text_embedding_num_tokens(page_content_list))
 
             # load index
-            index_processor.load(dataset, chunk_documents, with_keywords=False)
+            index_processor.load(dataset, chunk_documents, with_keywords=with_keywords)
 
             document_ids = [document.metadata["doc_id"] for document in chunk_documents]
             db.session.query(DocumentSegment).where(
@@ -690,6 +729,17 @@ class IndexingRunner:
         doc_language: str,
         process_rule: dict,
     ) -> list[Document]:
+        documents = index_processor.transform(
+            text_docs,
+            embedding_model_instance=self._get_transform_embedding_model_instance(dataset),
+            process_rule=process_rule,
+            tenant_id=dataset.tenant_id,
+            doc_language=doc_language,
+        )
+
+        return documents
+
+    def _get_transform_embedding_model_instance(self, dataset: Dataset) -> ModelInstance | None:
         # get embedding model instance
         embedding_model_instance = None
         if dataset.indexing_technique == "high_quality":
@@ -705,16 +755,7 @@ class IndexingRunner:
                     tenant_id=dataset.tenant_id,
                     model_type=ModelType.TEXT_EMBEDDING,
                 )
-
-        documents = index_processor.transform(
-            text_docs,
-            embedding_model_instance=embedding_model_instance,
-            process_rule=process_rule,
-            tenant_id=dataset.tenant_id,
-            doc_language=doc_language,
-        )
-
-        return documents
+        return embedding_model_instance
 
     def _load_segments(self, dataset, dataset_document, documents):
         # save node to document segment
@@ -746,6 +787,286 @@ class IndexingRunner:
         )
         pass
 
+    @staticmethod
+    def _can_run_pipeline(dataset_document: DatasetDocument, process_rule: dict) -> bool:
+        """
+        Whether the document can be indexed by the streaming pipeline.
+
+        Only index types that split every page on its own qualify: QA documents are generated by an LLM
+        over all pages and full-doc parent-child documents use all pages as a single parent.
+        """
+        if not dify_config.INDEXING_PIPELINE_ENABLED:
+            return False
+        if dataset_document.doc_form == IndexType.PARAGRAPH_INDEX:
+            return True
+        if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
+            rules = process_rule.get("rules") or {}
+            return rules.get("parent_mode") == ParentMode.PARAGRAPH
+        return False
+
+    def _run_pipeline(
+        self,
+        index_processor: BaseIndexProcessor,
+        dataset: Dataset,
+        dataset_document: DatasetDocument,
+        text_docs: list[Document],
+        process_rule: dict,
+        checkpoint: dict | None = None,
+    ):
+        """
+        Clean, split, save and index the extracted pages as a stream.
+
+        Pages are split one at a time and their segments are saved right away, then handed in batches
+        to worker threads that embed them and write them to the index while the next pages are split.
+        A worker with too many pending batches blocks splitting, so only a few batches are held in memory.
+        The number of saved pages is checkpointed in Redis, so an interrupted run resumes after them.
+        In economy mode the keyword table is rewritten on each write, so the workers only collect the
+        segments and their keywords are indexed once after the pipeline.
+        """
+        pipeline_start_at = time.perf_counter()
+        timings = {"split": 0.0, "save": 0.0, "index": 0.0}
+        timings_lock = threading.Lock()
+
+        transform_embedding_model_instance = self._get_transform_embedding_model_instance(dataset)
+        embedding_model_instance = None
+        if dataset.indexing_technique == "high_quality":
+            embedding_model_instance = self.model_manager.get_model_instance(
+                tenant_id=dataset.tenant_id,
+                provider=dataset.embedding_model_provider,
+                model_type=ModelType.TEXT_EMBEDDING,
+                model=dataset.embedding_model,
+            )
+        doc_store = DatasetDocumentStore(
+            dataset=dataset, user_id=dataset_document.created_by, document_id=dataset_document.id
+        )
+        save_child = dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX
+
+        start_page = 0
+        pending_documents: list[Document] = []
+        if checkpoint:
+            start_page = checkpoint["pages"]
+            # the saved segments that were not indexed before the interruption go first
+            document_segments = (
+                db.session.query(DocumentSegment)
+                .filter_by(dataset_id=dataset.id, document_id=dataset_document.id)
+                .all()
+            )
+            pending_documents = self._get_unfinished_segment_documents(dataset_document, document_segments)
+        position = (
+            db.session.query(func.max(DocumentSegment.position))
+            .where(DocumentSegment.document_id == dataset_document.id)
+            .scalar()
+        ) or 0
+
+        # release the pages as soon as they are split
+        pages = deque(text_docs[start_page:])
+        text_docs.clear()
+
+        batch_size = dify_config.INDEXING_PIPELINE_BATCH_SIZE
+        max_workers = dify_config.INDEXING_PIPELINE_WORKERS
+        stop = threading.Event()
+        tokens = 0
+        keyword_documents: list[Document] | None = [] if dataset.indexing_technique == "economy" else None
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Documents are routed to workers by the hash values of page_content,
+            # so the same content is never indexed by two threads at once,
+            # thereby avoiding potential database insertion deadlocks
+            worker_queues: list[queue.Queue[list[Document] | None]] = [
+                queue.Queue(maxsize=dify_config.INDEXING_PIPELINE_MAX_PENDING_BATCHES) for _ in range(max_workers)
+            ]
+            futures = [
+                executor.submit(
+                    self._run_pipeline_worker,
+                    current_app._get_current_object(),  # type: ignore
+                    worker_queue,
+                    stop,
+                    index_processor,
+                    dataset,
+                    dataset_document,
+                    embedding_model_instance,
+                    timings,
+                    timings_lock,
+                    keyword_documents,
+                )
+                for worker_queue in worker_queues
+            ]
+            document_groups: list[list[Document]] = [[] for _ in range(max_workers)]
+
+            def dispatch(documents: list[Document]):
+                for document in documents:
+                    group_index = int(helper.generate_text_hash(document.page_content), 16) % max_workers
+                    document_groups[group_index].append(document)
+                    if len(document_groups[group_index]) >= batch_size:
+                        self._put_pipeline_batch(worker_queues[group_index], document_groups[group_index], stop)
+                        document_groups[group_index] = []
+
+            page_index = start_page
+            try:
+                dispatch(pending_documents)
+                while pages and not stop.is_set():
+                    self._check_document_paused_status(dataset_document.id)
+                    split_start_at = time.perf_counter()
+                    documents = index_processor.transform(
+                        [pages.popleft()],
+                        embedding_model_instance=transform_embedding_model_instance,
+                        process_rule=process_rule,
+                        tenant_id=dataset.tenant_id,
+                        doc_language=dataset_document.doc_language,
+                    )
+                    save_start_at = time.perf_counter()
+                    if documents:
+                        doc_store.add_documents(docs=documents, save_child=save_child)
+                        db.session.query(DocumentSegment).where(
+                            DocumentSegment.document_id == dataset_document.id,
+                            DocumentSegment.index_node_id.in_([document.metadata["doc_id"] for document in documents]),
+                        ).update(
+                            {DocumentSegment.status: "indexing", DocumentSegment.indexing_at: naive_utc_now()},
+                            synchronize_session=False,
+                        )
+                        db.session.commit()
+                        position += len(documents)
+                    page_index += 1
+                    self._save_pipeline_checkpoint(dataset_document.id, page_index, position)
+                    with timings_lock:
+                        timings["split"] += save_start_at - split_start_at
+                        timings["save"] += time.perf_counter() - save_start_at
+                    dispatch(documents)
+
+                if not stop.is_set():
+                    cur_time = naive_utc_now()
+                    self._update_document_index_status(
+                        document_id=dataset_document.id,
+                        after_indexing_status="indexing",
+                        extra_update_params={
+                            DatasetDocument.cleaning_completed_at: cur_time,
+                            DatasetDocument.splitting_completed_at: cur_time,
+                        },
+                    )
+                    for worker_queue, documents in zip(worker_queues, document_groups):
+                        if documents:
+                            self._put_pipeline_batch(worker_queue, documents, stop)
+            except BaseException:
+                stop.set()
+                raise
+            finally:
+                for worker_queue in worker_queues:
+                    self._put_pipeline_batch(worker_queue, None, stop)
+
+            for future in futures:
+                tokens += future.result()
+
+        if keyword_documents:
+            keyword_start_at = time.perf_counter()
+            self._process_keyword_index(
+                current_app._get_current_object(),  # type: ignore
+                dataset.id,
+                dataset_document.id,
+                keyword_documents,
+            )
+            timings["index"] += time.perf_counter() - keyword_start_at
+
+        redis_client.delete(self._pipeline_checkpoint_key(dataset_document.id))
+        pipeline_latency = time.perf_counter() - pipeline_start_at
+        logger.info(
+            "Indexing pipeline of document %s finished in %.2fs: %s pages, split %.2fs, save %.2fs, "
+            "index %.2fs across %s workers",
+            dataset_document.id,
+            pipeline_latency,
+            page_index - start_page,
+            timings["split"],
+            timings["save"],
+            timings["index"],
+            max_workers,
+        )
+
+        # update document status to completed
+        self._update_document_index_status(
+            document_id=dataset_document.id,
+            after_indexing_status="completed",
+            extra_update_params={
+                DatasetDocument.tokens: tokens,
+                DatasetDocument.completed_at: naive_utc_now(),
+                DatasetDocument.indexing_latency: pipeline_latency,
+                DatasetDocument.error: None,
+            },
+        )
+
+    def _run_pipeline_worker(
+        self,
+        flask_app,
+        batches: queue.Queue,
+        stop: threading.Event,
+        index_processor: BaseIndexProcessor,
+        dataset: Dataset,
+        dataset_document: DatasetDocument,
+        embedding_model_instance: ModelInstance | None,
+        timings: dict[str, float],
+        timings_lock: threading.Lock,
+        keyword_documents: list[Document] | None = None,
+    ) -> int:
+        tokens = 0
+        while True:
+            batch = batches.get()
+            if batch is None or stop.is_set():
+                return tokens
+            if keyword_documents is not None:
+                # the segments are completed when their keywords are indexed after the pipeline
+                with timings_lock:
+                    keyword_documents.extend(batch)
+                continue
+            index_start_at = time.perf_counter()
+            try:
+                tokens += self._process_chunk(
+                    flask_app,
+                    index_processor,
+                    batch,
+                    dataset,
+                    dataset_document,
+                    embedding_model_instance,
+                )
+            except BaseException:
+                # stop splitting and the other workers
+                stop.set()
+                raise
+            with timings_lock:
+                timings["index"] += time.perf_counter() - index_start_at
+
+    @staticmethod
+    def _put_pipeline_batch(batches: queue.Queue, batch: list[Document] | None, stop: threading.Event):
+        """
+        Queue a batch for a pipeline worker, waiting while the worker is busy unless the pipeline is stopped.
+        """
+        while not stop.is_set():
+            try:
+                batches.put(batch, timeout=1)
+                return
+            except queue.Full:
+                continue
+        if batch is None:
+            # a stopped worker waiting for batches still needs to be woken up
+            try:
+                batches.put_nowait(None)
+            except queue.Full:
+                pass
+
+    @staticmethod
+    def _pipeline_checkpoint_key(document_id: str) -> str:
+        return f"document_{document_id}_indexing_checkpoint"
+
+    @classmethod
+    def _save_pipeline_checkpoint(cls, document_id: str, pages: int, position: int):
+        checkpoint = {"pages": pages, "position": position}
+        redis_client.setex(
+            cls._pipeline_checkpoint_key(document_id), INDEXING_PIPELINE_CHECKPOINT_TTL, json.dumps(checkpoint)
+        )
+
+    @classmethod
+    def _get_pipeline_checkpoint(cls, document_id: str) -> dict | None:
+        checkpoint = redis_client.get(cls._pipeline_checkpoint_key(document_id))
+        if checkpoint is None:
+            return None
+        return json.loads(checkpoint)
+
 
 class DocumentIsPausedError(Exception):
     pass
@@ -16,10 +16,13 @@ from core.model_runtime.entities import (
 from core.model_runtime.entities.message_entities import PromptMessageContentUnionTypes
 from core.prompt.utils.extract_thread_messages import extract_thread_messages
 from extensions.ext_database import db
+from extensions.ext_redis import redis_client
 from factories import file_factory
 from models.model import AppMode, Conversation, Message, MessageFile
 from models.workflow import Workflow, WorkflowRun
 
+MESSAGE_TOKENS_CACHE_TTL = 24 * 60 * 60
+
 
 class TokenBufferMemory:
     def __init__(
@@ -128,8 +131,9 @@ class TokenBufferMemory:
 
         messages = list(reversed(thread_messages))
 
-        curr_message_tokens = 0
         prompt_messages: list[PromptMessage] = []
+        # identifies each prompt message for the token count cache
+        prompt_message_keys: list[str] = []
         for message in messages:
             # Process user message with files
             user_files = db.session.scalars(
@@ -150,6 +154,7 @@ class TokenBufferMemory:
                 prompt_messages.append(user_prompt_message)
             else:
                 prompt_messages.append(UserPromptMessage(content=message.query))
+            prompt_message_keys.append(f"{message.id}:user")
 
             # Process assistant message with files
             assistant_files = db.session.scalars(
@@ -167,6 +172,7 @@ class TokenBufferMemory:
                 prompt_messages.append(assistant_prompt_message)
             else:
                 prompt_messages.append(AssistantPromptMessage(content=message.answer))
+            prompt_message_keys.append(f"{message.id}:assistant")
 
         if not prompt_messages:
             return []
@@ -175,12 +181,115 @@ class TokenBufferMemory:
         curr_message_tokens = self.model_instance.get_llm_num_tokens(prompt_messages)
 
         if curr_message_tokens > max_token_limit:
-            while curr_message_tokens > max_token_limit and len(prompt_messages) > 1:
-                prompt_messages.pop(0)
-                curr_message_tokens = self.model_instance.get_llm_num_tokens(prompt_messages)
+            prompt_messages = self._prune_prompt_messages(
+                prompt_messages, prompt_message_keys, curr_message_tokens, max_token_limit
+            )
 
         return prompt_messages
 
+    def _prune_prompt_messages(
+        self,
+        prompt_messages: list[PromptMessage],
+        prompt_message_keys: list[str],
+        total_tokens: int,
+        max_token_limit: int,
+    ) -> list[PromptMessage]:
+        """
+        Drop the oldest prompt messages until the rest fits in max_token_limit.
+        :param prompt_messages: prompt messages, oldest first
+        :param prompt_message_keys: cache key of each prompt message
+        :param total_tokens: token count of all prompt messages
+        :param max_token_limit: max token limit
+        :return: the most recent prompt messages fitting in the limit
+        """
+        last = len(prompt_messages) - 1
+
+        def fits(start: int) -> bool:
+            return self.model_instance.get_llm_num_tokens(prompt_messages[start:]) <= max_token_limit
+
+        # the per-message counts only estimate where to cut: each of them includes the overhead of a request
+        # and counts are not exactly additive for every model, so search the longest history that fits
+        # around the estimate, knowing that all the messages do not fit and that the last one is always kept
+        start = self._estimate_prune_start(prompt_messages, prompt_message_keys, total_tokens, max_token_limit)
+        step = 1
+        if fits(start):
+            fitting_start = start
+            while True:
+                candidate = fitting_start - step
+                if candidate <= 0:
+                    exceeding_start = 0
+                    break
+                if not fits(candidate):
+                    exceeding_start = candidate
+                    break
+                fitting_start = candidate
+                step *= 2
+        else:
+            exceeding_start = start
+            while True:
+                candidate = exceeding_start + step
+                if candidate >= last:
+                    fitting_start = last
+                    break
+                if fits(candidate):
+                    fitting_start = candidate
+                    break
+                exceeding_start = candidate
+                step *= 2
+
+        while fitting_start - exceeding_start > 1:
+            middle = (exceeding_start + fitting_start) // 2
+            if fits(middle):
+                fitting_start = middle
+            else:
+                exceeding_start = middle
+
+        return prompt_messages[fitting_start:]
+
+    def _estimate_prune_start(
+        self,
+        prompt_messages: Sequence[PromptMessage],
+        prompt_message_keys: Sequence[str],
+        total_tokens: int,
+        max_token_limit: int,
+    ) -> int:
+        """
+        Estimate how many of the oldest prompt messages to drop by subtracting their token counts from the total.
+        Messages are only counted until the estimate fits in the limit, and each message is counted only once
+        per model.
+        :param prompt_messages: prompt messages, oldest first
+        :param prompt_message_keys: cache key of each prompt message
+        :param total_tokens: token count of all prompt messages
+        :param max_token_limit: max token limit
+        :return: index of the first prompt message to keep
+        """
+        cache_keys = [
+            f"memory_message_tokens:{self.model_instance.provider}:{self.model_instance.model}:{key}"
+            for key in prompt_message_keys
+        ]
+        cached_counts = redis_client.mget(cache_keys)
+
+        start = 0
+        remaining_tokens = total_tokens
+        new_counts: dict[str, int] = {}
+        while remaining_tokens > max_token_limit and start < len(prompt_messages) - 1:
+            cached_count = cached_counts[start]
+            if cached_count is not None:
+                token_count = int(cached_count)
+            else:
+                token_count = self.model_instance.get_llm_num_tokens([prompt_messages[start]])
+                new_counts[cache_keys[start]] = token_count
+            remaining_tokens -= token_count
+            start += 1
+
+        if new_counts:
+            pipeline = redis_client.pipeline(transaction=False)
+            for cache_key, token_count in new_counts.items():
+                pipeline.setex(cache_key, MESSAGE_TOKENS_CACHE_TTL, token_count)
+            pipeline.execute()
+
+        return start
+
     def get_history_prompt_text(
         self,
         human_prefix: str = "Human",
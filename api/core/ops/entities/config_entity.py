@@ -195,4 +195,5 @@ class AliyunConfig(BaseTracingConfig):
 
 
 OPS_FILE_PATH = "ops_trace/"
+OPS_TRACE_SEGMENT_SUFFIX = ".ndjson.gz"
 OPS_TRACE_FAILED_KEY = "FAILED_OPS_TRACE"
@@ -1,3 +1,5 @@
+import atexit
+import gzip
 import json
 import logging
 import os
@@ -9,13 +11,14 @@ from typing import Any, Union
 from uuid import UUID, uuid4
 
 from cachetools import LRUCache
-from flask import current_app
+from flask import Flask, current_app
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
 from core.helper.encrypter import decrypt_token, encrypt_token, obfuscated_token
 from core.ops.entities.config_entity import (
     OPS_FILE_PATH,
+    OPS_TRACE_SEGMENT_SUFFIX,
     TracingProviderEnum,
 )
 from core.ops.entities.trace_entity import (
@@ -823,75 +826,172 @@ class TraceTask:
         return generate_name_trace_info
 
 
-trace_manager_timer: threading.Timer | None = None
-trace_manager_queue: queue.Queue = queue.Queue()
 trace_manager_interval = int(os.getenv("TRACE_QUEUE_MANAGER_INTERVAL", 5))
 trace_manager_batch_size = int(os.getenv("TRACE_QUEUE_MANAGER_BATCH_SIZE", 100))
+trace_manager_max_size = int(os.getenv("TRACE_QUEUE_MANAGER_MAX_SIZE", 10000))
+
+
+class TraceExportWorker:
+    """
+    Process-wide worker exporting the queued trace tasks in batches.
+
+    Every `trace_manager_interval` seconds, or as soon as a full batch is queued, the worker executes
+    the queued tasks and writes the traces of each app to one gzip-compressed NDJSON segment in the
+    storage, then enqueues one `process_trace_tasks` task per segment. An app has a single tracing
+    provider, so a segment holds the traces of one app and provider. The queue is bounded: traces
+    added while it is full are dropped and counted.
+    """
+
+    def __init__(self, flask_app: Flask, interval: float, batch_size: int, max_size: int):
+        self._flask_app = flask_app
+        self._interval = interval
+        self._batch_size = batch_size
+        self._queue: queue.Queue[TraceTask] = queue.Queue(maxsize=max_size)
+        self._wakeup = threading.Event()
+        # serializes exports of the worker and of `flush`
+        self._export_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._metrics = {"queued": 0, "dropped": 0, "exported": 0, "failed": 0, "segments": 0}
+
+    def add(self, trace_task: TraceTask) -> bool:
+        """Queue a trace task, return False if it was dropped because the queue is full."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(trace_task)
+        except queue.Full:
+            with self._lock:
+                self._metrics["dropped"] += 1
+                dropped = self._metrics["dropped"]
+            # a full queue drops traces at the rate they are produced, so only log some of them
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning("Trace queue is full, %s trace tasks dropped so far", dropped)
+            return False
+
+        with self._lock:
+            self._metrics["queued"] += 1
+        if self._queue.qsize() >= self._batch_size:
+            self._wakeup.set()
+        return True
+
+    def flush(self, timeout: float | None = None):
+        """Export the queued trace tasks on the calling thread, until the queue is empty or the timeout is over."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while not self._queue.empty():
+            if deadline is not None and time.monotonic() >= deadline:
+                logger.warning("Timed out flushing the trace queue, %s trace tasks left", self._queue.qsize())
+                return
+            self._export_batch()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._metrics, "pending": self._queue.qsize()}
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid:
+                return
+            if self._pid is not None:
+                # the tasks queued in the parent process are exported by the parent
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="trace_export_worker", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            # keep exporting while full batches are queued
+            while self._export_batch() >= self._batch_size:
+                pass
+
+    def _export_batch(self) -> int:
+        """Export one batch of the queued trace tasks, return the number of tasks taken from the queue."""
+        with self._export_lock:
+            tasks: list[TraceTask] = []
+            while len(tasks) < self._batch_size:
+                try:
+                    tasks.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if tasks:
+                try:
+                    self._export(tasks)
+                except Exception:
+                    logger.exception("Error processing trace tasks")
+            return len(tasks)
+
+    def _export(self, tasks: list[TraceTask]):
+        segments: dict[str, list[bytes]] = {}
+        failed = 0
+        with self._flask_app.app_context():
+            for task in tasks:
+                if task.app_id is None:
+                    continue
+                try:
+                    trace_info = task.execute()
+                except Exception:
+                    failed += 1
+                    logger.exception("Error executing trace task, trace_type %s", task.trace_type)
+                    continue
+                if not trace_info:
+                    continue
+                task_data = TaskData(
+                    app_id=task.app_id,
+                    trace_info_type=type(trace_info).__name__,
+                    trace_info=trace_info.model_dump(),
+                )
+                segments.setdefault(task.app_id, []).append(task_data.model_dump_json().encode("utf-8"))
+
+            for app_id, lines in segments.items():
+                file_id = uuid4().hex
+                file_path = f"{OPS_FILE_PATH}{app_id}/{file_id}{OPS_TRACE_SEGMENT_SUFFIX}"
+                storage.save(file_path, gzip.compress(b"\n".join(lines)))
+                process_trace_tasks.delay({"file_id": file_id, "app_id": app_id, "segment": True})
+
+        with self._lock:
+            self._metrics["exported"] += sum(len(lines) for lines in segments.values())
+            self._metrics["failed"] += failed
+            self._metrics["segments"] += len(segments)
+
+
+trace_export_worker: TraceExportWorker | None = None
+trace_export_worker_lock = threading.Lock()
+
+
+def get_trace_export_worker(flask_app: Flask) -> TraceExportWorker:
+    global trace_export_worker
+    if trace_export_worker is None:
+        with trace_export_worker_lock:
+            if trace_export_worker is None:
+                trace_export_worker = TraceExportWorker(
+                    flask_app=flask_app,
+                    interval=trace_manager_interval,
+                    batch_size=trace_manager_batch_size,
+                    max_size=trace_manager_max_size,
+                )
+                # the worker thread is a daemon, the traces still queued are exported at exit
+                atexit.register(trace_export_worker.flush, timeout=trace_manager_interval * 2)
+    return trace_export_worker
 
 
 class TraceQueueManager:
     def __init__(self, app_id=None, user_id=None):
-        global trace_manager_timer
-
         self.app_id = app_id
         self.user_id = user_id
         self.trace_instance = OpsTraceManager.get_ops_trace_instance(app_id)
         self.flask_app = current_app._get_current_object()  # type: ignore
-        if trace_manager_timer is None:
-            self.start_timer()
+        self.export_worker = get_trace_export_worker(self.flask_app)
 
     def add_trace_task(self, trace_task: TraceTask):
-        global trace_manager_timer, trace_manager_queue
         try:
             if self.trace_instance:
                 trace_task.app_id = self.app_id
-                trace_manager_queue.put(trace_task)
+                self.export_worker.add(trace_task)
         except Exception:
             logger.exception("Error adding trace task, trace_type %s", trace_task.trace_type)
-        finally:
-            self.start_timer()
-
-    def collect_tasks(self):
-        global trace_manager_queue
-        tasks: list[TraceTask] = []
-        while len(tasks) < trace_manager_batch_size and not trace_manager_queue.empty():
-            task = trace_manager_queue.get_nowait()
-            tasks.append(task)
-            trace_manager_queue.task_done()
-        return tasks
-
-    def run(self):
-        try:
-            tasks = self.collect_tasks()
-            if tasks:
-                self.send_to_celery(tasks)
-        except Exception:
-            logger.exception("Error processing trace tasks")
-
-    def start_timer(self):
-        global trace_manager_timer
-        if trace_manager_timer is None or not trace_manager_timer.is_alive():
-            trace_manager_timer = threading.Timer(trace_manager_interval, self.run)
-            trace_manager_timer.name = f"trace_manager_timer_{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())}"
-            trace_manager_timer.daemon = False
-            trace_manager_timer.start()
-
-    def send_to_celery(self, tasks: list[TraceTask]):
-        with self.flask_app.app_context():
-            for task in tasks:
-                if task.app_id is None:
-                    continue
-                file_id = uuid4().hex
-                trace_info = task.execute()
-                task_data = TaskData(
-                    app_id=task.app_id,
-                    trace_info_type=type(trace_info).__name__,
-                    trace_info=trace_info.model_dump() if trace_info else None,
-                )
-                file_path = f"{OPS_FILE_PATH}{task.app_id}/{file_id}.json"
-                storage.save(file_path, task_data.model_dump_json().encode("utf-8"))
-                file_info = {
-                    "file_id": file_id,
-                    "app_id": task.app_id,
-                }
-                process_trace_tasks.delay(file_info)
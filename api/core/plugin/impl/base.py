@@ -1,11 +1,15 @@
 import inspect
 import json
 import logging
+import os
+import threading
+import time
 from collections.abc import Callable, Generator
 from typing import TypeVar
 
 import requests
 from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
 from yarl import URL
 
@@ -30,6 +34,7 @@ from core.plugin.impl.exc import (
     PluginPermissionDeniedError,
     PluginUniqueIdentifierError,
 )
+from core.plugin.impl.metrics import plugin_daemon_request_metrics
 
 plugin_daemon_inner_api_baseurl = URL(str(dify_config.PLUGIN_DAEMON_URL))
 
@@ -37,6 +42,31 @@ T = TypeVar("T", bound=(BaseModel | dict | list | bool | str))
 
 logger = logging.getLogger(__name__)
 
+_session: requests.Session | None = None
+_session_pid: int | None = None
+_session_lock = threading.Lock()
+
+
+def get_plugin_daemon_session() -> requests.Session:
+    """
+    Get the process-wide session used for all requests to the plugin daemon.
+
+    Its connections are kept alive and reused across requests and threads. A new session is
+    created after a fork so that child processes never share sockets with their parent.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=dify_config.PLUGIN_DAEMON_POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session, _session_pid = session, pid
+    return _session
+
 
 class BasePluginClient:
     def _request(
@@ -60,14 +90,27 @@ class BasePluginClient:
         if headers.get("Content-Type") == "application/json" and isinstance(data, dict):
             data = json.dumps(data)
 
+        # for streamed responses the latency is the time until the response headers are received
+        start_at = time.perf_counter()
         try:
-            response = requests.request(
-                method=method, url=str(url), headers=headers, data=data, params=params, stream=stream, files=files
+            response = get_plugin_daemon_session().request(
+                method=method,
+                url=str(url),
+                headers=headers,
+                data=data,
+                params=params,
+                stream=stream,
+                files=files,
+                timeout=(dify_config.PLUGIN_DAEMON_CONNECT_TIMEOUT, dify_config.PLUGIN_DAEMON_READ_TIMEOUT),
             )
-        except requests.ConnectionError:
+        except (requests.ConnectionError, requests.Timeout):
+            plugin_daemon_request_metrics.observe(method, path, time.perf_counter() - start_at, error=True)
             logger.exception("Request to Plugin Daemon Service failed")
             raise PluginDaemonInnerError(code=-500, message="Request to Plugin Daemon Service failed")
 
+        plugin_daemon_request_metrics.observe(
+            method, path, time.perf_counter() - start_at, error=response.status_code >= 500
+        )
         return response
 
     def _stream_request(
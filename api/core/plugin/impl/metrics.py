@@ -0,0 +1,87 @@
+import bisect
+import re
+import threading
+from collections.abc import Sequence
+
+# upper bounds in seconds of the latency histogram buckets, the last bucket is unbounded
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_ID_SEGMENT_PATTERN = re.compile(
+    r"^([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{32,}|\d+)$"
+)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool = False):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket containing the q-quantile, inf if it is in the last bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg": self.total / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class PluginDaemonRequestMetrics:
+    """
+    Per-endpoint latency histograms of the requests to the plugin daemon.
+
+    Endpoints are keyed by method and path with the id segments (tenant ids, plugin ids) replaced,
+    so that the number of histograms stays bounded.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: dict[str, LatencyHistogram] = {}
+
+    @staticmethod
+    def endpoint(method: str, path: str) -> str:
+        segments = ["{id}" if _ID_SEGMENT_PATTERN.match(segment) else segment for segment in path.split("/")]
+        return f"{method.upper()} {'/'.join(segments)}"
+
+    def observe(self, method: str, path: str, seconds: float, error: bool = False):
+        endpoint = self.endpoint(method, path)
+        with self._lock:
+            histogram = self._histograms.get(endpoint)
+            if histogram is None:
+                histogram = self._histograms[endpoint] = LatencyHistogram()
+            histogram.observe(seconds, error)
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {endpoint: histogram.to_dict() for endpoint, histogram in self._histograms.items()}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+plugin_daemon_request_metrics = PluginDaemonRequestMetrics()
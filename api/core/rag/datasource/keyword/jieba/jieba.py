@@ -6,6 +6,7 @@ from pydantic import BaseModel
 from sqlalchemy import select
 
 from configs import dify_config
+from core.rag.datasource.keyword.jieba.jieba_keyword_postings import POSTINGS_DATA_SOURCE_TYPE, JiebaKeywordPostings
 from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
 from core.rag.datasource.keyword.keyword_base import BaseKeyword
 from core.rag.models.document import Document
@@ -23,8 +24,23 @@ class Jieba(BaseKeyword):
     def __init__(self, dataset: Dataset):
         super().__init__(dataset)
         self._config = KeywordTableConfig()
+        self._postings = JiebaKeywordPostings(dataset.id)
+        self._data_source_type: str | None = None
 
     def create(self, texts: list[Document], **kwargs) -> BaseKeyword:
+        if self._use_postings():
+            keyword_table_handler = JiebaKeywordTableHandler()
+            entries = []
+            for text in texts:
+                keywords = keyword_table_handler.extract_keywords(
+                    text.page_content, self._config.max_keywords_per_chunk
+                )
+                if text.metadata is not None:
+                    self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
+                    entries.append((text.metadata["doc_id"], list(keywords)))
+            self._postings.add(entries)
+            return self
+
         lock_name = f"keyword_indexing_lock_{self.dataset.id}"
         with redis_client.lock(lock_name, timeout=600):
             keyword_table_handler = JiebaKeywordTableHandler()
@@ -44,6 +60,22 @@ class Jieba(BaseKeyword):
             return self
 
     def add_texts(self, texts: list[Document], **kwargs):
+        if self._use_postings():
+            keyword_table_handler = JiebaKeywordTableHandler()
+            keywords_list = kwargs.get("keywords_list")
+            entries = []
+            for i, text in enumerate(texts):
+                keywords = keywords_list[i] if keywords_list else None
+                if not keywords:
+                    keywords = keyword_table_handler.extract_keywords(
+                        text.page_content, self._config.max_keywords_per_chunk
+                    )
+                if text.metadata is not None:
+                    self._update_segment_keywords(self.dataset.id, text.metadata["doc_id"], list(keywords))
+                    entries.append((text.metadata["doc_id"], list(keywords)))
+            self._postings.add(entries)
+            return
+
         lock_name = f"keyword_indexing_lock_{self.dataset.id}"
         with redis_client.lock(lock_name, timeout=600):
             keyword_table_handler = JiebaKeywordTableHandler()
@@ -71,12 +103,17 @@ class Jieba(BaseKeyword):
             self._save_dataset_keyword_table(keyword_table)
 
     def text_exists(self, id: str) -> bool:
+        if self._use_postings():
+            return self._postings.exists(id)
         keyword_table = self._get_dataset_keyword_table()
         if keyword_table is None:
             return False
         return id in set.union(*keyword_table.values())
 
     def delete_by_ids(self, ids: list[str]):
+        if self._use_postings():
+            self._postings.delete_node_ids(ids)
+            return
         lock_name = f"keyword_indexing_lock_{self.dataset.id}"
         with redis_client.lock(lock_name, timeout=600):
             keyword_table = self._get_dataset_keyword_table()
@@ -86,11 +123,15 @@ class Jieba(BaseKeyword):
             self._save_dataset_keyword_table(keyword_table)
 
     def search(self, query: str, **kwargs: Any) -> list[Document]:
-        keyword_table = self._get_dataset_keyword_table()
-
         k = kwargs.get("top_k", 4)
         document_ids_filter = kwargs.get("document_ids_filter")
-        sorted_chunk_indices = self._retrieve_ids_by_query(keyword_table or {}, query, k)
+        if self._use_postings():
+            # only the postings of the query keywords are read
+            query_keywords = JiebaKeywordTableHandler().extract_keywords(query)
+            sorted_chunk_indices = self._postings.search(query_keywords, k)
+        else:
+            keyword_table = self._get_dataset_keyword_table()
+            sorted_chunk_indices = self._retrieve_ids_by_query(keyword_table or {}, query, k)
 
         documents = []
         for chunk_index in sorted_chunk_indices:
@@ -121,12 +162,25 @@ class Jieba(BaseKeyword):
         with redis_client.lock(lock_name, timeout=600):
             dataset_keyword_table = self.dataset.dataset_keyword_table
             if dataset_keyword_table:
+                if dataset_keyword_table.data_source_type == POSTINGS_DATA_SOURCE_TYPE:
+                    self._postings.delete_all()
                 db.session.delete(dataset_keyword_table)
                 db.session.commit()
-                if dataset_keyword_table.data_source_type != "database":
+                if dataset_keyword_table.data_source_type not in {"database", POSTINGS_DATA_SOURCE_TYPE}:
                     file_key = "keyword_files/" + self.dataset.tenant_id + "/" + self.dataset.id + ".txt"
                     storage.delete(file_key)
 
+    def _use_postings(self) -> bool:
+        if self._data_source_type is None:
+            dataset_keyword_table = self.dataset.dataset_keyword_table
+            if dataset_keyword_table:
+                self._data_source_type = dataset_keyword_table.data_source_type
+            else:
+                # creates the keyword table record with the configured data source type
+                self._get_dataset_keyword_table()
+                self._data_source_type = dify_config.KEYWORD_DATA_SOURCE_TYPE
+        return self._data_source_type == POSTINGS_DATA_SOURCE_TYPE
+
     def _save_dataset_keyword_table(self, keyword_table):
         keyword_table_dict = {
             "__type__": "keyword_table",
@@ -222,6 +276,10 @@ class Jieba(BaseKeyword):
             db.session.commit()
 
     def create_segment_keywords(self, node_id: str, keywords: list[str]):
+        if self._use_postings():
+            self._update_segment_keywords(self.dataset.id, node_id, keywords)
+            self._postings.add([(node_id, keywords)])
+            return
         keyword_table = self._get_dataset_keyword_table()
         self._update_segment_keywords(self.dataset.id, node_id, keywords)
         keyword_table = self._add_text_to_keyword_table(keyword_table or {}, node_id, keywords)
@@ -229,6 +287,17 @@ class Jieba(BaseKeyword):
 
     def multi_create_segment_keywords(self, pre_segment_data_list: list):
         keyword_table_handler = JiebaKeywordTableHandler()
+        if self._use_postings():
+            entries = []
+            for pre_segment_data in pre_segment_data_list:
+                segment = pre_segment_data["segment"]
+                keywords = pre_segment_data["keywords"] or list(
+                    keyword_table_handler.extract_keywords(segment.content, self._config.max_keywords_per_chunk)
+                )
+                segment.keywords = keywords
+                entries.append((segment.index_node_id, keywords))
+            self._postings.add(entries)
+            return
         keyword_table = self._get_dataset_keyword_table()
         for pre_segment_data in pre_segment_data_list:
             segment = pre_segment_data["segment"]
@@ -246,6 +315,9 @@ class Jieba(BaseKeyword):
         self._save_dataset_keyword_table(keyword_table)
 
     def update_segment_keywords_index(self, node_id: str, keywords: list[str]):
+        if self._use_postings():
+            self._postings.add([(node_id, keywords)])
+            return
         keyword_table = self._get_dataset_keyword_table()
         keyword_table = self._add_text_to_keyword_table(keyword_table or {}, node_id, keywords)
         self._save_dataset_keyword_table(keyword_table)
@@ -0,0 +1,101 @@
+import hashlib
+import json
+from collections.abc import Iterable, Sequence
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.dataset import DatasetKeywordPosting
+
+POSTINGS_DATA_SOURCE_TYPE = "sharded"
+POSTINGS_WRITE_BATCH_SIZE = 1000
+POSTINGS_SEARCH_CACHE_TTL = 600
+
+
+class JiebaKeywordPostings:
+    """
+    Keyword index of a dataset stored as one row per (keyword, node id) posting.
+
+    Adding or deleting nodes only touches the postings of those nodes, and searching only reads
+    the postings of the query keywords, instead of rewriting or loading the whole keyword table.
+    Search results are cached in Redis when a query is first run, and the cache of the dataset is
+    dropped on every write.
+    """
+
+    def __init__(self, dataset_id: str):
+        self.dataset_id = dataset_id
+
+    @property
+    def _search_cache_key(self) -> str:
+        return f"keyword_postings_search:{self.dataset_id}"
+
+    def _invalidate_search_cache(self):
+        redis_client.delete(self._search_cache_key)
+
+    def add(self, entries: Iterable[tuple[str, Iterable[str]]]):
+        rows = [
+            {"dataset_id": self.dataset_id, "keyword": keyword, "node_id": node_id}
+            for node_id, keywords in entries
+            for keyword in set(keywords)
+            if keyword and len(keyword) <= 255
+        ]
+        for i in range(0, len(rows), POSTINGS_WRITE_BATCH_SIZE):
+            stmt = insert(DatasetKeywordPosting).values(rows[i : i + POSTINGS_WRITE_BATCH_SIZE])
+            db.session.execute(stmt.on_conflict_do_nothing())
+        db.session.commit()
+        if rows:
+            self._invalidate_search_cache()
+
+    def delete_node_ids(self, node_ids: Sequence[str]):
+        for i in range(0, len(node_ids), POSTINGS_WRITE_BATCH_SIZE):
+            db.session.execute(
+                delete(DatasetKeywordPosting).where(
+                    DatasetKeywordPosting.dataset_id == self.dataset_id,
+                    DatasetKeywordPosting.node_id.in_(node_ids[i : i + POSTINGS_WRITE_BATCH_SIZE]),
+                )
+            )
+        db.session.commit()
+        self._invalidate_search_cache()
+
+    def delete_all(self):
+        db.session.execute(delete(DatasetKeywordPosting).where(DatasetKeywordPosting.dataset_id == self.dataset_id))
+        db.session.commit()
+        self._invalidate_search_cache()
+
+    def exists(self, node_id: str) -> bool:
+        stmt = (
+            select(DatasetKeywordPosting.node_id)
+            .where(DatasetKeywordPosting.dataset_id == self.dataset_id, DatasetKeywordPosting.node_id == node_id)
+            .limit(1)
+        )
+        return db.session.scalar(stmt) is not None
+
+    def search(self, keywords: Iterable[str], k: int = 4) -> list[str]:
+        """Return up to k node ids ordered by the number of matching keywords."""
+        keywords = sorted(set(keywords))
+        if not keywords:
+            return []
+        field = hashlib.sha256(json.dumps([k, keywords]).encode("utf-8")).hexdigest()
+        cached = redis_client.hget(self._search_cache_key, field)
+        if cached is not None:
+            return json.loads(cached)
+
+        node_ids = self._query(keywords, k)
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.hset(self._search_cache_key, field, json.dumps(node_ids))
+        pipeline.expire(self._search_cache_key, POSTINGS_SEARCH_CACHE_TTL)
+        pipeline.execute()
+        return node_ids
+
+    def _query(self, keywords: list[str], k: int) -> list[str]:
+        hits = func.count().label("hits")
+        stmt = (
+            select(DatasetKeywordPosting.node_id, hits)
+            .where(DatasetKeywordPosting.dataset_id == self.dataset_id, DatasetKeywordPosting.keyword.in_(keywords))
+            .group_by(DatasetKeywordPosting.node_id)
+            .order_by(hits.desc(), DatasetKeywordPosting.node_id)
+            .limit(k)
+        )
+        return [row.node_id for row in db.session.execute(stmt)]
@@ -1,11 +1,7 @@
-import concurrent.futures
-from concurrent.futures import ThreadPoolExecutor
-
 from flask import Flask, current_app
 from sqlalchemy import select
 from sqlalchemy.orm import Session, load_only
 
-from configs import dify_config
 from core.rag.data_post_processor.data_post_processor import DataPostProcessor
 from core.rag.datasource.keyword.keyword_factory import Keyword
 from core.rag.datasource.vdb.vector_factory import Vector
@@ -14,6 +10,7 @@ from core.rag.entities.metadata_entities import MetadataCondition
 from core.rag.index_processor.constant.index_type import IndexType
 from core.rag.models.document import Document
 from core.rag.rerank.rerank_type import RerankMode
+from core.rag.retrieval.retrieval_executor import retrieval_search_executor
 from core.rag.retrieval.retrieval_methods import RetrievalMethod
 from extensions.ext_database import db
 from models.dataset import ChildChunk, Dataset, DocumentSegment
@@ -53,55 +50,60 @@ class RetrievalService:
         all_documents: list[Document] = []
         exceptions: list[str] = []
 
-        # Optimize multithreading with thread pools
-        with ThreadPoolExecutor(max_workers=dify_config.RETRIEVAL_SERVICE_EXECUTORS) as executor:  # type: ignore
-            futures = []
-            if retrieval_method == "keyword_search":
-                futures.append(
-                    executor.submit(
-                        cls.keyword_search,
-                        flask_app=current_app._get_current_object(),  # type: ignore
-                        dataset_id=dataset_id,
-                        query=query,
-                        top_k=top_k,
-                        all_documents=all_documents,
-                        exceptions=exceptions,
-                        document_ids_filter=document_ids_filter,
-                    )
+        # Run the searches on the process-wide retrieval pool
+        futures = []
+        if retrieval_method == "keyword_search":
+            futures.append(
+                retrieval_search_executor.submit(
+                    str(dataset.tenant_id),
+                    cls.keyword_search,
+                    flask_app=current_app._get_current_object(),  # type: ignore
+                    dataset_id=dataset_id,
+                    query=query,
+                    top_k=top_k,
+                    all_documents=all_documents,
+                    exceptions=exceptions,
+                    document_ids_filter=document_ids_filter,
                 )
-            if RetrievalMethod.is_support_semantic_search(retrieval_method):
-                futures.append(
-                    executor.submit(
-                        cls.embedding_search,
-                        flask_app=current_app._get_current_object(),  # type: ignore
-                        dataset_id=dataset_id,
-                        query=query,
-                        top_k=top_k,
-                        score_threshold=score_threshold,
-                        reranking_model=reranking_model,
-                        all_documents=all_documents,
-                        retrieval_method=retrieval_method,
-                        exceptions=exceptions,
-                        document_ids_filter=document_ids_filter,
-                    )
+            )
+        if RetrievalMethod.is_support_semantic_search(retrieval_method):
+            futures.append(
+                retrieval_search_executor.submit(
+                    str(dataset.tenant_id),
+                    cls.embedding_search,
+                    flask_app=current_app._get_current_object(),  # type: ignore
+                    dataset_id=dataset_id,
+                    query=query,
+                    top_k=top_k,
+                    score_threshold=score_threshold,
+                    reranking_model=reranking_model,
+                    all_documents=all_documents,
+                    retrieval_method=retrieval_method,
+                    exceptions=exceptions,
+                    document_ids_filter=document_ids_filter,
                 )
-            if RetrievalMethod.is_support_fulltext_search(retrieval_method):
-                futures.append(
-                    executor.submit(
-                        cls.full_text_index_search,
-                        flask_app=current_app._get_current_object(),  # type: ignore
-                        dataset_id=dataset_id,
-                        query=query,
-                        top_k=top_k,
-                        score_threshold=score_threshold,
-                        reranking_model=reranking_model,
-                        all_documents=all_documents,
-                        retrieval_method=retrieval_method,
-                        exceptions=exceptions,
-                        document_ids_filter=document_ids_filter,
-                    )
+            )
+        if RetrievalMethod.is_support_fulltext_search(retrieval_method):
+            futures.append(
+                retrieval_search_executor.submit(
+                    str(dataset.tenant_id),
+                    cls.full_text_index_search,
+                    flask_app=current_app._get_current_object(),  # type: ignore
+                    dataset_id=dataset_id,
+                    query=query,
+                    top_k=top_k,
+                    score_threshold=score_threshold,
+                    reranking_model=reranking_model,
+                    all_documents=all_documents,
+                    retrieval_method=retrieval_method,
+                    exceptions=exceptions,
+                    document_ids_filter=document_ids_filter,
                 )
-            concurrent.futures.wait(futures, timeout=30, return_when=concurrent.futures.ALL_COMPLETED)
+            )
+        if not retrieval_search_executor.wait(futures, timeout=30):
+            # searches still running after the timeout must not mutate the results returned to the caller
+            all_documents = list(all_documents)
+            exceptions = list(exceptions)
 
         if exceptions:
             raise ValueError(";\n".join(exceptions))
@@ -300,6 +302,58 @@ class RetrievalService:
                 .all()
             }
 
+            # Batch query child chunks and segments, a constant number of queries regardless of top_k
+            child_index_node_ids = set()
+            segment_index_node_ids = set()
+            for document in documents:
+                dataset_document = dataset_documents.get(document.metadata.get("document_id"))
+                if not dataset_document or not document.metadata.get("doc_id"):
+                    continue
+                if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
+                    child_index_node_ids.add(document.metadata["doc_id"])
+                else:
+                    segment_index_node_ids.add(document.metadata["doc_id"])
+            dataset_ids = {doc.dataset_id for doc in dataset_documents.values()}
+
+            child_chunks_by_index_node_id = {}
+            if child_index_node_ids:
+                child_chunk_stmt = select(ChildChunk).where(ChildChunk.index_node_id.in_(child_index_node_ids))
+                for child_chunk in db.session.scalars(child_chunk_stmt):
+                    child_chunks_by_index_node_id.setdefault(child_chunk.index_node_id, child_chunk)
+
+            parent_segments_by_id = {}
+            parent_segment_ids = {child_chunk.segment_id for child_chunk in child_chunks_by_index_node_id.values()}
+            if parent_segment_ids:
+                parent_segment_stmt = (
+                    select(DocumentSegment)
+                    .where(
+                        DocumentSegment.dataset_id.in_(dataset_ids),
+                        DocumentSegment.enabled == True,
+                        DocumentSegment.status == "completed",
+                        DocumentSegment.id.in_(parent_segment_ids),
+                    )
+                    .options(
+                        load_only(
+                            DocumentSegment.id,
+                            DocumentSegment.dataset_id,
+                            DocumentSegment.content,
+                            DocumentSegment.answer,
+                        )
+                    )
+                )
+                parent_segments_by_id = {segment.id: segment for segment in db.session.scalars(parent_segment_stmt)}
+
+            segments_by_index_node_id = {}
+            if segment_index_node_ids:
+                document_segment_stmt = select(DocumentSegment).where(
+                    DocumentSegment.dataset_id.in_(dataset_ids),
+                    DocumentSegment.enabled == True,
+                    DocumentSegment.status == "completed",
+                    DocumentSegment.index_node_id.in_(segment_index_node_ids),
+                )
+                for segment in db.session.scalars(document_segment_stmt):
+                    segments_by_index_node_id.setdefault((segment.dataset_id, segment.index_node_id), segment)
+
             records = []
             include_segment_ids = set()
             segment_child_map = {}
@@ -317,31 +371,14 @@ class RetrievalService:
                 if dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX:
                     # Handle parent-child documents
                     child_index_node_id = document.metadata.get("doc_id")
-                    child_chunk_stmt = select(ChildChunk).where(ChildChunk.index_node_id == child_index_node_id)
-                    child_chunk = db.session.scalar(child_chunk_stmt)
+                    child_chunk = child_chunks_by_index_node_id.get(child_index_node_id)
 
                     if not child_chunk:
                         continue
 
-                    segment = (
-                        db.session.query(DocumentSegment)
-                        .where(
-                            DocumentSegment.dataset_id == dataset_document.dataset_id,
-                            DocumentSegment.enabled == True,
-                            DocumentSegment.status == "completed",
-                            DocumentSegment.id == child_chunk.segment_id,
-                        )
-                        .options(
-                            load_only(
-                                DocumentSegment.id,
-                                DocumentSegment.content,
-                                DocumentSegment.answer,
-                            )
-                        )
-                        .first()
-                    )
+                    segment = parent_segments_by_id.get(child_chunk.segment_id)
 
-                    if not segment:
+                    if not segment or segment.dataset_id != dataset_document.dataset_id:
                         continue
 
                     if segment.id not in include_segment_ids:
@@ -377,13 +414,7 @@ class RetrievalService:
                     index_node_id = document.metadata.get("doc_id")
                     if not index_node_id:
                         continue
-                    document_segment_stmt = select(DocumentSegment).where(
-                        DocumentSegment.dataset_id == dataset_document.dataset_id,
-                        DocumentSegment.enabled == True,
-                        DocumentSegment.status == "completed",
-                        DocumentSegment.index_node_id == index_node_id,
-                    )
-                    segment = db.session.scalar(document_segment_stmt)
+                    segment = segments_by_index_node_id.get((dataset_document.dataset_id, index_node_id))
 
                     if not segment:
                         continue
@@ -0,0 +1,233 @@
+"""
+Process-wide connection pools of the SQL-backed vector stores.
+
+Vector store instances are created per retrieval and per indexing task, so a pool owned by an
+instance opens new connections for every query. The registry keeps one pool or engine per
+connection config for the whole process, shared by all datasets and collections stored on the
+same server.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Generator, Hashable
+from contextlib import contextmanager
+from typing import Any, TypeVar
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from configs import dify_config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Psycopg2ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool with health checks and utilization metrics.
+
+    When all connections are in use, a checkout waits up to `timeout` seconds for one to be
+    returned instead of failing right away as psycopg2 pools do. Closed connections and
+    connections idle for longer than `health_check_interval` that do not answer a ping are
+    replaced on checkout.
+    """
+
+    def __init__(
+        self,
+        min_connection: int,
+        max_connection: int,
+        timeout: float,
+        health_check_interval: float,
+        **connect_kwargs: Any,
+    ):
+        self.max_connection = max_connection
+        self._timeout = timeout
+        self._health_check_interval = health_check_interval
+        self._pool = psycopg2.pool.ThreadedConnectionPool(min_connection, max_connection, **connect_kwargs)
+        self._slots = threading.BoundedSemaphore(max_connection)
+        self._lock = threading.Lock()
+        self._last_used: dict[int, float] = {}
+        self._in_use = 0
+        self._max_in_use = 0
+        self._checkouts = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._replaced = 0
+
+    @contextmanager
+    def connection(self) -> Generator[psycopg2.extensions.connection, None, None]:
+        """
+        Check out a connection, returning it to the pool on exit.
+
+        The connection is rolled back if the block raises, and discarded if it is closed by then.
+        """
+        start_at = time.perf_counter()
+        if not self._slots.acquire(timeout=self._timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise psycopg2.pool.PoolError(f"no connection available after {self._timeout}s")
+        try:
+            conn = self._checkout()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_use += 1
+            self._max_in_use = max(self._max_in_use, self._in_use)
+            self._checkouts += 1
+            self._wait_time += time.perf_counter() - start_at
+
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    logger.warning("Failed to roll back a pooled connection, discarding it", exc_info=True)
+                    conn.close()
+            raise
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                if conn.closed:
+                    self._last_used.pop(id(conn), None)
+                else:
+                    self._last_used[id(conn)] = time.monotonic()
+            try:
+                self._pool.putconn(conn, close=bool(conn.closed))
+            finally:
+                self._slots.release()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "max_connection": self.max_connection,
+                "in_use": self._in_use,
+                "max_in_use": self._max_in_use,
+                "utilization": self._in_use / self.max_connection,
+                "checkouts": self._checkouts,
+                "avg_wait_time": self._wait_time / self._checkouts if self._checkouts else 0.0,
+                "timeouts": self._timeouts,
+                "replaced": self._replaced,
+            }
+
+    def close(self):
+        self._pool.closeall()
+
+    def _checkout(self) -> psycopg2.extensions.connection:
+        conn = self._pool.getconn()
+        if self._is_healthy(conn):
+            return conn
+        with self._lock:
+            self._replaced += 1
+            self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+        return self._pool.getconn()
+
+    def _is_healthy(self, conn: psycopg2.extensions.connection) -> bool:
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self._health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+        except psycopg2.Error:
+            logger.warning("Pooled connection failed the health check, replacing it", exc_info=True)
+            return False
+        return True
+
+
+class ConnectionPoolRegistry:
+    """
+    Registry of the connection pools shared by the vector store instances, keyed by connection config.
+
+    The pools are not shared with forked processes: a child process creates its own pools, and keeps
+    the inherited ones referenced so that their sockets, still used by the parent, are never closed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: dict[Hashable, Any] = {}
+        self._names: dict[Hashable, str] = {}
+        self._inherited: list[Any] = []
+        self._pid = os.getpid()
+
+    def get(self, key: Hashable, factory: Callable[[], T], name: str) -> T:
+        """
+        Get the pool of the key, creating it with the factory on first use.
+
+        :param key: connection config the pool is shared for, including the credentials
+        :param factory: creates the pool
+        :param name: name of the pool in the metrics, without credentials
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._inherited.extend(self._pools.values())
+                self._pools = {}
+                self._names = {}
+                self._pid = os.getpid()
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = factory()
+                self._names[key] = name
+                logger.info("Created shared vector store connection pool %s", name)
+            return pool
+
+    def get_psycopg2_pool(
+        self, name: str, min_connection: int, max_connection: int, **connect_kwargs: Any
+    ) -> Psycopg2ConnectionPool:
+        key = ("psycopg2", min_connection, max_connection, tuple(sorted(connect_kwargs.items())))
+        return self.get(
+            key,
+            lambda: Psycopg2ConnectionPool(
+                min_connection,
+                max_connection,
+                timeout=dify_config.VECTOR_STORE_POOL_TIMEOUT,
+                health_check_interval=dify_config.VECTOR_STORE_POOL_HEALTH_CHECK_INTERVAL,
+                **connect_kwargs,
+            ),
+            name,
+        )
+
+    def get_engine(self, name: str, url: str, **engine_kwargs: Any) -> Engine:
+        """Get a SQLAlchemy engine, whose pool pings connections before using them."""
+        key = ("sqlalchemy", url, tuple(sorted(engine_kwargs.items())))
+        return self.get(key, lambda: create_engine(url, pool_pre_ping=True, **engine_kwargs), name)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            pools = [(self._names[key], pool) for key, pool in self._pools.items()]
+        stats: dict[str, dict[str, Any]] = {}
+        for name, pool in pools:
+            if isinstance(pool, Engine):
+                stats[name] = {"status": pool.pool.status()}
+            elif hasattr(pool, "stats"):
+                stats[name] = pool.stats()
+        return stats
+
+    def close_all(self):
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+            self._names = {}
+        for pool in pools:
+            try:
+                if isinstance(pool, Engine):
+                    pool.dispose()
+                elif hasattr(pool, "close"):
+                    pool.close()
+            except Exception:
+                logger.warning("Failed to close a vector store connection pool", exc_info=True)
+
+
+vector_store_pool_registry = ConnectionPoolRegistry()
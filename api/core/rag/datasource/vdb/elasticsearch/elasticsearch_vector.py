@@ -174,6 +174,12 @@ class ElasticSearchVector(BaseVector):
     def text_exists(self, id: str) -> bool:
         return bool(self._client.exists(index=self._collection_name, id=id))
 
+    def get_existing_ids(self, ids: list[str]) -> set[str]:
+        if not ids or not self._client.indices.exists(index=self._collection_name):
+            return set()
+        response = self._client.mget(index=self._collection_name, ids=ids, source=False)
+        return {doc["_id"] for doc in response["docs"] if doc.get("found")}
+
     def delete_by_ids(self, ids: list[str]):
         if not ids:
             return
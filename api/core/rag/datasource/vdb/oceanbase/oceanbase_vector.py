@@ -9,6 +9,7 @@ from sqlalchemy import JSON, Column, String
 from sqlalchemy.dialects.mysql import LONGTEXT
 
 from configs import dify_config
+from core.rag.datasource.vdb.connection_pool import vector_store_pool_registry
 from core.rag.datasource.vdb.vector_base import BaseVector
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
@@ -52,11 +53,16 @@ class OceanBaseVector(BaseVector):
         super().__init__(collection_name)
         self._config = config
         self._hnsw_ef_search = -1
-        self._client = ObVecClient(
-            uri=f"{self._config.host}:{self._config.port}",
-            user=self._config.user,
-            password=self._config.password,
-            db_name=self._config.database,
+        # the client and its engine are shared by all the collections stored on the same server
+        self._client = vector_store_pool_registry.get(
+            ("oceanbase", config.host, config.port, config.user, config.password, config.database),
+            lambda: ObVecClient(
+                uri=f"{config.host}:{config.port}",
+                user=config.user,
+                password=config.password,
+                db_name=config.database,
+            ),
+            name=f"oceanbase:{config.host}:{config.port}/{config.database}",
         )
         self._hybrid_search_enabled = self._check_hybrid_search_support()  # Check if hybrid search is supported
 
@@ -1,16 +1,18 @@
 import hashlib
+import io
 import json
 import logging
+import struct
 import uuid
 from contextlib import contextmanager
 from typing import Any
 
 import psycopg2.errors
-import psycopg2.extras
-import psycopg2.pool
+import psycopg2.extensions
 from pydantic import BaseModel, model_validator
 
 from configs import dify_config
+from core.rag.datasource.vdb.connection_pool import vector_store_pool_registry
 from core.rag.datasource.vdb.vector_base import BaseVector
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
@@ -31,6 +33,8 @@ class PGVectorConfig(BaseModel):
     min_connection: int
     max_connection: int
     pg_bigm: bool = False
+    hnsw_ef_search: int | None = None
+    ivfflat_probes: int | None = None
 
     @model_validator(mode="before")
     @classmethod
@@ -73,6 +77,52 @@ CREATE INDEX IF NOT EXISTS bigm_idx_{index_hash} ON {table_name}
 USING gin (text gin_bigm_ops);
 """
 
+SQL_SEARCH_BY_VECTOR = """
+SELECT meta, text, embedding <=> $1 AS distance FROM {table_name}
+ORDER BY distance LIMIT $2
+"""
+
+SQL_SEARCH_BY_VECTOR_WITH_DOCUMENT_IDS = """
+SELECT meta, text, embedding <=> $1 AS distance FROM {table_name}
+WHERE meta->>'document_id' = ANY($2)
+ORDER BY distance LIMIT $3
+"""
+
+# prepared statements are deallocated when a connection has more of them, to bound its memory
+MAX_PREPARED_STATEMENTS_PER_CONNECTION = 256
+
+_COPY_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+_COPY_BINARY_TRAILER = struct.pack(">h", -1)
+_JSONB_BINARY_VERSION = b"\x01"
+
+
+class PGVectorConnection(psycopg2.extensions.connection):
+    """Connection keeping track of the statements prepared in its session."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: set[str] = set()
+
+
+def _to_vector_literal(embedding: list[float]) -> str:
+    return json.dumps(embedding, separators=(",", ":"))
+
+
+def _encode_copy_row(doc_id: str, text: str, meta: str, embedding: list[float]) -> bytes:
+    """Encode a row of the (id, text, meta, embedding) columns in the binary COPY format."""
+    fields = (
+        uuid.UUID(doc_id).bytes,
+        text.encode(),
+        _JSONB_BINARY_VERSION + meta.encode(),
+        # binary format of pgvector: dimension, unused, then big-endian float4 values
+        struct.pack(f">HH{len(embedding)}f", len(embedding), 0, *embedding),
+    )
+    row = [struct.pack(">h", len(fields))]
+    for field in fields:
+        row.append(struct.pack(">i", len(field)))
+        row.append(field)
+    return b"".join(row)
+
 
 class PGVector(BaseVector):
     def __init__(self, collection_name: str, config: PGVectorConfig):
@@ -80,13 +130,20 @@ class PGVector(BaseVector):
         self.pool = self._create_connection_pool(config)
         self.table_name = f"embedding_{collection_name}"
         self.index_hash = hashlib.md5(self.table_name.encode()).hexdigest()[:8]
+        # statements are prepared per connection for every table, so they are named after the full digest
+        # of the table name, which keeps the names under the 63 characters of a PostgreSQL identifier
+        self.statement_hash = hashlib.md5(self.table_name.encode()).hexdigest()
         self.pg_bigm = config.pg_bigm
+        self.hnsw_ef_search = config.hnsw_ef_search
+        self.ivfflat_probes = config.ivfflat_probes
 
     def get_type(self) -> str:
         return VectorType.PGVECTOR
 
     def _create_connection_pool(self, config: PGVectorConfig):
-        return psycopg2.pool.SimpleConnectionPool(
+        # the pool is shared by all the collections stored on the same server
+        return vector_store_pool_registry.get_psycopg2_pool(
+            f"pgvector:{config.host}:{config.port}/{config.database}",
             config.min_connection,
             config.max_connection,
             host=config.host,
@@ -94,18 +151,18 @@ class PGVector(BaseVector):
             user=config.user,
             password=config.password,
             database=config.database,
+            connection_factory=PGVectorConnection,
         )
 
     @contextmanager
     def _get_cursor(self):
-        conn = self.pool.getconn()
-        cur = conn.cursor()
-        try:
-            yield cur
-        finally:
-            cur.close()
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
             conn.commit()
-            self.pool.putconn(conn)
 
     def create(self, texts: list[Document], embeddings: list[list[float]], **kwargs):
         dimension = len(embeddings[0])
@@ -113,23 +170,22 @@ class PGVector(BaseVector):
         return self.add_texts(texts, embeddings)
 
     def add_texts(self, documents: list[Document], embeddings: list[list[float]], **kwargs):
-        values = []
+        # rows are sent in the binary COPY format, so the embeddings are not serialized to text and re-parsed
+        buffer = io.BytesIO()
+        buffer.write(_COPY_BINARY_HEADER)
         pks = []
         for i, doc in enumerate(documents):
             if doc.metadata is not None:
                 doc_id = doc.metadata.get("doc_id", str(uuid.uuid4()))
                 pks.append(doc_id)
-                values.append(
-                    (
-                        doc_id,
-                        doc.page_content,
-                        json.dumps(doc.metadata),
-                        embeddings[i],
-                    )
-                )
+                buffer.write(_encode_copy_row(doc_id, doc.page_content, json.dumps(doc.metadata), embeddings[i]))
+        if not pks:
+            return pks
+        buffer.write(_COPY_BINARY_TRAILER)
+        buffer.seek(0)
         with self._get_cursor() as cur:
-            psycopg2.extras.execute_values(
-                cur, f"INSERT INTO {self.table_name} (id, text, meta, embedding) VALUES %s", values
+            cur.copy_expert(
+                f"COPY {self.table_name} (id, text, meta, embedding) FROM STDIN WITH (FORMAT BINARY)", buffer
             )
         return pks
 
@@ -138,6 +194,17 @@ class PGVector(BaseVector):
             cur.execute(f"SELECT id FROM {self.table_name} WHERE id = %s", (id,))
             return cur.fetchone() is not None
 
+    def get_existing_ids(self, ids: list[str]) -> set[str]:
+        if not ids:
+            return set()
+        with self._get_cursor() as cur:
+            try:
+                cur.execute(f"SELECT id FROM {self.table_name} WHERE id = ANY(%s::uuid[])", (ids,))
+            except psycopg2.errors.UndefinedTable:
+                # the table is created with the first texts of the collection
+                return set()
+            return {str(record[0]) for record in cur}
+
     def get_by_ids(self, ids: list[str]) -> list[Document]:
         with self._get_cursor() as cur:
             cur.execute(f"SELECT meta, text FROM {self.table_name} WHERE id IN %s", (tuple(ids),))
@@ -170,6 +237,9 @@ class PGVector(BaseVector):
         """
         Search the nearest neighbors to a vector.
 
+        The query runs as a statement prepared once per connection, so it is planned once per
+        collection instead of on every search.
+
         :param query_vector: The input vector to search for similar items.
         :return: List of Documents that are nearest to the query vector.
         """
@@ -177,18 +247,25 @@ class PGVector(BaseVector):
         if not isinstance(top_k, int) or top_k <= 0:
             raise ValueError("top_k must be a positive integer")
         document_ids_filter = kwargs.get("document_ids_filter")
-        where_clause = ""
-        if document_ids_filter:
-            document_ids = ", ".join(f"'{id}'" for id in document_ids_filter)
-            where_clause = f" WHERE meta->>'document_id' in ({document_ids}) "
+        vector = _to_vector_literal(query_vector)
 
         with self._get_cursor() as cur:
-            cur.execute(
-                f"SELECT meta, text, embedding <=> %s AS distance FROM {self.table_name}"
-                f" {where_clause}"
-                f" ORDER BY distance LIMIT {top_k}",
-                (json.dumps(query_vector),),
+            self._set_search_params(
+                cur, kwargs.get("ef_search", self.hnsw_ef_search), kwargs.get("probes", self.ivfflat_probes)
             )
+            if document_ids_filter:
+                name = self._prepare(
+                    cur,
+                    f"search_by_vector_filtered_{self.statement_hash}",
+                    SQL_SEARCH_BY_VECTOR_WITH_DOCUMENT_IDS,
+                    "vector, text[], int",
+                )
+                cur.execute(f"EXECUTE {name} (%s, %s, %s)", (vector, list(document_ids_filter), top_k))
+            else:
+                name = self._prepare(
+                    cur, f"search_by_vector_{self.statement_hash}", SQL_SEARCH_BY_VECTOR, "vector, int"
+                )
+                cur.execute(f"EXECUTE {name} (%s, %s)", (vector, top_k))
             docs = []
             score_threshold = float(kwargs.get("score_threshold") or 0.0)
             for record in cur:
@@ -206,9 +283,10 @@ class PGVector(BaseVector):
         with self._get_cursor() as cur:
             document_ids_filter = kwargs.get("document_ids_filter")
             where_clause = ""
+            filter_params: tuple = ()
             if document_ids_filter:
-                document_ids = ", ".join(f"'{id}'" for id in document_ids_filter)
-                where_clause = f" AND meta->>'document_id' in ({document_ids}) "
+                where_clause = " AND meta->>'document_id' = ANY(%s) "
+                filter_params = (list(document_ids_filter),)
             if self.pg_bigm:
                 cur.execute("SET pg_bigm.similarity_limit TO 0.000001")
                 cur.execute(
@@ -217,9 +295,9 @@ class PGVector(BaseVector):
                     WHERE text =%% unistr(%s)
                     {where_clause}
                     ORDER BY score DESC
-                    LIMIT {top_k}""",
+                    LIMIT %s""",
                     # f"'{query}'" is required in order to account for whitespace in query
-                    (f"'{query}'", f"'{query}'"),
+                    (f"'{query}'", f"'{query}'", *filter_params, top_k),
                 )
             else:
                 cur.execute(
@@ -228,9 +306,9 @@ class PGVector(BaseVector):
                     WHERE to_tsvector(text) @@ plainto_tsquery(%s)
                     {where_clause}
                     ORDER BY score DESC
-                    LIMIT {top_k}""",
+                    LIMIT %s""",
                     # f"'{query}'" is required in order to account for whitespace in query
-                    (f"'{query}'", f"'{query}'"),
+                    (f"'{query}'", f"'{query}'", *filter_params, top_k),
                 )
 
             docs = []
@@ -242,6 +320,25 @@ class PGVector(BaseVector):
 
         return docs
 
+    def _prepare(self, cur, name: str, sql: str, arg_types: str) -> str:
+        """Prepare the statement on the connection of the cursor unless it already is, returning its name."""
+        prepared_statements: set[str] = cur.connection.prepared_statements
+        if name not in prepared_statements:
+            if len(prepared_statements) >= MAX_PREPARED_STATEMENTS_PER_CONNECTION:
+                cur.execute("DEALLOCATE ALL")
+                prepared_statements.clear()
+            cur.execute(f"PREPARE {name} ({arg_types}) AS {sql.format(table_name=self.table_name)}")
+            prepared_statements.add(name)
+        return name
+
+    @staticmethod
+    def _set_search_params(cur, ef_search: int | None, probes: int | None):
+        # SET LOCAL only lasts for the transaction, the pooled connection is left unchanged
+        if ef_search:
+            cur.execute(f"SET LOCAL hnsw.ef_search = {int(ef_search)}")
+        if probes:
+            cur.execute(f"SET LOCAL ivfflat.probes = {int(probes)}")
+
     def delete(self):
         with self._get_cursor() as cur:
             cur.execute(f"DROP TABLE IF EXISTS {self.table_name}")
@@ -268,8 +365,11 @@ class PGVector(BaseVector):
 
 class PGVectorFactory(AbstractVectorFactory):
     def init_vector(self, dataset: Dataset, attributes: list, embeddings: Embeddings) -> PGVector:
+        # the search settings of a dataset can be tuned in its index struct, overriding the global ones
+        vector_store: dict = {}
         if dataset.index_struct_dict:
-            class_prefix: str = dataset.index_struct_dict["vector_store"]["class_prefix"]
+            vector_store = dataset.index_struct_dict["vector_store"]
+            class_prefix: str = vector_store["class_prefix"]
             collection_name = class_prefix
         else:
             dataset_id = dataset.id
@@ -287,5 +387,7 @@ class PGVectorFactory(AbstractVectorFactory):
                 min_connection=dify_config.PGVECTOR_MIN_CONNECTION,
                 max_connection=dify_config.PGVECTOR_MAX_CONNECTION,
                 pg_bigm=dify_config.PGVECTOR_PG_BIGM,
+                hnsw_ef_search=vector_store.get("hnsw_ef_search", dify_config.PGVECTOR_HNSW_EF_SEARCH),
+                ivfflat_probes=vector_store.get("ivfflat_probes", dify_config.PGVECTOR_IVFFLAT_PROBES),
             ),
         )
@@ -4,10 +4,10 @@ from contextlib import contextmanager
 from typing import Any
 
 import psycopg2.extras
-import psycopg2.pool
 from pydantic import BaseModel, model_validator
 
 from configs import dify_config
+from core.rag.datasource.vdb.connection_pool import vector_store_pool_registry
 from core.rag.datasource.vdb.vector_base import BaseVector
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
@@ -73,7 +73,9 @@ class VastbaseVector(BaseVector):
         return VectorType.VASTBASE
 
     def _create_connection_pool(self, config: VastbaseVectorConfig):
-        return psycopg2.pool.SimpleConnectionPool(
+        # the pool is shared by all the collections stored on the same server
+        return vector_store_pool_registry.get_psycopg2_pool(
+            f"vastbase:{config.host}:{config.port}/{config.database}",
             config.min_connection,
             config.max_connection,
             host=config.host,
@@ -85,14 +87,13 @@ class VastbaseVector(BaseVector):
 
     @contextmanager
     def _get_cursor(self):
-        conn = self.pool.getconn()
-        cur = conn.cursor()
-        try:
-            yield cur
-        finally:
-            cur.close()
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
             conn.commit()
-            self.pool.putconn(conn)
 
     def create(self, texts: list[Document], embeddings: list[list[float]], **kwargs):
         dimension = len(embeddings[0])
@@ -342,6 +342,17 @@ class QdrantVector(BaseVector):
 
         return len(response) > 0
 
+    def get_existing_ids(self, ids: list[str]) -> set[str]:
+        if not ids:
+            return set()
+        collection_names = {collection.name for collection in self._client.get_collections().collections}
+        if self._collection_name not in collection_names:
+            return set()
+        response = self._client.retrieve(
+            collection_name=self._collection_name, ids=ids, with_payload=False, with_vectors=False
+        )
+        return {str(record.id) for record in response}
+
     def search_by_vector(self, query_vector: list[float], **kwargs: Any) -> list[Document]:
         from qdrant_client.http import models
 
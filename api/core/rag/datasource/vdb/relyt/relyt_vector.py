@@ -3,11 +3,12 @@ import uuid
 from typing import Any
 
 from pydantic import BaseModel, model_validator
-from sqlalchemy import Column, String, Table, create_engine, insert
+from sqlalchemy import Column, String, Table, insert
 from sqlalchemy import text as sql_text
 from sqlalchemy.dialects.postgresql import JSON, TEXT
 from sqlalchemy.orm import Session
 
+from core.rag.datasource.vdb.connection_pool import vector_store_pool_registry
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.embedding_base import Embeddings
@@ -57,7 +58,9 @@ class RelytVector(BaseVector):
         self._url = (
             f"postgresql+psycopg2://{config.user}:{config.password}@{config.host}:{config.port}/{config.database}"
         )
-        self.client = create_engine(self._url)
+        self.client = vector_store_pool_registry.get_engine(
+            f"relyt:{config.host}:{config.port}/{config.database}", self._url
+        )
         self._fields: list[str] = []
         self._group_id = group_id
 
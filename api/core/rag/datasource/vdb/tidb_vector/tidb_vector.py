@@ -4,11 +4,12 @@ from typing import Any
 
 import sqlalchemy
 from pydantic import BaseModel, model_validator
-from sqlalchemy import JSON, TEXT, Column, DateTime, String, Table, create_engine, insert
+from sqlalchemy import JSON, TEXT, Column, DateTime, String, Table, insert
 from sqlalchemy import text as sql_text
 from sqlalchemy.orm import Session, declarative_base
 
 from configs import dify_config
+from core.rag.datasource.vdb.connection_pool import vector_store_pool_registry
 from core.rag.datasource.vdb.field import Field
 from core.rag.datasource.vdb.vector_base import BaseVector
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
@@ -78,7 +79,9 @@ class TiDBVector(BaseVector):
             f"ssl_verify_cert=true&ssl_verify_identity=true&program_name={config.program_name}"
         )
         self._distance_func = distance_func.lower()
-        self._engine = create_engine(self._url)
+        self._engine = vector_store_pool_registry.get_engine(
+            f"tidb_vector:{config.host}:{config.port}/{config.database}", self._url
+        )
         self._orm_base = declarative_base()
         self._dimension = 1536
 
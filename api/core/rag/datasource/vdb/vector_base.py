@@ -26,6 +26,14 @@ class BaseVector(ABC):
     def text_exists(self, id: str) -> bool:
         raise NotImplementedError
 
+    def get_existing_ids(self, ids: list[str]) -> set[str]:
+        """
+        Get which of the ids are already stored, the doc ids `text_exists` checks one at a time.
+
+        Vector stores that can check several ids in one request should override it.
+        """
+        return {id for id in ids if self.text_exists(id)}
+
     @abstractmethod
     def delete_by_ids(self, ids: list[str]):
         raise NotImplementedError
@@ -50,14 +58,12 @@ class BaseVector(ABC):
         raise NotImplementedError
 
     def _filter_duplicate_texts(self, texts: list[Document]) -> list[Document]:
-        for text in texts.copy():
-            if text.metadata and "doc_id" in text.metadata:
-                doc_id = text.metadata["doc_id"]
-                exists_duplicate_node = self.text_exists(doc_id)
-                if exists_duplicate_node:
-                    texts.remove(text)
-
-        return texts
+        existing_ids = self.get_existing_ids(self._get_uuids(texts))
+        return [
+            text
+            for text in texts
+            if not (text.metadata and "doc_id" in text.metadata and text.metadata["doc_id"] in existing_ids)
+        ]
 
     def _get_uuids(self, texts: list[Document]) -> list[str]:
         return [text.metadata["doc_id"] for text in texts if text.metadata and "doc_id" in text.metadata]
@@ -1,8 +1,13 @@
+import concurrent.futures
+import contextlib
 import logging
+import threading
 import time
 from abc import ABC, abstractmethod
+from collections import deque
 from typing import Any
 
+from flask import Flask, current_app, has_app_context
 from sqlalchemy import select
 
 from configs import dify_config
@@ -19,6 +24,24 @@ from models.dataset import Dataset, Whitelist
 
 logger = logging.getLogger(__name__)
 
+# number of doc ids checked for duplicates in one request to the vector store
+DUPLICATE_CHECK_BATCH_SIZE = 1000
+# number of texts embedded and written per batch by `Vector.create`
+CREATE_BATCH_SIZE = 1000
+
+_embedding_semaphores: dict[str, threading.BoundedSemaphore] = {}
+_embedding_semaphores_lock = threading.Lock()
+
+
+def _get_embedding_semaphore(provider: str | None) -> threading.BoundedSemaphore:
+    """Limit the concurrent embedding requests of the process to each provider."""
+    with _embedding_semaphores_lock:
+        semaphore = _embedding_semaphores.get(provider or "")
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(dify_config.VECTOR_CREATE_EMBEDDING_CONCURRENCY_PER_PROVIDER)
+            _embedding_semaphores[provider or ""] = semaphore
+        return semaphore
+
 
 class AbstractVectorFactory(ABC):
     @abstractmethod
@@ -181,21 +204,85 @@ class Vector:
                 raise ValueError(f"Vector store {vector_type} is not supported.")
 
     def create(self, texts: list | None = None, **kwargs):
-        if texts:
-            start = time.time()
-            logger.info("start embedding %s texts %s", len(texts), start)
-            batch_size = 1000
-            total_batches = len(texts) + batch_size - 1
-            for i in range(0, len(texts), batch_size):
-                batch = texts[i : i + batch_size]
-                batch_start = time.time()
-                logger.info("Processing batch %s/%s (%s texts)", i // batch_size + 1, total_batches, len(batch))
-                batch_embeddings = self._embeddings.embed_documents([document.page_content for document in batch])
-                logger.info(
-                    "Embedding batch %s/%s took %s s", i // batch_size + 1, total_batches, time.time() - batch_start
-                )
-                self._vector_processor.create(texts=batch, embeddings=batch_embeddings, **kwargs)
-            logger.info("Embedding %s texts took %s s", len(texts), time.time() - start)
+        if texts and kwargs.get("duplicate_check", False):
+            texts = self._filter_duplicate_texts(texts)
+        if not texts:
+            return
+
+        start_at = time.perf_counter()
+        batches = [texts[i : i + CREATE_BATCH_SIZE] for i in range(0, len(texts), CREATE_BATCH_SIZE)]
+        logger.info("start embedding %s texts in %s batches", len(texts), len(batches))
+        depth = dify_config.VECTOR_CREATE_PIPELINE_DEPTH
+        if depth and len(batches) > 1 and has_app_context():
+            timings = self._create_pipelined(batches, depth, **kwargs)
+        else:
+            timings = {"embed": 0.0, "wait": 0.0, "write": 0.0}
+            for index, batch in enumerate(batches):
+                embeddings, embed_seconds = self._embed_batch(batch)
+                write_start_at = time.perf_counter()
+                self._vector_processor.create(texts=batch, embeddings=embeddings, **kwargs)
+                write_seconds = time.perf_counter() - write_start_at
+                self._log_batch(index, len(batches), len(batch), embed_seconds, embed_seconds, write_seconds)
+                timings["embed"] += embed_seconds
+                timings["wait"] += embed_seconds
+                timings["write"] += write_seconds
+        logger.info(
+            "Embedding %s texts took %.2fs: embedding %.2fs, waiting for embeddings %.2fs, writing %.2fs",
+            len(texts),
+            time.perf_counter() - start_at,
+            timings["embed"],
+            timings["wait"],
+            timings["write"],
+        )
+
+    def _create_pipelined(self, batches: list[list[Document]], depth: int, **kwargs) -> dict[str, float]:
+        """
+        Write the batches in order while the next `depth` batches are embedded by other threads,
+        so the embedding of a batch overlaps the write of the previous one.
+        """
+        timings = {"embed": 0.0, "wait": 0.0, "write": 0.0}
+        flask_app = current_app._get_current_object()  # type: ignore
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=depth, thread_name_prefix="vector_embedding")
+        futures: deque[concurrent.futures.Future[tuple[list[list[float]], float]]] = deque()
+        submitted = 0
+        try:
+            for index, batch in enumerate(batches):
+                # the batch being written plus up to `depth` batches being embedded are held in memory
+                while submitted < len(batches) and len(futures) <= depth:
+                    futures.append(executor.submit(self._embed_batch, batches[submitted], flask_app))
+                    submitted += 1
+                wait_start_at = time.perf_counter()
+                embeddings, embed_seconds = futures.popleft().result()
+                write_start_at = time.perf_counter()
+                self._vector_processor.create(texts=batch, embeddings=embeddings, **kwargs)
+                write_seconds = time.perf_counter() - write_start_at
+                wait_seconds = write_start_at - wait_start_at
+                self._log_batch(index, len(batches), len(batch), embed_seconds, wait_seconds, write_seconds)
+                timings["embed"] += embed_seconds
+                timings["wait"] += wait_seconds
+                timings["write"] += write_seconds
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return timings
+
+    def _embed_batch(self, batch: list[Document], flask_app: Flask | None = None) -> tuple[list[list[float]], float]:
+        with flask_app.app_context() if flask_app else contextlib.nullcontext():
+            with _get_embedding_semaphore(self._dataset.embedding_model_provider):
+                start_at = time.perf_counter()
+                embeddings = self._embeddings.embed_documents([document.page_content for document in batch])
+                return embeddings, time.perf_counter() - start_at
+
+    @staticmethod
+    def _log_batch(index: int, total: int, size: int, embed_seconds: float, wait_seconds: float, write_seconds: float):
+        logger.info(
+            "Batch %s/%s (%s texts): embedding %.2fs, waited %.2fs for it, writing %.2fs",
+            index + 1,
+            total,
+            size,
+            embed_seconds,
+            wait_seconds,
+            write_seconds,
+        )
 
     def add_texts(self, documents: list[Document], **kwargs):
         if kwargs.get("duplicate_check", False):
@@ -239,16 +326,13 @@ class Vector:
         return CacheEmbedding(embedding_model)
 
     def _filter_duplicate_texts(self, texts: list[Document]) -> list[Document]:
-        for text in texts.copy():
-            if text.metadata is None:
-                continue
-            doc_id = text.metadata["doc_id"]
-            if doc_id:
-                exists_duplicate_node = self.text_exists(doc_id)
-                if exists_duplicate_node:
-                    texts.remove(text)
-
-        return texts
+        doc_ids = [text.metadata["doc_id"] for text in texts if text.metadata and text.metadata.get("doc_id")]
+        existing_ids: set[str] = set()
+        for i in range(0, len(doc_ids), DUPLICATE_CHECK_BATCH_SIZE):
+            existing_ids |= self._vector_processor.get_existing_ids(doc_ids[i : i + DUPLICATE_CHECK_BATCH_SIZE])
+        if not existing_ids:
+            return texts
+        return [text for text in texts if not (text.metadata and text.metadata.get("doc_id") in existing_ids)]
 
     def __getattr__(self, name):
         if self._vector_processor is not None:
@@ -1,8 +1,11 @@
-import base64
 import logging
+import threading
 from typing import Any, cast
 
 import numpy as np
+from cachetools import TTLCache
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 
 from configs import dify_config
@@ -18,33 +21,47 @@ from models.dataset import Embedding
 
 logger = logging.getLogger(__name__)
 
+# Hot queries (FAQ-style chat apps) are served from this process-wide cache without touching redis.
+# It is shared by every tenant, so its size is a process-level setting.
+_query_embedding_local_cache: TTLCache | None = (
+    TTLCache(
+        maxsize=dify_config.EMBEDDING_QUERY_CACHE_LOCAL_SIZE,
+        ttl=dify_config.EMBEDDING_QUERY_CACHE_LOCAL_TTL,
+    )
+    if dify_config.EMBEDDING_QUERY_CACHE_LOCAL_SIZE > 0
+    else None
+)
+_query_embedding_local_cache_lock = threading.Lock()
+
 
 class CacheEmbedding(Embeddings):
     def __init__(self, model_instance: ModelInstance, user: str | None = None):
         self._model_instance = model_instance
         self._user = user
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
         """Embed search docs in batches of 10."""
         # use doc embedding cache or store if not exists
         text_embeddings: list[Any] = [None for _ in range(len(texts))]
+        text_hashes = [helper.generate_text_hash(text) for text in texts]
+        cached_embeddings = self._load_cached_embeddings(set(text_hashes))
         embedding_queue_indices = []
-        for i, text in enumerate(texts):
-            hash = helper.generate_text_hash(text)
-            embedding = (
-                db.session.query(Embedding)
-                .filter_by(
-                    model_name=self._model_instance.model, hash=hash, provider_name=self._model_instance.provider
-                )
-                .first()
-            )
-            if embedding:
-                text_embeddings[i] = embedding.get_embedding()
+        for i, hash in enumerate(text_hashes):
+            if hash in cached_embeddings:
+                text_embeddings[i] = cached_embeddings[hash]
             else:
                 embedding_queue_indices.append(i)
+        self.cache_hits += len(texts) - len(embedding_queue_indices)
+        self.cache_misses += len(embedding_queue_indices)
+        logger.debug(
+            "Embedding cache lookup for %s texts: %s hits, %s misses",
+            len(texts),
+            len(texts) - len(embedding_queue_indices),
+            len(embedding_queue_indices),
+        )
         if embedding_queue_indices:
-            embedding_queue_texts = [texts[i] for i in embedding_queue_indices]
-            embedding_queue_embeddings = []
             try:
                 model_type_instance = cast(TextEmbeddingModel, self._model_instance.model_type_instance)
                 model_schema = model_type_instance.get_model_schema(
@@ -55,14 +72,16 @@ class CacheEmbedding(Embeddings):
                     if model_schema and ModelPropertyKey.MAX_CHUNKS in model_schema.model_properties
                     else 1
                 )
-                for i in range(0, len(embedding_queue_texts), max_chunks):
-                    batch_texts = embedding_queue_texts[i : i + max_chunks]
+                new_embeddings: dict[str, list[float]] = {}
+                for i in range(0, len(embedding_queue_indices), max_chunks):
+                    batch_indices = embedding_queue_indices[i : i + max_chunks]
+                    batch_texts = [texts[index] for index in batch_indices]
 
                     embedding_result = self._model_instance.invoke_text_embedding(
                         texts=batch_texts, user=self._user, input_type=EmbeddingInputType.DOCUMENT
                     )
 
-                    for vector in embedding_result.embeddings:
+                    for index, vector in zip(batch_indices, embedding_result.embeddings):
                         try:
                             # FIXME: type ignore for numpy here
                             normalized_embedding = (vector / np.linalg.norm(vector)).tolist()  # type: ignore
@@ -71,28 +90,11 @@ class CacheEmbedding(Embeddings):
                                 # for issue #11827  float values are not json compliant
                                 logger.warning("Normalized embedding is nan: %s", normalized_embedding)
                                 continue
-                            embedding_queue_embeddings.append(normalized_embedding)
-                        except IntegrityError:
-                            db.session.rollback()
+                            text_embeddings[index] = normalized_embedding
+                            new_embeddings.setdefault(text_hashes[index], normalized_embedding)
                         except Exception:
                             logger.exception("Failed transform embedding")
-                cache_embeddings = []
-                try:
-                    for i, n_embedding in zip(embedding_queue_indices, embedding_queue_embeddings):
-                        text_embeddings[i] = n_embedding
-                        hash = helper.generate_text_hash(texts[i])
-                        if hash not in cache_embeddings:
-                            embedding_cache = Embedding(
-                                model_name=self._model_instance.model,
-                                hash=hash,
-                                provider_name=self._model_instance.provider,
-                            )
-                            embedding_cache.set_embedding(n_embedding)
-                            db.session.add(embedding_cache)
-                            cache_embeddings.append(hash)
-                    db.session.commit()
-                except IntegrityError:
-                    db.session.rollback()
+                self._store_cached_embeddings(new_embeddings)
             except Exception as ex:
                 db.session.rollback()
                 logger.exception("Failed to embed documents")
@@ -100,16 +102,74 @@ class CacheEmbedding(Embeddings):
 
         return text_embeddings
 
+    def _load_cached_embeddings(self, hashes: set[str]) -> dict[str, list[float]]:
+        """Fetch cached embeddings for the given text hashes, one `IN (...)` query per batch."""
+        cached_embeddings: dict[str, list[float]] = {}
+        hash_list = list(hashes)
+        batch_size = dify_config.EMBEDDING_CACHE_LOOKUP_BATCH_SIZE
+        for i in range(0, len(hash_list), batch_size):
+            batch_hashes = hash_list[i : i + batch_size]
+            embeddings = db.session.scalars(
+                select(Embedding).where(
+                    Embedding.model_name == self._model_instance.model,
+                    Embedding.provider_name == self._model_instance.provider,
+                    Embedding.hash.in_(batch_hashes),
+                )
+            ).all()
+            for embedding in embeddings:
+                cached_embeddings[embedding.hash] = embedding.get_embedding()
+        return cached_embeddings
+
+    def _store_cached_embeddings(self, embeddings: dict[str, list[float]]):
+        """Bulk insert new embeddings into the cache, ignoring rows written concurrently by other workers."""
+        if not embeddings:
+            return
+        rows = []
+        for hash, n_embedding in embeddings.items():
+            embedding_cache = Embedding(
+                model_name=self._model_instance.model,
+                hash=hash,
+                provider_name=self._model_instance.provider,
+            )
+            embedding_cache.set_embedding(n_embedding)
+            rows.append(
+                {
+                    "model_name": embedding_cache.model_name,
+                    "hash": embedding_cache.hash,
+                    "provider_name": embedding_cache.provider_name,
+                    "embedding": embedding_cache.embedding,
+                }
+            )
+        batch_size = dify_config.EMBEDDING_CACHE_LOOKUP_BATCH_SIZE
+        try:
+            for i in range(0, len(rows), batch_size):
+                stmt = insert(Embedding).values(rows[i : i + batch_size])
+                stmt = stmt.on_conflict_do_nothing(index_elements=["model_name", "hash", "provider_name"])
+                db.session.execute(stmt)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+
     def embed_query(self, text: str) -> list[float]:
         """Embed query text."""
-        # use doc embedding cache or store if not exists
+        # use the in-process cache first, then redis, then the embedding model
         hash = helper.generate_text_hash(text)
-        embedding_cache_key = f"{self._model_instance.provider}_{self._model_instance.model}_{hash}"
-        embedding = redis_client.get(embedding_cache_key)
+        embedding_cache_key = f"{self._model_instance.provider}_{self._model_instance.model}_{hash}_f32"
+        if _query_embedding_local_cache is not None:
+            with _query_embedding_local_cache_lock:
+                local_embedding = _query_embedding_local_cache.get(embedding_cache_key)
+            if local_embedding is not None:
+                return local_embedding.tolist()
+
+        # fetch and refresh the ttl in a single round trip
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.get(embedding_cache_key)
+        pipeline.expire(embedding_cache_key, dify_config.EMBEDDING_QUERY_CACHE_TTL)
+        embedding, _ = pipeline.execute()
         if embedding:
-            redis_client.expire(embedding_cache_key, 600)
-            decoded_embedding = np.frombuffer(base64.b64decode(embedding), dtype="float")
-            return [float(x) for x in decoded_embedding]
+            decoded_embedding = np.frombuffer(embedding, dtype="<f4")
+            self._set_local_query_embedding(embedding_cache_key, decoded_embedding)
+            return decoded_embedding.tolist()
         try:
             embedding_result = self._model_instance.invoke_text_embedding(
                 texts=[text], user=self._user, input_type=EmbeddingInputType.QUERY
@@ -126,14 +186,10 @@ class CacheEmbedding(Embeddings):
             raise ex
 
         try:
-            # encode embedding to base64
-            embedding_vector = np.array(embedding_results)
-            vector_bytes = embedding_vector.tobytes()
-            # Transform to Base64
-            encoded_vector = base64.b64encode(vector_bytes)
-            # Transform to string
-            encoded_str = encoded_vector.decode("utf-8")
-            redis_client.setex(embedding_cache_key, 600, encoded_str)
+            # store the raw float32 bytes, no base64 round trip needed
+            embedding_vector = np.asarray(embedding_results, dtype="<f4")
+            redis_client.setex(embedding_cache_key, dify_config.EMBEDDING_QUERY_CACHE_TTL, embedding_vector.tobytes())
+            self._set_local_query_embedding(embedding_cache_key, embedding_vector)
         except Exception as ex:
             if dify_config.DEBUG:
                 logger.exception(
@@ -141,4 +197,12 @@ class CacheEmbedding(Embeddings):
                 )
             raise ex
 
-        return embedding_results  # type: ignore
+        # return the cached float32 values, so that the result does not depend on whether the query was cached
+        return embedding_vector.tolist()
+
+    @staticmethod
+    def _set_local_query_embedding(key: str, embedding: np.ndarray):
+        if _query_embedding_local_cache is None:
+            return
+        with _query_embedding_local_cache_lock:
+            _query_embedding_local_cache[key] = embedding
@@ -0,0 +1,81 @@
+from collections import Counter
+from collections.abc import Collection, Sequence
+
+import numpy as np
+
+
+def keyword_tfidf_similarities(
+    query_keywords: Collection[str],
+    documents_keywords: Sequence[Collection[str]],
+    total_documents: int | None = None,
+) -> list[float]:
+    """
+    Calculate the TF-IDF cosine similarity between the query keywords and each document's keywords.
+
+    The document keywords are laid out once as a sparse (document, term, count) matrix and every
+    similarity is computed with batched NumPy operations over its non-zero entries.
+
+    :param query_keywords: keywords extracted from the query
+    :param documents_keywords: keywords extracted from each document
+    :param total_documents: number of documents used for IDF, defaults to len(documents_keywords)
+    :return: one similarity per entry of documents_keywords
+    """
+    document_count = len(documents_keywords)
+    if document_count == 0:
+        return []
+    if total_documents is None:
+        total_documents = document_count
+
+    vocabulary: dict[str, int] = {}
+    rows: list[int] = []
+    cols: list[int] = []
+    for row, document_keywords in enumerate(documents_keywords):
+        for keyword in document_keywords:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(keyword, len(vocabulary)))
+    vocabulary_size = len(vocabulary)
+    if vocabulary_size == 0:
+        return [0.0] * document_count
+
+    # collapse repeated (document, term) pairs into term counts (TF)
+    flat_index = np.asarray(rows, dtype=np.int64) * vocabulary_size + np.asarray(cols, dtype=np.int64)
+    unique_index, term_counts = np.unique(flat_index, return_counts=True)
+    term_rows, term_cols = np.divmod(unique_index, vocabulary_size)
+
+    # IDF over the documents containing each term
+    document_frequency = np.bincount(term_cols, minlength=vocabulary_size)
+    idf = np.log((1 + total_documents) / (1 + document_frequency)) + 1
+    document_weights = term_counts * idf[term_cols]
+
+    query_weights = np.zeros(vocabulary_size)
+    for keyword, count in Counter(query_keywords).items():
+        index = vocabulary.get(keyword)
+        if index is not None:
+            query_weights[index] = count * idf[index]
+
+    numerators = np.bincount(term_rows, weights=document_weights * query_weights[term_cols], minlength=document_count)
+    document_norms = np.sqrt(np.bincount(term_rows, weights=document_weights**2, minlength=document_count))
+    denominators = document_norms * np.linalg.norm(query_weights)
+    similarities = np.divide(
+        numerators, denominators, out=np.zeros(document_count, dtype=np.float64), where=denominators > 0
+    )
+    return similarities.tolist()
+
+
+def cosine_similarities(query_vector: Sequence[float], document_vectors: Sequence[Sequence[float]]) -> list[float]:
+    """
+    Calculate the cosine similarity between the query vector and each document vector in one matrix product.
+
+    :param query_vector: query embedding
+    :param document_vectors: document embeddings, all with the same dimension as the query
+    :return: one similarity per document vector, 0.0 for zero-norm vectors
+    """
+    if len(document_vectors) == 0:
+        return []
+    query = np.asarray(query_vector, dtype=np.float64)
+    matrix = np.asarray(document_vectors, dtype=np.float64)
+    denominators = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+    similarities = np.divide(
+        matrix @ query, denominators, out=np.zeros(len(matrix), dtype=np.float64), where=denominators > 0
+    )
+    return similarities.tolist()
@@ -1,8 +1,3 @@
-import math
-from collections import Counter
-
-import numpy as np
-
 from core.model_manager import ModelManager
 from core.model_runtime.entities.model_entities import ModelType
 from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
@@ -10,6 +5,7 @@ from core.rag.embedding.cached_embedding import CacheEmbedding
 from core.rag.models.document import Document
 from core.rag.rerank.entity.weight import VectorSetting, Weights
 from core.rag.rerank.rerank_base import BaseRerankRunner
+from core.rag.rerank.scoring import cosine_similarities, keyword_tfidf_similarities
 
 
 class WeightRerankRunner(BaseRerankRunner):
@@ -87,64 +83,7 @@ class WeightRerankRunner(BaseRerankRunner):
                 document.metadata["keywords"] = document_keywords
                 documents_keywords.append(document_keywords)
 
-        # Counter query keywords(TF)
-        query_keyword_counts = Counter(query_keywords)
-
-        # total documents
-        total_documents = len(documents)
-
-        # calculate all documents' keywords IDF
-        all_keywords = set()
-        for document_keywords in documents_keywords:
-            all_keywords.update(document_keywords)
-
-        keyword_idf = {}
-        for keyword in all_keywords:
-            # calculate include query keywords' documents
-            doc_count_containing_keyword = sum(1 for doc_keywords in documents_keywords if keyword in doc_keywords)
-            # IDF
-            keyword_idf[keyword] = math.log((1 + total_documents) / (1 + doc_count_containing_keyword)) + 1
-
-        query_tfidf = {}
-
-        for keyword, count in query_keyword_counts.items():
-            tf = count
-            idf = keyword_idf.get(keyword, 0)
-            query_tfidf[keyword] = tf * idf
-
-        # calculate all documents' TF-IDF
-        documents_tfidf = []
-        for document_keywords in documents_keywords:
-            document_keyword_counts = Counter(document_keywords)
-            document_tfidf = {}
-            for keyword, count in document_keyword_counts.items():
-                tf = count
-                idf = keyword_idf.get(keyword, 0)
-                document_tfidf[keyword] = tf * idf
-            documents_tfidf.append(document_tfidf)
-
-        def cosine_similarity(vec1, vec2):
-            intersection = set(vec1.keys()) & set(vec2.keys())
-            numerator = sum(vec1[x] * vec2[x] for x in intersection)
-
-            sum1 = sum(vec1[x] ** 2 for x in vec1)
-            sum2 = sum(vec2[x] ** 2 for x in vec2)
-            denominator = math.sqrt(sum1) * math.sqrt(sum2)
-
-            if not denominator:
-                return 0.0
-            else:
-                return float(numerator) / denominator
-
-        similarities = []
-        for document_tfidf in documents_tfidf:
-            similarity = cosine_similarity(query_tfidf, document_tfidf)
-            similarities.append(similarity)
-
-        # for idx, similarity in enumerate(similarities):
-        #     print(f"Document {idx + 1} similarity: {similarity}")
-
-        return similarities
+        return keyword_tfidf_similarities(query_keywords, documents_keywords, total_documents=len(documents))
 
     def _calculate_cosine(
         self, tenant_id: str, query: str, documents: list[Document], vector_setting: VectorSetting
@@ -156,8 +95,6 @@ class WeightRerankRunner(BaseRerankRunner):
 
         :return:
         """
-        query_vector_scores = []
-
         model_manager = ModelManager()
 
         embedding_model = model_manager.get_model_instance(
@@ -168,24 +105,16 @@ class WeightRerankRunner(BaseRerankRunner):
         )
         cache_embedding = CacheEmbedding(embedding_model)
         query_vector = cache_embedding.embed_query(query)
-        for document in documents:
-            # calculate cosine similarity
-            if document.metadata and "score" in document.metadata:
-                query_vector_scores.append(document.metadata["score"])
-            else:
-                # transform to NumPy
-                vec1 = np.array(query_vector)
-                vec2 = np.array(document.vector)
-
-                # calculate dot product
-                dot_product = np.dot(vec1, vec2)
-
-                # calculate norm
-                norm_vec1 = np.linalg.norm(vec1)
-                norm_vec2 = np.linalg.norm(vec2)
-
-                # calculate cosine similarity
-                cosine_sim = dot_product / (norm_vec1 * norm_vec2)
-                query_vector_scores.append(cosine_sim)
+        # score the documents without a vector store score in one batch
+        unscored_indices = [
+            i for i, document in enumerate(documents) if not (document.metadata and "score" in document.metadata)
+        ]
+        cosine_scores = cosine_similarities(query_vector, [documents[i].vector for i in unscored_indices])
+        query_vector_scores = [
+            document.metadata["score"] if document.metadata and "score" in document.metadata else 0.0
+            for document in documents
+        ]
+        for i, score in zip(unscored_indices, cosine_scores):
+            query_vector_scores[i] = score
 
         return query_vector_scores
@@ -0,0 +1,101 @@
+import concurrent.futures
+import logging
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from configs import dify_config
+
+logger = logging.getLogger(__name__)
+
+
+class RetrievalExecutor:
+    """
+    Process-wide bounded thread pool shared by all retrieval requests.
+
+    Each tenant may only have a limited number of tasks queued or running at once, so a single
+    busy tenant cannot starve the others; callers of that tenant wait for a slot instead.
+    Tasks still queued when the caller stops waiting are cancelled.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_tasks_per_tenant: int):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix=name)
+        self._max_tasks_per_tenant = max(max_tasks_per_tenant, 1)
+        self._condition = threading.Condition()
+        self._tenant_task_counts: dict[str, int] = {}
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._cancelled = 0
+
+    def submit(self, tenant_id: str, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        with self._condition:
+            while self._tenant_task_counts.get(tenant_id, 0) >= self._max_tasks_per_tenant:
+                self._condition.wait()
+            self._tenant_task_counts[tenant_id] = self._tenant_task_counts.get(tenant_id, 0) + 1
+            self._queued += 1
+
+        def run() -> Any:
+            with self._condition:
+                self._queued -= 1
+                self._active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._condition:
+                    self._active -= 1
+                    self._completed += 1
+
+        def on_done(future: Future):
+            with self._condition:
+                if future.cancelled():
+                    self._queued -= 1
+                    self._cancelled += 1
+                self._tenant_task_counts[tenant_id] -= 1
+                if not self._tenant_task_counts[tenant_id]:
+                    del self._tenant_task_counts[tenant_id]
+                self._condition.notify_all()
+
+        future = self._executor.submit(run)
+        future.add_done_callback(on_done)
+        return future
+
+    def wait(self, futures: Iterable[Future], timeout: float | None = None) -> bool:
+        """
+        Wait for the futures to complete and cancel the ones that have not started when the timeout expires.
+
+        :return: True if all futures completed in time
+        """
+        _, not_done = concurrent.futures.wait(futures, timeout=timeout, return_when=concurrent.futures.ALL_COMPLETED)
+        if not not_done:
+            return True
+        for future in not_done:
+            future.cancel()
+        logger.warning("%s: %s retrieval tasks did not finish within %ss", self.name, len(not_done), timeout)
+        return False
+
+    def stats(self) -> dict[str, int]:
+        with self._condition:
+            return {
+                "queued": self._queued,
+                "active": self._active,
+                "completed": self._completed,
+                "cancelled": self._cancelled,
+                "tenants": len(self._tenant_task_counts),
+            }
+
+
+# Dataset-level fan-out tasks submit search tasks and wait for them, so the two levels use
+# separate pools to avoid exhausting the workers with tasks that wait on each other.
+retrieval_dataset_executor = RetrievalExecutor(
+    name="retrieval_dataset",
+    max_workers=dify_config.RETRIEVAL_DATASET_EXECUTORS,
+    max_tasks_per_tenant=dify_config.RETRIEVAL_EXECUTOR_MAX_TASKS_PER_TENANT,
+)
+retrieval_search_executor = RetrievalExecutor(
+    name="retrieval_search",
+    max_workers=dify_config.RETRIEVAL_SEARCH_EXECUTORS,
+    max_tasks_per_tenant=dify_config.RETRIEVAL_EXECUTOR_MAX_TASKS_PER_TENANT,
+)
@@ -36,7 +36,7 @@ class EnhanceRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
             if embedding_model_instance:
                 return embedding_model_instance.get_text_embedding_num_tokens(texts=texts)
             else:
-                return [GPT2Tokenizer.get_num_tokens(text) for text in texts]
+                return GPT2Tokenizer.get_num_tokens_batch(texts)
 
         def _character_encoder(texts: list[str]) -> list[int]:
             if not texts:
@@ -4,6 +4,7 @@ import copy
 import logging
 import re
 from abc import ABC, abstractmethod
+from collections import deque
 from collections.abc import Callable, Collection, Iterable, Sequence, Set
 from dataclasses import dataclass
 from typing import (
@@ -65,6 +66,7 @@ class TextSplitter(BaseDocumentTransformer, ABC):
         self._length_function = length_function
         self._keep_separator = keep_separator
         self._add_start_index = add_start_index
+        self._separator_lengths: dict[str, int] = {}
 
     @abstractmethod
     def split_text(self, text: str) -> list[str]:
@@ -93,7 +95,7 @@ class TextSplitter(BaseDocumentTransformer, ABC):
             metadatas.append(doc.metadata or {})
         return self.create_documents(texts, metadatas=metadatas)
 
-    def _join_docs(self, docs: list[str], separator: str) -> str | None:
+    def _join_docs(self, docs: Iterable[str], separator: str) -> str | None:
         text = separator.join(docs)
         text = text.strip()
         if text == "":
@@ -101,21 +103,30 @@ class TextSplitter(BaseDocumentTransformer, ABC):
         else:
             return text
 
+    def _separator_length(self, separator: str) -> int:
+        separator_len = self._separator_lengths.get(separator)
+        if separator_len is None:
+            separator_len = self._length_function([separator])[0]
+            self._separator_lengths[separator] = separator_len
+        return separator_len
+
     def _merge_splits(self, splits: Iterable[str], separator: str, lengths: list[int]) -> list[str]:
         # We now want to combine these smaller pieces into medium size
         # chunks to send to the LLM.
-        separator_len = self._length_function([separator])[0]
+        separator_len = self._separator_length(separator)
 
         docs = []
-        current_doc: list[str] = []
+        # the pieces of the current chunk, with their already computed lengths
+        current_doc: deque[str] = deque()
+        current_lengths: deque[int] = deque()
         total = 0
         for d, _len in zip(splits, lengths):
-            if total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size:
+            if total + _len + (separator_len if current_doc else 0) > self._chunk_size:
                 if total > self._chunk_size:
                     logger.warning(
                         "Created a chunk of size %s, which is longer than the specified %s", total, self._chunk_size
                     )
-                if len(current_doc) > 0:
+                if current_doc:
                     doc = self._join_docs(current_doc, separator)
                     if doc is not None:
                         docs.append(doc)
@@ -123,13 +134,12 @@ class TextSplitter(BaseDocumentTransformer, ABC):
                     # - we have a larger chunk than in the chunk overlap
                     # - or if we still have any chunks and the length is long
                     while total > self._chunk_overlap or (
-                        total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size and total > 0
+                        total + _len + (separator_len if current_doc else 0) > self._chunk_size and total > 0
                     ):
-                        total -= self._length_function([current_doc[0]])[0] + (
-                            separator_len if len(current_doc) > 1 else 0
-                        )
-                        current_doc = current_doc[1:]
+                        total -= current_lengths.popleft() + (separator_len if len(current_doc) > 1 else 0)
+                        current_doc.popleft()
             current_doc.append(d)
+            current_lengths.append(_len)
             total += _len + (separator_len if len(current_doc) > 1 else 0)
         doc = self._join_docs(current_doc, separator)
         if doc is not None:
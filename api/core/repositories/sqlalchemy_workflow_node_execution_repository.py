@@ -15,6 +15,7 @@ from sqlalchemy.orm import sessionmaker
 from tenacity import before_sleep_log, retry, retry_if_exception, stop_after_attempt
 
 from core.model_runtime.utils.encoders import jsonable_encoder
+from core.repositories.workflow_node_execution_payload_offloader import WorkflowNodeExecutionPayloadOffloader
 from core.workflow.entities.workflow_node_execution import (
     WorkflowNodeExecution,
     WorkflowNodeExecutionMetadataKey,
@@ -94,6 +95,9 @@ class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository)
         # Key: node_execution_id, Value: WorkflowNodeExecution (DB model)
         self._node_execution_cache: dict[str, WorkflowNodeExecutionModel] = {}
 
+        # Large payloads are written to the storage in the hybrid storage mode
+        self._payload_offloader = WorkflowNodeExecutionPayloadOffloader.from_config()
+
     def _to_domain_model(self, db_model: WorkflowNodeExecutionModel) -> WorkflowNodeExecution:
         """
         Convert a database model to a domain model.
@@ -188,6 +192,8 @@ class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository)
         db_model.created_by_role = self._creator_user_role
         db_model.created_by = self._creator_user_id
         db_model.finished_at = domain_model.finished_at
+        if self._payload_offloader is not None:
+            self._payload_offloader.offload(db_model)
         return db_model
 
     def _is_duplicate_key_error(self, exception: BaseException) -> bool:
@@ -0,0 +1,125 @@
+"""
+Offloading of large workflow node execution payloads to the storage.
+
+With `WORKFLOW_NODE_EXECUTION_STORAGE=hybrid`, the inputs, process data and outputs of a node
+execution that are larger than `WORKFLOW_NODE_EXECUTION_OFFLOAD_THRESHOLD` bytes are written
+zstd-compressed to the storage instead of the database. The row keeps the storage key of each
+offloaded payload and a preview of it with the same keys and truncated values, and the model loads
+the payload from the storage the first time it is read.
+"""
+
+import hashlib
+import json
+import logging
+from collections.abc import Iterable
+from typing import Any
+
+import zstandard
+
+from configs import dify_config
+from extensions.ext_storage import storage
+from models import WorkflowNodeExecutionModel
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_FIELDS = ("inputs", "process_data", "outputs")
+
+
+class WorkflowNodeExecutionPayloadOffloader:
+    """
+    Moves the large payloads of node execution models to the storage before they are written.
+
+    An execution is saved several times while it runs, so the digest of each uploaded payload is
+    kept and a payload that has not changed since the last save is not uploaded again.
+    """
+
+    def __init__(self, threshold: int, preview_length: int):
+        self._threshold = threshold
+        self._preview_length = preview_length
+        self._compressor = zstandard.ZstdCompressor()
+        self._digests: dict[str, str] = {}
+
+    @classmethod
+    def from_config(cls) -> "WorkflowNodeExecutionPayloadOffloader | None":
+        """Get an offloader if payloads are offloaded in the configured storage mode, None otherwise."""
+        if dify_config.WORKFLOW_NODE_EXECUTION_STORAGE != "hybrid":
+            return None
+        return cls(
+            threshold=dify_config.WORKFLOW_NODE_EXECUTION_OFFLOAD_THRESHOLD,
+            preview_length=dify_config.WORKFLOW_NODE_EXECUTION_PREVIEW_LENGTH,
+        )
+
+    @staticmethod
+    def storage_key(tenant_id: str, execution_id: str, field: str) -> str:
+        return f"workflow_node_executions/{tenant_id}/{execution_id}/{field}.json.zst"
+
+    def offload(self, db_model: WorkflowNodeExecutionModel):
+        """
+        Offload the payloads of the model that are above the threshold.
+
+        The pointer and preview columns are always set, so that a model saved over an existing row
+        does not keep the pointers of payloads that are no longer offloaded. A payload that cannot be
+        uploaded is kept in the model.
+        """
+        storage_keys: dict[str, str] = {}
+        previews: dict[str, dict[str, Any]] = {}
+        for field in PAYLOAD_FIELDS:
+            value: str | None = getattr(db_model, field)
+            # a string has at least as many bytes as characters, so short ones are not encoded
+            if value is None or len(value) <= self._threshold:
+                continue
+            data = value.encode("utf-8")
+            if len(data) <= self._threshold:
+                continue
+
+            storage_key = self.storage_key(db_model.tenant_id, db_model.id, field)
+            digest = hashlib.sha256(data).hexdigest()
+            if self._digests.get(storage_key) != digest:
+                try:
+                    storage.save(storage_key, self._compressor.compress(data))
+                except Exception:
+                    # the payload stays in the row, so a storage outage does not fail the workflow
+                    logger.exception("Failed to offload %s of workflow node execution %s", field, db_model.id)
+                    self._digests.pop(storage_key, None)
+                    continue
+                self._digests[storage_key] = digest
+                logger.debug("Offloaded %s bytes of %s of workflow node execution %s", len(data), field, db_model.id)
+
+            storage_keys[field] = storage_key
+            previews[field] = self.preview(value)
+            setattr(db_model, field, None)
+
+        db_model.payload_storage_keys = json.dumps(storage_keys) if storage_keys else None
+        db_model.payload_preview = json.dumps(previews) if previews else None
+
+    def preview(self, value: str) -> dict[str, Any]:
+        """
+        Get the preview of a JSON object payload: its keys in order with their values, until the preview
+        length is used up. Strings are truncated to the remaining length and other values that do not fit
+        are replaced by their truncated JSON text.
+        """
+        payload = json.loads(value)
+        if not isinstance(payload, dict):
+            return {}
+        preview: dict[str, Any] = {}
+        remaining = self._preview_length
+        for key, item in payload.items():
+            if remaining <= 0:
+                break
+            if isinstance(item, str):
+                preview[key] = item[:remaining]
+                remaining -= len(item)
+                continue
+            text = json.dumps(item, ensure_ascii=False)
+            preview[key] = item if len(text) <= remaining else text[:remaining]
+            remaining -= len(text)
+        return preview
+
+
+def delete_offloaded_payloads(storage_keys: Iterable[str]):
+    """Delete offloaded payloads from the storage, logging the ones that cannot be deleted."""
+    for storage_key in storage_keys:
+        try:
+            storage.delete(storage_key)
+        except Exception:
+            logger.exception("Failed to delete offloaded workflow node execution payload %s", storage_key)
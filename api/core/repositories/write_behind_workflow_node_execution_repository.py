@@ -0,0 +1,316 @@
+"""
+Write-behind implementation of the WorkflowNodeExecutionRepository.
+
+Saves are queued in memory and written to the database by a background thread in batched
+multi-row upserts, so node state transitions no longer block the thread running the workflow.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from itertools import chain, islice
+from typing import Any, Union
+
+from sqlalchemy import and_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from configs import dify_config
+from core.repositories.sqlalchemy_workflow_node_execution_repository import SQLAlchemyWorkflowNodeExecutionRepository
+from core.workflow.entities.workflow_node_execution import WorkflowNodeExecution
+from core.workflow.repositories.workflow_node_execution_repository import OrderConfig
+from libs.uuid_utils import uuidv7
+from models import Account, EndUser, WorkflowNodeExecutionModel, WorkflowNodeExecutionTriggeredFrom
+
+logger = logging.getLogger(__name__)
+
+_COLUMN_KEYS = [column.key for column in WorkflowNodeExecutionModel.__table__.columns]
+
+
+@dataclass
+class PendingNodeExecutionWrite:
+    owner: object
+    session_factory: sessionmaker
+    row: dict[str, Any]
+    execution: WorkflowNodeExecution
+    db_model: WorkflowNodeExecutionModel
+    attempts: int = 0
+
+    @property
+    def id(self) -> str:
+        return self.row["id"]
+
+
+class WorkflowNodeExecutionWriter:
+    """
+    Process-wide background writer of workflow node executions.
+
+    Pending writes are keyed by execution id, so several updates of one execution made before
+    it is written are coalesced into a single row. Writes are flushed in order by one thread,
+    so an update is never overwritten by an older one.
+    """
+
+    def __init__(self, batch_size: int, interval: float, max_pending: int, max_attempts: int = 3):
+        self._batch_size = batch_size
+        self._interval = interval
+        self._max_pending = max_pending
+        self._max_attempts = max_attempts
+        self._condition = threading.Condition()
+        self._pending: dict[str, PendingNodeExecutionWrite] = {}
+        self._in_flight: dict[str, PendingNodeExecutionWrite] = {}
+        self._flush_requested = False
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+        self._saves = 0
+        self._coalesced = 0
+        self._written = 0
+        self._batches = 0
+        self._dropped = 0
+
+    def enqueue(self, write: PendingNodeExecutionWrite):
+        """Queue a write, blocking while the queue is full."""
+        with self._condition:
+            self._ensure_started()
+            while write.id not in self._pending and len(self._pending) >= self._max_pending:
+                self._flush_requested = True
+                self._condition.notify_all()
+                self._condition.wait()
+            self._saves += 1
+            if write.id in self._pending:
+                self._coalesced += 1
+            self._pending[write.id] = write
+            if len(self._pending) >= self._batch_size:
+                self._condition.notify_all()
+
+    def flush(self, owner: object | None = None, timeout: float | None = None) -> bool:
+        """
+        Write the pending writes now and wait until they are persisted.
+
+        :param owner: only wait for the writes of this owner, None to wait for all writes
+        :param timeout: maximum number of seconds to wait, None to wait indefinitely
+        :return: True if the writes are persisted or dropped after failing, False on timeout
+        """
+
+        def is_flushed() -> bool:
+            writes = chain(self._pending.values(), self._in_flight.values())
+            if owner is None:
+                return next(writes, None) is None
+            return all(write.owner is not owner for write in writes)
+
+        with self._condition:
+            if is_flushed():
+                return True
+            self._ensure_started()
+            self._flush_requested = True
+            self._condition.notify_all()
+            return self._condition.wait_for(is_flushed, timeout)
+
+    def stats(self) -> dict[str, int]:
+        with self._condition:
+            return {
+                "pending": len(self._pending),
+                "in_flight": len(self._in_flight),
+                "saves": self._saves,
+                "coalesced": self._coalesced,
+                "written": self._written,
+                "batches": self._batches,
+                "dropped": self._dropped,
+            }
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid:
+            return
+        if self._pid is not None and self._pid != pid:
+            # the writes queued in the parent process are written by the parent
+            self._pending = {}
+            self._in_flight = {}
+        self._pid = pid
+        self._thread = threading.Thread(target=self._run, name="workflow_node_execution_writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: bool(self._pending))
+                self._condition.wait_for(
+                    lambda: len(self._pending) >= self._batch_size or self._flush_requested, timeout=self._interval
+                )
+                keys = list(islice(self._pending, self._batch_size))
+                batch = [self._pending.pop(key) for key in keys]
+                self._in_flight.update(zip(keys, batch))
+                # wake up the saves waiting for space in the queue
+                self._condition.notify_all()
+
+            retry_writes: list[PendingNodeExecutionWrite] = []
+            try:
+                retry_writes = self._write_batch(batch)
+            except Exception:
+                logger.exception("Unexpected error while writing workflow node executions")
+            finally:
+                with self._condition:
+                    # ids of the batch may have been regenerated meanwhile
+                    for key in keys:
+                        self._in_flight.pop(key, None)
+                    for write in retry_writes:
+                        # a newer update of the same execution supersedes the failed one
+                        self._pending.setdefault(write.id, write)
+                    # a requested flush also covers the writes being retried
+                    if not self._pending:
+                        self._flush_requested = False
+                    self._condition.notify_all()
+
+            if retry_writes:
+                time.sleep(min(max(write.attempts for write in retry_writes), 5) * 0.5)
+
+    def _write_batch(self, batch: list[PendingNodeExecutionWrite]) -> list[PendingNodeExecutionWrite]:
+        """
+        Upsert the batch, one statement per session factory and row shape.
+
+        :return: the writes to retry
+        """
+        groups: dict[tuple, list[PendingNodeExecutionWrite]] = {}
+        for write in batch:
+            groups.setdefault((write.session_factory, tuple(write.row)), []).append(write)
+
+        retry_writes: list[PendingNodeExecutionWrite] = []
+        for (session_factory, _), writes in groups.items():
+            start_at = time.perf_counter()
+            try:
+                written_ids = self._upsert(session_factory, [write.row for write in writes])
+            except Exception:
+                logger.exception("Failed to write %s workflow node executions", len(writes))
+                for write in writes:
+                    write.attempts += 1
+                    if write.attempts < self._max_attempts:
+                        retry_writes.append(write)
+                    else:
+                        logger.exception(
+                            "Dropping workflow node execution %s after %s attempts", write.id, write.attempts
+                        )
+                        with self._condition:
+                            self._dropped += 1
+                continue
+
+            for write in writes:
+                if write.id not in written_ids:
+                    # the id is taken by another execution, the same conflict the synchronous repository retries
+                    retry_writes.append(self._regenerate_id(write))
+
+            with self._condition:
+                self._written += len(written_ids)
+                self._batches += 1
+            logger.debug("Wrote %s workflow node executions in %.3fs", len(written_ids), time.perf_counter() - start_at)
+        return retry_writes
+
+    @staticmethod
+    def _upsert(session_factory: sessionmaker, rows: list[dict[str, Any]]) -> set[str]:
+        stmt = insert(WorkflowNodeExecutionModel).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[WorkflowNodeExecutionModel.id],
+            set_={key: stmt.excluded[key] for key in rows[0] if key != "id"},
+            # only update the row of the same node execution, a different one means an id collision
+            where=and_(
+                WorkflowNodeExecutionModel.workflow_run_id.is_not_distinct_from(stmt.excluded["workflow_run_id"]),
+                WorkflowNodeExecutionModel.node_execution_id.is_not_distinct_from(stmt.excluded["node_execution_id"]),
+            ),
+        ).returning(WorkflowNodeExecutionModel.id)
+        with session_factory() as session:
+            written_ids = set(session.scalars(stmt).all())
+            session.commit()
+        return written_ids
+
+    @staticmethod
+    def _regenerate_id(write: PendingNodeExecutionWrite) -> PendingNodeExecutionWrite:
+        new_id = str(uuidv7())
+        logger.warning(
+            "Duplicate key conflict for workflow node execution ID %s, generating new UUID v7: %s", write.id, new_id
+        )
+        write.attempts += 1
+        write.row["id"] = new_id
+        write.execution.id = new_id
+        write.db_model.id = new_id
+        return write
+
+
+_writer: WorkflowNodeExecutionWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def get_workflow_node_execution_writer() -> WorkflowNodeExecutionWriter:
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = WorkflowNodeExecutionWriter(
+                    batch_size=dify_config.WORKFLOW_NODE_EXECUTION_WRITE_BATCH_SIZE,
+                    interval=dify_config.WORKFLOW_NODE_EXECUTION_WRITE_INTERVAL,
+                    max_pending=dify_config.WORKFLOW_NODE_EXECUTION_WRITE_MAX_PENDING,
+                )
+                atexit.register(_writer.flush, timeout=dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_TIMEOUT)
+    return _writer
+
+
+class WriteBehindWorkflowNodeExecutionRepository(SQLAlchemyWorkflowNodeExecutionRepository):
+    """
+    Write-behind implementation of the WorkflowNodeExecutionRepository interface.
+
+    `save` converts the execution on the calling thread and queues it on the process-wide
+    WorkflowNodeExecutionWriter, which coalesces the updates of each execution and upserts them
+    in batches. Reads of a workflow run first wait for the pending writes of this repository,
+    and `flush` is called when a workflow run finishes so that its node executions are all
+    persisted before the run is.
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker | Engine,
+        user: Union[Account, EndUser],
+        app_id: str | None,
+        triggered_from: WorkflowNodeExecutionTriggeredFrom | None,
+    ):
+        super().__init__(session_factory=session_factory, user=user, app_id=app_id, triggered_from=triggered_from)
+        self._writer = get_workflow_node_execution_writer()
+
+    def save(self, execution: WorkflowNodeExecution):
+        """
+        Queue the execution to be saved or updated in the database.
+
+        Args:
+            execution: The NodeExecution domain entity to persist
+        """
+        db_model = self.to_db_model(execution)
+        row = {key: db_model.__dict__[key] for key in _COLUMN_KEYS if key in db_model.__dict__}
+        self._writer.enqueue(
+            PendingNodeExecutionWrite(
+                owner=self,
+                session_factory=self._session_factory,
+                row=row,
+                execution=execution,
+                db_model=db_model,
+            )
+        )
+
+        if db_model.node_execution_id:
+            self._node_execution_cache[db_model.node_execution_id] = db_model
+
+    def flush(self, timeout: float | None = None) -> bool:
+        if timeout is None:
+            timeout = dify_config.WORKFLOW_NODE_EXECUTION_FLUSH_TIMEOUT
+        flushed = self._writer.flush(owner=self, timeout=timeout)
+        if not flushed:
+            logger.warning("Timed out after %ss waiting for workflow node executions to be written", timeout)
+        return flushed
+
+    def get_db_models_by_workflow_run(
+        self,
+        workflow_run_id: str,
+        order_config: OrderConfig | None = None,
+    ) -> Sequence[WorkflowNodeExecutionModel]:
+        self.flush()
+        return super().get_db_models_by_workflow_run(workflow_run_id, order_config)
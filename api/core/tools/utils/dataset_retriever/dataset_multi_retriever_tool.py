@@ -1,4 +1,3 @@
-import threading
 from typing import Any
 
 from flask import Flask, current_app
@@ -12,6 +11,7 @@ from core.rag.datasource.retrieval_service import RetrievalService
 from core.rag.entities.citation_metadata import RetrievalSourceMetadata
 from core.rag.models.document import Document as RagDocument
 from core.rag.rerank.rerank_model import RerankModelRunner
+from core.rag.retrieval.retrieval_executor import retrieval_dataset_executor
 from core.rag.retrieval.retrieval_methods import RetrievalMethod
 from core.tools.utils.dataset_retriever.dataset_retriever_base_tool import DatasetRetrieverBaseTool
 from extensions.ext_database import db
@@ -47,23 +47,21 @@ class DatasetMultiRetrieverTool(DatasetRetrieverBaseTool):
         )
 
     def _run(self, query: str) -> str:
-        threads = []
+        futures = []
         all_documents: list[RagDocument] = []
         for dataset_id in self.dataset_ids:
-            retrieval_thread = threading.Thread(
-                target=self._retriever,
-                kwargs={
-                    "flask_app": current_app._get_current_object(),  # type: ignore
-                    "dataset_id": dataset_id,
-                    "query": query,
-                    "all_documents": all_documents,
-                    "hit_callbacks": self.hit_callbacks,
-                },
+            futures.append(
+                retrieval_dataset_executor.submit(
+                    self.tenant_id,
+                    self._retriever,
+                    flask_app=current_app._get_current_object(),  # type: ignore
+                    dataset_id=dataset_id,
+                    query=query,
+                    all_documents=all_documents,
+                    hit_callbacks=self.hit_callbacks,
+                )
             )
-            threads.append(retrieval_thread)
-            retrieval_thread.start()
-        for thread in threads:
-            thread.join()
+        retrieval_dataset_executor.wait(futures)
         # do rerank for searched documents
         model_manager = ModelManager()
         rerank_model_instance = model_manager.get_model_instance(
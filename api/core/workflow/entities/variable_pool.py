@@ -3,7 +3,7 @@ from collections import defaultdict
 from collections.abc import Mapping, Sequence
 from typing import Annotated, Any, Union, cast
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, SerializerFunctionWrapHandler, model_serializer
 
 from core.file import File, FileAttribute, file_manager
 from core.variables import Segment, SegmentGroup, Variable
@@ -47,6 +47,12 @@ class VariablePool(BaseModel):
         default_factory=list,
     )
 
+    # Set on pools created by `create_child`: lookups fall through to the parent, while
+    # `variable_dictionary` only holds the child's own writes and the two sets record its removals.
+    _parent: "VariablePool | None" = PrivateAttr(default=None)
+    _removed_nodes: set[str] = PrivateAttr(default_factory=set)
+    _removed_variables: set[tuple[str, str]] = PrivateAttr(default_factory=set)
+
     def model_post_init(self, context: Any, /):
         # Create a mapping from field names to SystemVariableKey enum values
         self._add_system_variables(self.system_variables)
@@ -95,6 +101,7 @@ class VariablePool(BaseModel):
         # Based on the definition of `VariableUnion`,
         # `list[Variable]` can be safely used as `list[VariableUnion]` since they are compatible.
         self.variable_dictionary[node_id][name] = cast(VariableUnion, variable)
+        self._removed_variables.discard((node_id, name))
 
     @classmethod
     def _selector_to_keys(cls, selector: Sequence[str]) -> tuple[str, str]:
@@ -102,11 +109,15 @@ class VariablePool(BaseModel):
 
     def _has(self, selector: Sequence[str]) -> bool:
         node_id, name = self._selector_to_keys(selector)
-        if node_id not in self.variable_dictionary:
-            return False
-        if name not in self.variable_dictionary[node_id]:
-            return False
-        return True
+        return self._lookup(node_id, name) is not None
+
+    def _lookup(self, node_id: str, name: str) -> VariableUnion | None:
+        variables = self.variable_dictionary.get(node_id)
+        if variables is not None and name in variables:
+            return variables[name]
+        if self._parent is None or node_id in self._removed_nodes or (node_id, name) in self._removed_variables:
+            return None
+        return self._parent._lookup(node_id, name)
 
     def get(self, selector: Sequence[str], /) -> Segment | None:
         """
@@ -133,7 +144,7 @@ class VariablePool(BaseModel):
             return None
 
         node_id, name = self._selector_to_keys(selector)
-        segment: Segment | None = self.variable_dictionary[node_id].get(name)
+        segment: Segment | None = self._lookup(node_id, name)
 
         if segment is None:
             return None
@@ -185,9 +196,13 @@ class VariablePool(BaseModel):
             return
         if len(selector) == 1:
             self.variable_dictionary[selector[0]] = {}
+            if self._parent is not None:
+                self._removed_nodes.add(selector[0])
             return
         key, hash_key = self._selector_to_keys(selector)
         self.variable_dictionary[key].pop(hash_key, None)
+        if self._parent is not None:
+            self._removed_variables.add((key, hash_key))
 
     def convert_template(self, template: str, /):
         parts = VARIABLE_PATTERN.split(template)
@@ -217,6 +232,43 @@ class VariablePool(BaseModel):
                 continue
             self.add(selector, value)  # type: ignore
 
+    def create_child(self) -> "VariablePool":
+        """
+        Create a copy-on-write child of this pool.
+
+        The child reads through to this pool and only stores its own writes and removals, so creating
+        it does not copy any variable. Changes made to the child are never visible in this pool.
+        """
+        child = self.model_copy(update={"variable_dictionary": defaultdict(dict)})
+        child._parent = self
+        child._removed_nodes = set()
+        child._removed_variables = set()
+        return child
+
+    def _flatten_variable_dictionary(self) -> defaultdict[str, dict[str, VariableUnion]]:
+        if self._parent is None:
+            return self.variable_dictionary
+        flattened: defaultdict[str, dict[str, VariableUnion]] = defaultdict(dict)
+        # the parent may be written by another thread while a child is serialized, so iterate snapshots of it
+        for node_id, variables in list(self._parent._flatten_variable_dictionary().items()):
+            if node_id in self._removed_nodes:
+                continue
+            flattened[node_id] = {
+                name: variable
+                for name, variable in list(variables.items())
+                if (node_id, name) not in self._removed_variables
+            }
+        for node_id, variables in self.variable_dictionary.items():
+            flattened[node_id].update(variables)
+        return flattened
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler: SerializerFunctionWrapHandler) -> Any:
+        if self._parent is None:
+            return handler(self)
+        # serialize a child pool with the variables it inherits from its parents
+        return handler(self.model_copy(update={"variable_dictionary": self._flatten_variable_dictionary()}))
+
     @classmethod
     def empty(cls) -> "VariablePool":
         """Create an empty variable pool."""
@@ -1,11 +1,13 @@
 import contextvars
 import logging
 import queue
+import threading
 import time
 import uuid
+from collections import deque
 from collections.abc import Generator, Mapping
-from concurrent.futures import ThreadPoolExecutor, wait
-from copy import copy, deepcopy
+from concurrent.futures import Future, wait
+from copy import copy
 from typing import Any, cast
 
 from flask import Flask, current_app
@@ -41,6 +43,7 @@ from core.workflow.graph_engine.entities.graph import Graph, GraphEdge
 from core.workflow.graph_engine.entities.graph_init_params import GraphInitParams
 from core.workflow.graph_engine.entities.graph_runtime_state import GraphRuntimeState
 from core.workflow.graph_engine.entities.runtime_route_state import RouteNodeState
+from core.workflow.graph_engine.scheduler import GraphEngineScheduler, ScheduledTask, graph_engine_scheduler
 from core.workflow.nodes import NodeType
 from core.workflow.nodes.agent.agent_node import AgentNode
 from core.workflow.nodes.agent.entities import AgentNodeData
@@ -58,31 +61,114 @@ from models.workflow import WorkflowType
 logger = logging.getLogger(__name__)
 
 
-class GraphEngineThreadPool(ThreadPoolExecutor):
+class GraphEngineThreadPool:
+    """
+    Per-run view over the shared graph engine scheduler.
+
+    At most `max_workers` tasks of the run are handed to the shared pool at a time; the others wait
+    for a slot. Once `max_submit_count` tasks are outstanding, further tasks run directly in the
+    submitting thread instead of failing the run.
+    """
+
+    # seconds without events after which a caller runs its own unstarted tasks
+    STALL_TIMEOUT = 1.0
+
     def __init__(
         self,
-        max_workers=None,
-        thread_name_prefix="",
-        initializer=None,
-        initargs=(),
-        max_submit_count=dify_config.MAX_SUBMIT_COUNT,
+        max_workers: int | None = None,
+        max_submit_count: int = dify_config.MAX_SUBMIT_COUNT,
+        scheduler: GraphEngineScheduler | None = None,
     ):
-        super().__init__(max_workers, thread_name_prefix, initializer, initargs)
+        self.max_workers = max_workers or dify_config.GRAPH_ENGINE_MAX_WORKERS_PER_RUN
         self.max_submit_count = max_submit_count
         self.submit_count = 0
+        self._scheduler = scheduler or graph_engine_scheduler
+        self._lock = threading.Lock()
+        self._running = 0
+        self._pending: deque[ScheduledTask] = deque()
+        self._tasks: dict[Future, ScheduledTask] = {}
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        task = ScheduledTask(fn, args, kwargs)
+        with self._lock:
+            self.submit_count += 1
+            is_full = self.submit_count > self.max_submit_count
+            if not is_full:
+                self._tasks[task.future] = task
+                self._pending.append(task)
+        if is_full:
+            # backpressure: the submitting thread runs the task itself
+            logger.warning("Max submit count %s of workflow thread pool reached.", self.max_submit_count)
+            self._scheduler.run_inline(task)
+            return task.future
+
+        task.future.add_done_callback(self._on_task_done)
+        self._dispatch()
+        return task.future
+
+    def task_done_callback(self, future):
+        with self._lock:
+            self.submit_count -= 1
 
-    def submit(self, fn, /, *args, **kwargs):
-        self.submit_count += 1
-        self.check_is_full()
+    def run_pending_task(self, futures: list[Future]) -> bool:
+        """
+        Run one of the given futures' tasks in the calling thread if it has not been started yet.
 
-        return super().submit(fn, *args, **kwargs)
+        Callers waiting on their own tasks use this to keep making progress when every worker
+        of the shared pool is busy, e.g. with parent branches that are themselves waiting.
 
-    def task_done_callback(self, future):
-        self.submit_count -= 1
+        :return: True if a task was run
+        """
+        for future in futures:
+            task = self._tasks.get(future)
+            if task is not None and not task.claimed and self._scheduler.run_inline(task):
+                return True
+        return False
+
+    def stall_timeout(self, futures: list[Future]) -> float | None:
+        """
+        Timeout for a caller blocking on the events of the given futures.
+
+        Tasks that have started always report back, so the caller can block until the next event.
+        Only while some task is still waiting for a worker does the caller need to wake up now
+        and then to check whether it should run that task itself.
+
+        :return: None to block until the next event
+        """
+        for future in futures:
+            task = self._tasks.get(future)
+            if task is not None and not task.claimed:
+                return self.STALL_TIMEOUT
+        return None
+
+    def _on_task_done(self, future: Future):
+        with self._lock:
+            task = self._tasks.pop(future, None)
+            if task is not None and task.dispatched:
+                self._running -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                if not self._pending or self._running >= self.max_workers:
+                    return
+                task = self._pending.popleft()
+                if task.claimed or task.future.cancelled():
+                    continue
+                task.dispatched = True
+                self._running += 1
+            if not self._scheduler.schedule(task):
+                # the shared queue is full, keep the task until a slot frees up or its caller runs it
+                with self._lock:
+                    task.dispatched = False
+                    self._running -= 1
+                    self._pending.appendleft(task)
+                return
 
-    def check_is_full(self):
-        if self.submit_count > self.max_submit_count:
-            raise ValueError(f"Max submit count {self.max_submit_count} of workflow thread pool reached.")
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"running": self._running, "pending": len(self._pending), "submitted": self.submit_count}
 
 
 class GraphEngine:
@@ -106,7 +192,7 @@ class GraphEngine:
         thread_pool_id: str | None = None,
     ):
         thread_pool_max_submit_count = dify_config.MAX_SUBMIT_COUNT
-        thread_pool_max_workers = 10
+        thread_pool_max_workers = dify_config.GRAPH_ENGINE_MAX_WORKERS_PER_RUN
 
         # init thread pool
         if thread_pool_id:
@@ -502,7 +588,7 @@ class GraphEngine:
         succeeded_count = 0
         while True:
             try:
-                event = q.get(timeout=1)
+                event = q.get(timeout=self.thread_pool.stall_timeout(futures))
                 if event is None:
                     break
 
@@ -517,6 +603,8 @@ class GraphEngine:
                     elif isinstance(event, ParallelBranchRunFailedEvent):
                         raise GraphRunFailedError(event.error)
             except queue.Empty:
+                # no progress for a while, the shared pool may be saturated
+                self.thread_pool.run_pending_task(futures)
                 continue
 
         # wait all threads
@@ -858,11 +946,11 @@ class GraphEngine:
     def create_copy(self):
         """
         create a graph engine copy
-        :return: graph engine with a new variable pool and initialized total tokens
+        :return: graph engine with a copy-on-write child variable pool and initialized total tokens
         """
         new_instance = copy(self)
         new_instance.graph_runtime_state = copy(self.graph_runtime_state)
-        new_instance.graph_runtime_state.variable_pool = deepcopy(self.graph_runtime_state.variable_pool)
+        new_instance.graph_runtime_state.variable_pool = self.graph_runtime_state.variable_pool.create_child()
         new_instance.graph_runtime_state.total_tokens = 0
         return new_instance
 
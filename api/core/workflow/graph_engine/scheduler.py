@@ -0,0 +1,130 @@
+import logging
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from configs import dify_config
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledTask:
+    """
+    A unit of work submitted to the graph engine scheduler.
+
+    A task is claimed exactly once, either by a pool worker or by the thread waiting for it,
+    so a waiting caller can always make progress by running its own unstarted tasks.
+    """
+
+    def __init__(self, fn: Callable[..., Any], args: tuple[Any, ...], kwargs: dict[str, Any]):
+        self.future: Future = Future()
+        self.dispatched = False
+        self._fn = fn
+        self._args = args
+        self._kwargs = kwargs
+        self._claimed = False
+        self._lock = threading.Lock()
+
+    @property
+    def claimed(self) -> bool:
+        return self._claimed
+
+    def claim(self) -> bool:
+        with self._lock:
+            if self._claimed:
+                return False
+            self._claimed = True
+        # returns False if the future has been cancelled meanwhile
+        return self.future.set_running_or_notify_cancel()
+
+    def run(self):
+        try:
+            result = self._fn(*self._args, **self._kwargs)
+        except BaseException as e:
+            self.future.set_exception(e)
+        else:
+            self.future.set_result(result)
+        finally:
+            # drop references to large arguments (variable pools, queues) once done
+            self._fn = None  # type: ignore[assignment]
+            self._args = ()
+            self._kwargs = {}
+
+
+class GraphEngineScheduler:
+    """
+    Process-wide thread pool running the parallel branches and parallel iterations of all workflow runs.
+
+    When the pool queue is full, tasks are not rejected with an error: they stay with their run and
+    are executed by the thread waiting for them, which slows that run down instead of failing it.
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="graph_engine")
+        self._max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._rejected = 0
+        self._inline = 0
+
+    def schedule(self, task: ScheduledTask) -> bool:
+        """
+        Queue the task on the shared pool.
+
+        :return: False if the pool queue is full and the task must be run by its caller
+        """
+        with self._lock:
+            if self._queued >= self._max_queue_size:
+                self._rejected += 1
+                return False
+            self._queued += 1
+        self._executor.submit(self._run_from_worker, task)
+        return True
+
+    def run_inline(self, task: ScheduledTask) -> bool:
+        """
+        Run the task in the calling thread if nobody has claimed it yet.
+
+        :return: True if the task was run
+        """
+        if not task.claim():
+            return False
+        with self._lock:
+            self._inline += 1
+            self._active += 1
+        try:
+            task.run()
+        finally:
+            with self._lock:
+                self._active -= 1
+        return True
+
+    def _run_from_worker(self, task: ScheduledTask):
+        with self._lock:
+            self._queued -= 1
+        if not task.claim():
+            return
+        with self._lock:
+            self._active += 1
+        try:
+            task.run()
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "active": self._active,
+                "queued": self._queued,
+                "rejected": self._rejected,
+                "inline": self._inline,
+            }
+
+
+graph_engine_scheduler = GraphEngineScheduler(
+    max_workers=dify_config.GRAPH_ENGINE_MAX_WORKERS,
+    max_queue_size=dify_config.GRAPH_ENGINE_MAX_QUEUE_SIZE,
+)
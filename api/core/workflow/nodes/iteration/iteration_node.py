@@ -232,7 +232,7 @@ class IterationNode(BaseNode):
                 succeeded_count = 0
                 while True:
                     try:
-                        event = q.get(timeout=1)
+                        event = q.get(timeout=thread_pool.stall_timeout(futures))
                         if event is None:
                             break
                         if isinstance(event, IterationRunNextEvent):
@@ -250,6 +250,8 @@ class IterationNode(BaseNode):
                             q.put(None)
                             yield event
                     except Empty:
+                        # no progress for a while, the shared pool may be saturated
+                        thread_pool.run_pending_task(futures)
                         continue
 
                 # wait all threads
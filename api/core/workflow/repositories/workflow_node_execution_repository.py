@@ -57,3 +57,18 @@ class WorkflowNodeExecutionRepository(Protocol):
             A list of NodeExecution instances
         """
         ...
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait until all NodeExecution instances saved through this repository are persisted.
+
+        Implementations that persist synchronously, or that hand writes to another process,
+        need not override it.
+
+        Args:
+            timeout: Maximum number of seconds to wait, None to wait indefinitely
+
+        Returns:
+            True if all saved instances are persisted
+        """
+        return True
@@ -97,6 +97,8 @@ class WorkflowCycleManager:
             total_steps=total_steps,
         )
 
+        # node executions must be persisted before the run is seen as finished or traced
+        self._workflow_node_execution_repository.flush()
         self._add_trace_task_if_needed(trace_manager, workflow_execution, conversation_id, external_trace_id)
 
         self._workflow_execution_repository.save(workflow_execution)
@@ -125,6 +127,8 @@ class WorkflowCycleManager:
             exceptions_count=exceptions_count,
         )
 
+        # node executions must be persisted before the run is seen as finished or traced
+        self._workflow_node_execution_repository.flush()
         self._add_trace_task_if_needed(trace_manager, execution, conversation_id, external_trace_id)
 
         self._workflow_execution_repository.save(execution)
@@ -157,6 +161,8 @@ class WorkflowCycleManager:
         )
 
         self._fail_running_node_executions(workflow_execution.id_, error_message, now)
+        # node executions must be persisted before the run is seen as finished or traced
+        self._workflow_node_execution_repository.flush()
         self._add_trace_task_if_needed(trace_manager, workflow_execution, conversation_id, external_trace_id)
 
         self._workflow_execution_repository.save(workflow_execution)
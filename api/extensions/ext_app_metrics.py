@@ -65,3 +65,62 @@ def init_app(app: DifyApp):
             "connection_timeout": engine.pool.timeout(),  # type: ignore
             "recycle_time": db.engine.pool._recycle,  # type: ignore
         }
+
+    @app.route("/ssrf-proxy-pool-stat")
+    def ssrf_proxy_pool_stat():
+        from core.helper.ssrf_proxy import ssrf_proxy_client_pool
+
+        return {
+            "pid": os.getpid(),
+            **ssrf_proxy_client_pool.stats(),
+        }
+
+    @app.route("/plugin-daemon-request-stat")
+    def plugin_daemon_request_stat():
+        from core.plugin.impl.metrics import plugin_daemon_request_metrics
+
+        return {
+            "pid": os.getpid(),
+            "endpoints": plugin_daemon_request_metrics.snapshot(),
+        }
+
+    @app.route("/retrieval-executor-stat")
+    def retrieval_executor_stat():
+        from core.rag.retrieval.retrieval_executor import retrieval_dataset_executor, retrieval_search_executor
+
+        return {
+            "pid": os.getpid(),
+            "dataset": retrieval_dataset_executor.stats(),
+            "search": retrieval_search_executor.stats(),
+        }
+
+    @app.route("/workflow-node-execution-writer-stat")
+    def workflow_node_execution_writer_stat():
+        from core.repositories.write_behind_workflow_node_execution_repository import (
+            get_workflow_node_execution_writer,
+        )
+
+        return {
+            "pid": os.getpid(),
+            **get_workflow_node_execution_writer().stats(),
+        }
+
+    @app.route("/trace-export-worker-stat")
+    def trace_export_worker_stat():
+        from core.ops import ops_trace_manager
+
+        # the worker is created with the first trace of the process
+        worker = ops_trace_manager.trace_export_worker
+        return {
+            "pid": os.getpid(),
+            **(worker.stats() if worker is not None else {}),
+        }
+
+    @app.route("/vector-store-pool-stat")
+    def vector_store_pool_stat():
+        from core.rag.datasource.vdb.connection_pool import vector_store_pool_registry
+
+        return {
+            "pid": os.getpid(),
+            "pools": vector_store_pool_registry.stats(),
+        }
@@ -158,6 +158,12 @@ def init_app(app: DifyApp) -> Celery:
             "task": "schedule.clean_workflow_runlogs_precise.clean_workflow_runlogs_precise",
             "schedule": crontab(minute="0", hour="2"),
         }
+    if dify_config.ENABLE_APP_STATISTICS_ROLLUP_TASK:
+        imports.append("schedule.update_app_daily_statistics_task")
+        beat_schedule["update_app_daily_statistics_task"] = {
+            "task": "schedule.update_app_daily_statistics_task.update_app_daily_statistics_task",
+            "schedule": crontab(minute="30", hour="*"),
+        }
     celery_app.conf.update(beat_schedule=beat_schedule, imports=imports)
 
     return celery_app
@@ -14,6 +14,8 @@ def init_app(app: DifyApp):
         fix_app_site_missing,
         install_plugins,
         migrate_data_for_plugin,
+        migrate_embedding_storage_format,
+        migrate_keyword_tables_to_postings,
         old_metadata_migration,
         remove_orphaned_files_on_storage,
         reset_email,
@@ -44,6 +46,8 @@ def init_app(app: DifyApp):
         remove_orphaned_files_on_storage,
         setup_system_tool_oauth_client,
         cleanup_orphaned_draft_variables,
+        migrate_embedding_storage_format,
+        migrate_keyword_tables_to_postings,
     ]
     for cmd in cmds_to_register:
         app.cli.add_command(cmd)
@@ -17,6 +17,7 @@ from configs import dify_config
 from dify_app import DifyApp
 
 if TYPE_CHECKING:
+    from redis.commands.core import Script
     from redis.lock import Lock
 
 logger = logging.getLogger(__name__)
@@ -107,6 +108,8 @@ class RedisClientWrapper:
         def zremrangebyscore(self, name: str | bytes, min: float | str, max: float | str) -> Any: ...
         def zcard(self, name: str | bytes) -> Any: ...
         def getdel(self, name: str | bytes) -> Any: ...
+        def zrem(self, name: str | bytes, *values: str | bytes) -> Any: ...
+        def register_script(self, script: str | bytes) -> Script: ...
 
     def __getattr__(self, item: str) -> Any:
         if self._client is None:
@@ -117,6 +120,25 @@ class RedisClientWrapper:
 redis_client: RedisClientWrapper = RedisClientWrapper()
 
 
+class RedisScript:
+    """
+    A Lua script registered on the client the first time it runs, instead of on every call.
+
+    The client is passed on each call, as it is only initialized with the app, and the script is
+    registered again if it changes.
+    """
+
+    def __init__(self, script: str):
+        self.script = script
+        self._registered: tuple[Any, Script] | None = None
+
+    def __call__(self, client: Any, keys: list[Any], args: list[Any]) -> Any:
+        registered = self._registered
+        if registered is None or registered[0] is not client:
+            registered = self._registered = (client, client.register_script(self.script))
+        return registered[1](keys=keys, args=args)
+
+
 def _get_ssl_configuration() -> tuple[type[Union[Connection, SSLConnection]], dict[str, Any]]:
     """Get SSL configuration for Redis connection."""
     if not dify_config.REDIS_USE_SSL:
@@ -118,6 +118,15 @@ workflow_run_node_execution_fields = {
     "finished_at": TimestampField,
 }
 
+# offloaded payloads are listed as their preview with truncated values, the detail endpoint returns them in full
+workflow_run_node_execution_list_item_fields = {
+    **workflow_run_node_execution_fields,
+    "inputs": fields.Raw(attribute="inputs_preview"),
+    "process_data": fields.Raw(attribute="process_data_preview"),
+    "outputs": fields.Raw(attribute="outputs_preview"),
+    "offloaded_fields": fields.List(fields.String, attribute="offloaded_payload_fields"),
+}
+
 workflow_run_node_execution_list_fields = {
-    "data": fields.List(fields.Nested(workflow_run_node_execution_fields)),
+    "data": fields.List(fields.Nested(workflow_run_node_execution_list_item_fields)),
 }
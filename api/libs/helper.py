@@ -21,7 +21,7 @@ from configs import dify_config
 from core.app.features.rate_limiting.rate_limit import RateLimitGenerator
 from core.file import helpers as file_helpers
 from core.model_runtime.utils.encoders import jsonable_encoder
-from extensions.ext_redis import redis_client
+from extensions.ext_redis import RedisScript, redis_client
 
 if TYPE_CHECKING:
     from models.account import Account
@@ -340,6 +340,30 @@ class TokenManager:
         return f"{token_type}:account:{account_id}"
 
 
+# Drops the attempts out of the window and counts the remaining ones.
+_RATE_LIMITER_COUNT_SCRIPT = RedisScript("""
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+return redis.call('ZCARD', KEYS[1])
+""")
+
+# Attempts are scored by their time in seconds, so each one gets a unique member to not collapse within a second.
+_RATE_LIMITER_INCREMENT_SCRIPT = RedisScript("""
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+""")
+
+# Records the attempt unless the max attempts in the window is reached, returns whether it was recorded.
+_RATE_LIMITER_ACQUIRE_SCRIPT = RedisScript("""
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[5])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+""")
+
+
 class RateLimiter:
     def __init__(self, prefix: str, max_attempts: int, time_window: int):
         self.prefix = prefix
@@ -354,8 +378,7 @@ class RateLimiter:
         current_time = int(time.time())
         window_start_time = current_time - self.time_window
 
-        redis_client.zremrangebyscore(key, "-inf", window_start_time)
-        attempts = redis_client.zcard(key)
+        attempts = _RATE_LIMITER_COUNT_SCRIPT(redis_client, keys=[key], args=[window_start_time])
 
         if attempts and int(attempts) >= self.max_attempts:
             return True
@@ -365,5 +388,35 @@ class RateLimiter:
         key = self._get_key(email)
         current_time = int(time.time())
 
-        redis_client.zadd(key, {current_time: current_time})
-        redis_client.expire(key, self.time_window * 2)
+        _RATE_LIMITER_INCREMENT_SCRIPT(
+            redis_client, keys=[key], args=[current_time, self._attempt_member(current_time), self.time_window * 2]
+        )
+
+    def try_acquire(self, email: str) -> bool:
+        """
+        Check the rate limit and record the attempt if it is not reached, atomically.
+
+        Unlike is_rate_limited followed by increment_rate_limit, concurrent attempts cannot all pass the check.
+
+        :return: whether the attempt is allowed
+        """
+        key = self._get_key(email)
+        current_time = int(time.time())
+        window_start_time = current_time - self.time_window
+
+        acquired = _RATE_LIMITER_ACQUIRE_SCRIPT(
+            redis_client,
+            keys=[key],
+            args=[
+                current_time,
+                window_start_time,
+                self.max_attempts,
+                self.time_window * 2,
+                self._attempt_member(current_time),
+            ],
+        )
+        return bool(acquired)
+
+    @staticmethod
+    def _attempt_member(current_time: int) -> str:
+        return f"{current_time}:{uuid.uuid4().hex}"
@@ -13,6 +13,7 @@ from .dataset import (
     AppDatasetJoin,
     Dataset,
     DatasetCollectionBinding,
+    DatasetKeywordPosting,
     DatasetKeywordTable,
     DatasetPermission,
     DatasetPermissionEnum,
@@ -34,6 +35,7 @@ from .model import (
     App,
     AppAnnotationHitHistory,
     AppAnnotationSetting,
+    AppDailyStatistic,
     AppMCPServer,
     AppMode,
     AppModelConfig,
@@ -103,6 +105,7 @@ __all__ = [
     "App",
     "AppAnnotationHitHistory",
     "AppAnnotationSetting",
+    "AppDailyStatistic",
     "AppDatasetJoin",
     "AppMCPServer",  # Added
     "AppMode",
@@ -117,6 +120,7 @@ __all__ = [
     "DataSourceOauthBinding",
     "Dataset",
     "DatasetCollectionBinding",
+    "DatasetKeywordPosting",
     "DatasetKeywordTable",
     "DatasetPermission",
     "DatasetPermissionEnum",
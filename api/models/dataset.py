@@ -12,6 +12,7 @@ from datetime import datetime
 from json import JSONDecodeError
 from typing import Any, cast
 
+import numpy as np
 import sqlalchemy as sa
 from sqlalchemy import DateTime, String, func, select
 from sqlalchemy.dialects.postgresql import JSONB
@@ -930,6 +931,20 @@ class DatasetKeywordTable(Base):
                 return None
 
 
+class DatasetKeywordPosting(Base):
+    """One keyword -> index node entry of a dataset keyword index stored with the `sharded` data source type."""
+
+    __tablename__ = "dataset_keyword_postings"
+    __table_args__ = (
+        sa.PrimaryKeyConstraint("dataset_id", "keyword", "node_id", name="dataset_keyword_posting_pkey"),
+        sa.Index("dataset_keyword_posting_node_id_idx", "dataset_id", "node_id"),
+    )
+
+    dataset_id = mapped_column(StringUUID, nullable=False)
+    keyword = mapped_column(String(255), nullable=False)
+    node_id = mapped_column(String(255), nullable=False)
+
+
 class Embedding(Base):
     __tablename__ = "embeddings"
     __table_args__ = (
@@ -947,11 +962,44 @@ class Embedding(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.current_timestamp())
     provider_name = mapped_column(String(255), nullable=False, server_default=sa.text("''::character varying"))
 
+    # Compact storage format: a 4-byte header (magic, version, dtype code) followed by the raw
+    # little-endian vector. Rows written before this format existed hold a pickled list[float],
+    # which always starts with the pickle PROTO opcode (0x80) and therefore never matches the magic.
+    COMPACT_FORMAT_MAGIC = b"DE"
+    COMPACT_FORMAT_VERSION = 1
+    COMPACT_FORMAT_HEADER_SIZE = 4
+    COMPACT_FORMAT_DTYPES: dict[int, str] = {1: "<f4", 2: "<f2"}
+    COMPACT_FORMAT_DTYPE_CODES: dict[str, int] = {"float32": 1, "float16": 2}
+
     def set_embedding(self, embedding_data: list[float]):
-        self.embedding = pickle.dumps(embedding_data, protocol=pickle.HIGHEST_PROTOCOL)
+        self.embedding = self.encode_embedding(embedding_data)
 
     def get_embedding(self) -> list[float]:
-        return cast(list[float], pickle.loads(self.embedding))  # noqa: S301
+        if not self.is_compact_format(self.embedding):
+            return cast(list[float], pickle.loads(self.embedding))  # noqa: S301
+        return cast(list[float], self.get_embedding_array().tolist())
+
+    def get_embedding_array(self) -> np.ndarray:
+        """Return the embedding as a read-only numpy view over the stored bytes, without copying."""
+        if not self.is_compact_format(self.embedding):
+            return np.asarray(pickle.loads(self.embedding), dtype=np.float32)  # noqa: S301
+        version, dtype_code = self.embedding[2], self.embedding[3]
+        if version != self.COMPACT_FORMAT_VERSION or dtype_code not in self.COMPACT_FORMAT_DTYPES:
+            raise ValueError(f"Unsupported embedding storage format: version={version}, dtype={dtype_code}")
+        return np.frombuffer(
+            self.embedding, dtype=self.COMPACT_FORMAT_DTYPES[dtype_code], offset=self.COMPACT_FORMAT_HEADER_SIZE
+        )
+
+    @classmethod
+    def is_compact_format(cls, data: bytes) -> bool:
+        return bytes(data[:2]) == cls.COMPACT_FORMAT_MAGIC
+
+    @classmethod
+    def encode_embedding(cls, embedding_data: list[float]) -> bytes:
+        dtype_name = dify_config.EMBEDDING_CACHE_STORAGE_DTYPE
+        dtype_code = cls.COMPACT_FORMAT_DTYPE_CODES[dtype_name]
+        header = cls.COMPACT_FORMAT_MAGIC + bytes([cls.COMPACT_FORMAT_VERSION, dtype_code])
+        return header + np.asarray(embedding_data, dtype=cls.COMPACT_FORMAT_DTYPES[dtype_code]).tobytes()
 
 
 class DatasetCollectionBinding(Base):
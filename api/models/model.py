@@ -1304,6 +1304,32 @@ class MessageFeedback(Base):
         }
 
 
+class AppDailyStatistic(Base):
+    """
+    Message statistics of an app for one day in one timezone, rolled up once the day is over.
+
+    The counters are stored as sums so that averages and rates of any day can be derived from them.
+    """
+
+    __tablename__ = "app_daily_statistics"
+    __table_args__ = (sa.PrimaryKeyConstraint("app_id", "timezone", "date", name="app_daily_statistic_pkey"),)
+
+    app_id = mapped_column(StringUUID, nullable=False)
+    timezone: Mapped[str] = mapped_column(String(64), nullable=False)
+    date = mapped_column(sa.Date, nullable=False)
+    message_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, server_default=sa.text("0"))
+    conversation_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, server_default=sa.text("0"))
+    end_user_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, server_default=sa.text("0"))
+    message_tokens: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    answer_tokens: Mapped[int] = mapped_column(sa.BigInteger, nullable=False, server_default=sa.text("0"))
+    total_price = mapped_column(sa.Numeric, nullable=True)
+    provider_response_latency: Mapped[float] = mapped_column(Float, nullable=False, server_default=sa.text("0"))
+    like_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, server_default=sa.text("0"))
+    session_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, server_default=sa.text("0"))
+    session_message_count: Mapped[int] = mapped_column(sa.Integer, nullable=False, server_default=sa.text("0"))
+    created_at = mapped_column(sa.DateTime, nullable=False, server_default=func.current_timestamp())
+
+
 class MessageFile(Base):
     __tablename__ = "message_files"
     __table_args__ = (
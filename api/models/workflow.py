@@ -7,6 +7,7 @@ from typing import TYPE_CHECKING, Any, Union, cast
 from uuid import uuid4
 
 import sqlalchemy as sa
+import zstandard
 from sqlalchemy import DateTime, exists, orm, select
 
 from core.file.constants import maybe_file_object
@@ -29,6 +30,7 @@ from sqlalchemy.orm import Mapped, declared_attr, mapped_column
 from constants import DEFAULT_FILE_NUMBER_LIMITS, HIDDEN_VALUE
 from core.helper import encrypter
 from core.variables import SecretVariable, Segment, SegmentType, Variable
+from extensions.ext_storage import storage
 from factories import variable_factory
 from libs import helper
 
@@ -724,6 +726,9 @@ class WorkflowNodeExecutionModel(Base):
     created_by_role: Mapped[str] = mapped_column(String(255))
     created_by: Mapped[str] = mapped_column(StringUUID)
     finished_at: Mapped[datetime | None] = mapped_column(DateTime)
+    # payloads offloaded to the storage are NULL in their column, see WorkflowNodeExecutionPayloadOffloader
+    payload_storage_keys: Mapped[str | None] = mapped_column(sa.Text)
+    payload_preview: Mapped[str | None] = mapped_column(sa.Text)
 
     @property
     def created_by_account(self):
@@ -741,15 +746,60 @@ class WorkflowNodeExecutionModel(Base):
 
     @property
     def inputs_dict(self):
-        return json.loads(self.inputs) if self.inputs else None
+        return self._load_payload("inputs")
 
     @property
     def outputs_dict(self) -> dict[str, Any] | None:
-        return json.loads(self.outputs) if self.outputs else None
+        return self._load_payload("outputs")
 
     @property
     def process_data_dict(self):
-        return json.loads(self.process_data) if self.process_data else None
+        return self._load_payload("process_data")
+
+    @property
+    def payload_storage_keys_dict(self) -> dict[str, str]:
+        return json.loads(self.payload_storage_keys) if self.payload_storage_keys else {}
+
+    @property
+    def payload_preview_dict(self) -> dict[str, dict[str, Any]]:
+        """Previews of the offloaded payloads with their values truncated, for pages that do not need them in full."""
+        return json.loads(self.payload_preview) if self.payload_preview else {}
+
+    @property
+    def offloaded_payload_fields(self) -> list[str]:
+        return [field for field in self.payload_storage_keys_dict if getattr(self, field) is None]
+
+    @property
+    def inputs_preview(self):
+        return self._payload_or_preview("inputs")
+
+    @property
+    def outputs_preview(self):
+        return self._payload_or_preview("outputs")
+
+    @property
+    def process_data_preview(self):
+        return self._payload_or_preview("process_data")
+
+    def _payload_or_preview(self, field: str):
+        """The payload of the field, or its preview if it is offloaded, without loading it."""
+        value = getattr(self, field)
+        if value is None:
+            return self.payload_preview_dict.get(field)
+        return json.loads(value) if value else None
+
+    def _load_payload(self, field: str):
+        value = getattr(self, field)
+        if value is None:
+            storage_key = self.payload_storage_keys_dict.get(field)
+            if storage_key:
+                # offloaded payloads are only fetched when they are read, once per instance
+                cache = self.__dict__.setdefault("_offloaded_payloads", {})
+                if storage_key not in cache:
+                    data = storage.load_once(storage_key)
+                    cache[storage_key] = zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+                value = cache[storage_key]
+        return json.loads(value) if value else None
 
     @property
     def execution_metadata_dict(self) -> dict[str, Any]:
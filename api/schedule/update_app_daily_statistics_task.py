@@ -0,0 +1,61 @@
+import datetime
+import logging
+import time
+
+import click
+import pytz
+from sqlalchemy import select
+
+import app
+from configs import dify_config
+from extensions.ext_database import db
+from libs.datetime_utils import naive_utc_now
+from models.model import App
+from services.app_statistic_service import AppStatisticService
+
+logger = logging.getLogger(__name__)
+
+# apps and timezones whose statistics were viewed within this window are kept up to date
+ACTIVE_ROLLUP_DAYS = 30
+
+
+@app.celery.task(queue="dataset")
+def update_app_daily_statistics_task():
+    """
+    Roll up the newly settled days of the apps whose statistics are being viewed.
+
+    This task is the only writer of the rollup table: dashboards read the days it rolled up and
+    aggregate the other ones from the messages. The history of an app back to its creation is
+    backfilled over the runs, a bounded number of days at a time, most recent days first.
+    """
+    click.echo(click.style("Start update app daily statistics.", fg="green"))
+    start_at = time.perf_counter()
+
+    targets = AppStatisticService.get_rollup_targets(naive_utc_now() - datetime.timedelta(days=ACTIVE_ROLLUP_DAYS))
+
+    updated = 0
+    for app_id, timezone in targets:
+        try:
+            created_at = db.session.scalar(select(App.created_at).where(App.id == app_id))
+            if created_at is None:
+                continue
+            tz = pytz.timezone(timezone)
+            first = pytz.utc.localize(created_at).astimezone(tz).date()
+            last = AppStatisticService.get_settled_date(tz)
+            AppStatisticService.roll_up(
+                app_id, timezone, first, last, max_days=dify_config.APP_STATISTICS_ROLLUP_TASK_DAYS
+            )
+            updated += 1
+        except Exception:
+            db.session.rollback()
+            logger.exception("Failed to update daily statistics of app %s in %s", app_id, timezone)
+        finally:
+            db.session.close()
+
+    end_at = time.perf_counter()
+    click.echo(
+        click.style(
+            f"Updated daily statistics of {updated}/{len(targets)} apps and timezones latency: {end_at - start_at}",
+            fg="green",
+        )
+    )
@@ -0,0 +1,437 @@
+import datetime
+import logging
+from collections.abc import Collection, Iterable
+from dataclasses import dataclass, fields
+from decimal import Decimal
+from typing import Any
+
+import pytz
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import insert
+
+from configs import dify_config
+from core.app.entities.app_invoke_entities import InvokeFrom
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from libs.datetime_utils import naive_utc_now
+from models.model import AppDailyStatistic
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_WRITE_BATCH_SIZE = 1000
+
+# apps and timezones whose statistics are viewed, scored by the time they were last viewed
+ROLLUP_TARGETS_KEY = "app_statistics_rollup_targets"
+
+# expression of each message metric, the message count is always selected as days without messages are left out
+_MESSAGE_METRIC_COLUMNS = {
+    "message_count": "COUNT(*)",
+    "conversation_count": "COUNT(DISTINCT m.conversation_id) FILTER (WHERE m.invoke_from != :debugger)",
+    "end_user_count": "COUNT(DISTINCT m.from_end_user_id)",
+    "message_tokens": "COALESCE(SUM(m.message_tokens), 0)",
+    "answer_tokens": "COALESCE(SUM(m.answer_tokens), 0)",
+    "total_price": "SUM(m.total_price)",
+    "provider_response_latency": "COALESCE(SUM(m.provider_response_latency), 0)",
+    "like_count": "COALESCE(SUM(mf.like_count), 0)",
+}
+
+_SESSION_METRICS = frozenset({"session_count", "session_message_count"})
+
+_MESSAGE_STATISTICS_SQL = """SELECT
+    DATE(DATE_TRUNC('day', m.created_at AT TIME ZONE 'UTC' AT TIME ZONE :tz )) AS date,
+    {columns}
+FROM
+    messages m{feedback_join}
+WHERE
+    m.app_id = :app_id{message_filters}
+GROUP BY date"""
+
+_FEEDBACK_JOIN_SQL = """
+LEFT JOIN
+    (
+        SELECT
+            message_id,
+            COUNT(*) AS like_count
+        FROM
+            message_feedbacks
+        WHERE
+            app_id = :app_id AND rating = 'like'{feedback_filters}
+        GROUP BY message_id
+    ) mf
+    ON mf.message_id = m.id"""
+
+_SESSION_STATISTICS_SQL = """SELECT
+    DATE(DATE_TRUNC('day', c.created_at AT TIME ZONE 'UTC' AT TIME ZONE :tz )) AS date,
+    COUNT(*) AS session_count,
+    SUM(subquery.message_count) AS session_message_count
+FROM
+    (
+        SELECT
+            m.conversation_id,
+            COUNT(m.id) AS message_count
+        FROM
+            conversations c
+        JOIN
+            messages m
+            ON c.id = m.conversation_id
+        WHERE
+            c.app_id = :app_id{conversation_filters}
+        GROUP BY m.conversation_id
+    ) subquery
+JOIN
+    conversations c
+    ON c.id = subquery.conversation_id
+GROUP BY date"""
+
+
+@dataclass
+class DailyStatistic:
+    """
+    Message statistics of an app for one day, stored as sums.
+
+    `session_count` and `session_message_count` cover the conversations created that day and all of their
+    messages, for the average session interactions.
+    """
+
+    date: datetime.date
+    message_count: int = 0
+    conversation_count: int = 0
+    end_user_count: int = 0
+    message_tokens: int = 0
+    answer_tokens: int = 0
+    total_price: Decimal | None = None
+    provider_response_latency: float = 0.0
+    like_count: int = 0
+    session_count: int = 0
+    session_message_count: int = 0
+
+    @property
+    def token_count(self) -> int:
+        return self.message_tokens + self.answer_tokens
+
+    @property
+    def interactions(self) -> float:
+        if not self.session_count:
+            return 0.0
+        return float((Decimal(self.session_message_count) / Decimal(self.session_count)).quantize(Decimal("0.01")))
+
+    @property
+    def satisfaction_rate(self) -> float:
+        return round(self.like_count * 1000 / self.message_count if self.message_count > 0 else 0, 2)
+
+    @property
+    def average_response_time(self) -> float:
+        if not self.message_count:
+            return 0.0
+        return round(self.provider_response_latency / self.message_count * 1000, 4)
+
+    @property
+    def tokens_per_second(self) -> float:
+        if not self.provider_response_latency:
+            return 0.0
+        return round(self.answer_tokens / self.provider_response_latency, 4)
+
+
+_STATISTIC_FIELDS = [f.name for f in fields(DailyStatistic) if f.name != "date"]
+
+
+class AppStatisticService:
+    """
+    Daily statistics of an app in the timezone of the viewer.
+
+    Days that are over, plus a settle window for late messages and feedbacks, are read from the
+    `app_daily_statistics` rollup table, which is only written by the rollup task for the apps and
+    timezones that are viewed, backfilling their history over its runs. The partial days at the edges
+    of the requested range, the days not settled yet and the days not rolled up yet are aggregated from
+    the messages, only for the metrics the caller reads. Each day comes from exactly one of the two
+    sources, so distinct counts are never added up across sources.
+    """
+
+    @classmethod
+    def get_daily_statistics(
+        cls,
+        app_id: str,
+        timezone: str,
+        since: datetime.datetime,
+        start: datetime.datetime | None = None,
+        end: datetime.datetime | None = None,
+        metrics: Collection[str] | None = None,
+    ) -> list[DailyStatistic]:
+        """
+        :param app_id: app id
+        :param timezone: timezone the days are computed in
+        :param since: UTC creation time of the app, no message of the app is older
+        :param start: inclusive start of the range in the timezone, None for the whole history
+        :param end: exclusive end of the range in the timezone, None for up to now
+        :param metrics: fields of DailyStatistic the caller reads, None for all of them, the other fields
+            of the days that are not rolled up are left to 0
+        :return: statistics of the days with messages or sessions, ordered by date
+        """
+        tz = pytz.timezone(timezone)
+        start_utc = cls._to_utc(tz, start) if start else None
+        end_utc = cls._to_utc(tz, end) if end else None
+
+        statistics: dict[datetime.date, DailyStatistic] = {}
+        rollup_range = None
+        if dify_config.APP_STATISTICS_ROLLUP_ENABLED:
+            rollup_range = cls._get_rollup_range(tz, since, start, end)
+        if rollup_range is None:
+            live_ranges = [(start_utc, end_utc)]
+        else:
+            cls.track_rollup_target(app_id, timezone)
+            first, last = rollup_range
+            rolled_up = cls.get_rolled_up(app_id, timezone, first, last)
+            statistics.update(rolled_up)
+            missing_dates = [date for date in cls._dates(first, last) if date not in rolled_up]
+            live_ranges = cls._merge_ranges(
+                [
+                    (start_utc, cls._day_start(tz, first)),
+                    *(
+                        (cls._day_start(tz, run_first), cls._day_start(tz, run_last))
+                        for run_first, run_last in cls._runs(missing_dates)
+                    ),
+                    (cls._day_start(tz, last), end_utc),
+                ]
+            )
+
+        # the live ranges only cover the days that are not rolled up, so no day is in two sources
+        for range_start, range_end in live_ranges:
+            if range_start is not None and range_end is not None and range_start >= range_end:
+                continue
+            statistics.update(cls.aggregate(app_id, timezone, range_start, range_end, metrics))
+
+        return [
+            statistics[date]
+            for date in sorted(statistics)
+            if statistics[date].message_count or statistics[date].session_count
+        ]
+
+    @staticmethod
+    def get_rolled_up(
+        app_id: str, timezone: str, first: datetime.date, last: datetime.date
+    ) -> dict[datetime.date, DailyStatistic]:
+        """
+        Get the statistics of the days from first to last (exclusive) that are stored in the rollup table.
+        """
+        rows = db.session.scalars(
+            sa.select(AppDailyStatistic).where(
+                AppDailyStatistic.app_id == app_id,
+                AppDailyStatistic.timezone == timezone,
+                AppDailyStatistic.date >= first,
+                AppDailyStatistic.date < last,
+            )
+        ).all()
+        return {
+            row.date: DailyStatistic(date=row.date, **{name: getattr(row, name) for name in _STATISTIC_FIELDS})
+            for row in rows
+        }
+
+    @classmethod
+    def roll_up(
+        cls, app_id: str, timezone: str, first: datetime.date, last: datetime.date, max_days: int | None = None
+    ) -> int:
+        """
+        Aggregate and store the days from first to last (exclusive) that are not rolled up yet.
+
+        The caller must only pass days that are settled.
+
+        :param max_days: maximum number of days to roll up, the most recent missing days first
+        :return: number of days rolled up
+        """
+        tz = pytz.timezone(timezone)
+        stored_dates = set(
+            db.session.scalars(
+                sa.select(AppDailyStatistic.date).where(
+                    AppDailyStatistic.app_id == app_id,
+                    AppDailyStatistic.timezone == timezone,
+                    AppDailyStatistic.date >= first,
+                    AppDailyStatistic.date < last,
+                )
+            ).all()
+        )
+        missing_dates = [date for date in cls._dates(first, last) if date not in stored_dates]
+        if max_days is not None:
+            missing_dates = missing_dates[-max_days:] if max_days > 0 else []
+        if not missing_dates:
+            return 0
+
+        computed: dict[datetime.date, DailyStatistic] = {}
+        for run_first, run_last in cls._runs(missing_dates):
+            aggregated = cls.aggregate(app_id, timezone, cls._day_start(tz, run_first), cls._day_start(tz, run_last))
+            for date in cls._dates(run_first, run_last):
+                computed[date] = aggregated.get(date) or DailyStatistic(date=date)
+
+        values = [
+            {"app_id": app_id, "timezone": timezone, "date": date, **cls._values(statistic)}
+            for date, statistic in computed.items()
+        ]
+        for i in range(0, len(values), ROLLUP_WRITE_BATCH_SIZE):
+            stmt = insert(AppDailyStatistic).values(values[i : i + ROLLUP_WRITE_BATCH_SIZE])
+            db.session.execute(stmt.on_conflict_do_nothing())
+        db.session.commit()
+        logger.info("Rolled up %s days of statistics of app %s in %s", len(computed), app_id, timezone)
+        return len(computed)
+
+    @staticmethod
+    def track_rollup_target(app_id: str, timezone: str):
+        """Mark the statistics of the app in the timezone as viewed, so that the rollup task keeps them up to date."""
+        try:
+            redis_client.zadd(
+                ROLLUP_TARGETS_KEY, {f"{app_id}:{timezone}": naive_utc_now().replace(tzinfo=datetime.UTC).timestamp()}
+            )
+        except Exception:
+            logger.warning("Failed to track the statistics rollup of app %s in %s", app_id, timezone, exc_info=True)
+
+    @staticmethod
+    def get_rollup_targets(since: datetime.datetime) -> list[tuple[str, str]]:
+        """
+        Get the apps and timezones whose statistics were viewed since the given naive UTC time,
+        forgetting the ones viewed before.
+        """
+        since_timestamp = since.replace(tzinfo=datetime.UTC).timestamp()
+        redis_client.zremrangebyscore(ROLLUP_TARGETS_KEY, "-inf", f"({since_timestamp}")
+        targets = []
+        for member in redis_client.zrangebyscore(ROLLUP_TARGETS_KEY, since_timestamp, "+inf"):
+            app_id, timezone = member.decode().split(":", 1)
+            targets.append((app_id, timezone))
+        return targets
+
+    @classmethod
+    def aggregate(
+        cls,
+        app_id: str,
+        timezone: str,
+        start: datetime.datetime | None,
+        end: datetime.datetime | None,
+        metrics: Collection[str] | None = None,
+    ) -> dict[datetime.date, DailyStatistic]:
+        """
+        Aggregate the statistics of the messages created between start and end (naive UTC, None for unbounded).
+
+        Only the queries and columns of the given metrics are run, None for all of them.
+        """
+        requested = set(_STATISTIC_FIELDS if metrics is None else metrics)
+        message_metrics = [name for name in _MESSAGE_METRIC_COLUMNS if name in requested]
+        if message_metrics and "message_count" not in message_metrics:
+            message_metrics.insert(0, "message_count")
+
+        arg_dict: dict[str, Any] = {"tz": timezone, "app_id": app_id, "debugger": InvokeFrom.DEBUGGER.value}
+        message_filters = ""
+        feedback_filters = ""
+        conversation_filters = ""
+        if start is not None:
+            message_filters += " AND m.created_at >= :start"
+            # a message is always liked after it is created
+            feedback_filters += " AND created_at >= :start"
+            conversation_filters += " AND c.created_at >= :start"
+            arg_dict["start"] = start
+        if end is not None:
+            message_filters += " AND m.created_at < :end"
+            conversation_filters += " AND c.created_at < :end"
+            arg_dict["end"] = end
+
+        statistics: dict[datetime.date, DailyStatistic] = {}
+        with db.engine.begin() as conn:
+            if message_metrics:
+                sql = _MESSAGE_STATISTICS_SQL.format(
+                    columns=",\n    ".join(f"{_MESSAGE_METRIC_COLUMNS[name]} AS {name}" for name in message_metrics),
+                    feedback_join=(
+                        _FEEDBACK_JOIN_SQL.format(feedback_filters=feedback_filters)
+                        if "like_count" in message_metrics
+                        else ""
+                    ),
+                    message_filters=message_filters,
+                )
+                for row in conn.execute(sa.text(sql), arg_dict):
+                    statistics[row.date] = DailyStatistic(
+                        date=row.date, **{name: getattr(row, name) for name in message_metrics}
+                    )
+
+            if requested & _SESSION_METRICS:
+                rs = conn.execute(
+                    sa.text(_SESSION_STATISTICS_SQL.format(conversation_filters=conversation_filters)), arg_dict
+                )
+                for row in rs:
+                    statistic = statistics.setdefault(row.date, DailyStatistic(date=row.date))
+                    statistic.session_count = row.session_count
+                    statistic.session_message_count = row.session_message_count
+
+        return statistics
+
+    @classmethod
+    def get_settled_date(cls, tz: pytz.BaseTzInfo, now: datetime.datetime | None = None) -> datetime.date:
+        """
+        Get the first day that is not settled yet in the timezone: all days before it can be rolled up.
+        """
+        now = now or naive_utc_now()
+        settled_at = now - datetime.timedelta(hours=dify_config.APP_STATISTICS_ROLLUP_SETTLE_HOURS)
+        return pytz.utc.localize(settled_at).astimezone(tz).date()
+
+    @classmethod
+    def _get_rollup_range(
+        cls,
+        tz: pytz.BaseTzInfo,
+        since: datetime.datetime,
+        start: datetime.datetime | None,
+        end: datetime.datetime | None,
+    ) -> tuple[datetime.date, datetime.date] | None:
+        """
+        Get the whole settled days of the requested range, from first to last (exclusive).
+        """
+        if start is None:
+            # nothing happened before the app was created, so its first day counts as a whole one
+            first = pytz.utc.localize(since).astimezone(tz).date()
+        elif start.time() == datetime.time.min:
+            first = start.date()
+        else:
+            first = start.date() + datetime.timedelta(days=1)
+
+        last = cls.get_settled_date(tz)
+        if end is not None:
+            # the day of the end is either excluded or partial
+            last = min(last, end.date())
+
+        if first >= last:
+            return None
+        return first, last
+
+    @staticmethod
+    def _to_utc(tz: pytz.BaseTzInfo, value: datetime.datetime) -> datetime.datetime:
+        return tz.localize(value).astimezone(pytz.utc).replace(tzinfo=None)
+
+    @classmethod
+    def _day_start(cls, tz: pytz.BaseTzInfo, date: datetime.date) -> datetime.datetime:
+        return cls._to_utc(tz, datetime.datetime.combine(date, datetime.time.min))
+
+    @staticmethod
+    def _dates(first: datetime.date, last: datetime.date) -> Iterable[datetime.date]:
+        for offset in range((last - first).days):
+            yield first + datetime.timedelta(days=offset)
+
+    @staticmethod
+    def _runs(dates: list[datetime.date]) -> list[tuple[datetime.date, datetime.date]]:
+        """Group sorted dates into ranges of consecutive days, from first to last (exclusive)."""
+        runs: list[tuple[datetime.date, datetime.date]] = []
+        for date in dates:
+            if runs and runs[-1][1] == date:
+                runs[-1] = (runs[-1][0], date + datetime.timedelta(days=1))
+            else:
+                runs.append((date, date + datetime.timedelta(days=1)))
+        return runs
+
+    @staticmethod
+    def _merge_ranges(
+        ranges: list[tuple[datetime.datetime | None, datetime.datetime | None]],
+    ) -> list[tuple[datetime.datetime | None, datetime.datetime | None]]:
+        """Merge sorted adjacent ranges, so that consecutive days are aggregated in a single query."""
+        merged: list[tuple[datetime.datetime | None, datetime.datetime | None]] = []
+        for range_start, range_end in ranges:
+            if merged and merged[-1][1] is not None and merged[-1][1] == range_start:
+                merged[-1] = (merged[-1][0], range_end)
+            else:
+                merged.append((range_start, range_end))
+        return merged
+
+    @staticmethod
+    def _values(statistic: DailyStatistic) -> dict[str, Any]:
+        return {name: getattr(statistic, name) for name in _STATISTIC_FIELDS}
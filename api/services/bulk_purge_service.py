@@ -0,0 +1,321 @@
+import datetime
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import delete, select, tuple_
+
+from core.repositories.workflow_node_execution_payload_offloader import delete_offloaded_payloads
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.model import (
+    App,
+    AppAnnotationHitHistory,
+    Conversation,
+    Message,
+    MessageAgentThought,
+    MessageAnnotation,
+    MessageChain,
+    MessageFeedback,
+    MessageFile,
+)
+from models.web import SavedMessage
+from models.workflow import ConversationVariable, WorkflowAppLog, WorkflowNodeExecutionModel, WorkflowRun
+from services.feature_service import FeatureService
+
+logger = logging.getLogger(__name__)
+
+PURGE_CHECKPOINT_TTL = 7 * 24 * 60 * 60
+
+
+@dataclass
+class PurgeStats:
+    batches: int = 0
+    failed_batches: int = 0
+    deleted_rows: dict[str, int] = field(default_factory=dict)
+    elapsed: float = 0.0
+    completed: bool = False
+
+    @property
+    def total_deleted_rows(self) -> int:
+        return sum(self.deleted_rows.values())
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.total_deleted_rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class BulkPurger(ABC):
+    """
+    Set-based deletion of expired rows, one keyset-paginated batch of ids at a time.
+
+    Each batch is deleted from every related table with one `DELETE ... WHERE ... IN` statement per table
+    and committed on its own. The keyset cursor is checkpointed in Redis after every batch, so a purge that
+    is interrupted or aborted resumes where it stopped; the checkpoint is cleared once the purge completes.
+    """
+
+    name: str
+
+    def __init__(self, batch_size: int, batch_interval: float = 0.0, max_retries: int = 3, retry_interval: float = 300):
+        """
+        :param batch_size: number of ids fetched per batch
+        :param batch_interval: seconds to sleep between batches to throttle the load on the database
+        :param max_retries: consecutive failed attempts after which the purge is aborted
+        :param retry_interval: seconds to wait before retrying a failed batch, multiplied by the attempt number
+        """
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_retries = max_retries
+        self.retry_interval = retry_interval
+
+    @abstractmethod
+    def fetch_batch(self, cursor: Any | None) -> tuple[list[str], Any | None]:
+        """
+        Fetch the next batch of ids to delete.
+
+        :param cursor: keyset cursor returned by the previous batch, None to start from the beginning
+        :return: ids to delete and cursor of the next batch, or None as cursor when no rows are left
+        """
+
+    @abstractmethod
+    def delete_batch(self, ids: Sequence[str]) -> dict[str, int]:
+        """
+        Delete the rows of the ids and of their related tables, without committing.
+
+        :return: number of deleted rows per table
+        """
+
+    def on_batch_committed(self):
+        """
+        Called after a batch is committed, to clean up what lives outside of the database.
+
+        Optional, purgers without anything outside of the database do not override it.
+        """
+        return None
+
+    def dump_cursor(self, cursor: Any) -> str:
+        return json.dumps(cursor)
+
+    def load_cursor(self, value: str) -> Any:
+        return json.loads(value)
+
+    def run(self) -> PurgeStats:
+        stats = PurgeStats()
+        start_at = time.perf_counter()
+        cursor = self._load_checkpoint()
+        if cursor is not None:
+            logger.info("%s: resuming from checkpoint %s", self.name, cursor)
+
+        failed_attempts = 0
+        while True:
+            try:
+                ids, next_cursor = self.fetch_batch(cursor)
+                deleted_rows = self.delete_batch(ids) if ids else {}
+                db.session.commit()
+                self.on_batch_committed()
+            except Exception:
+                db.session.rollback()
+                failed_attempts += 1
+                stats.failed_batches += 1
+                logger.exception("%s: batch deletion failed (attempt %s)", self.name, failed_attempts)
+                if failed_attempts >= self.max_retries:
+                    logger.exception(
+                        "%s: failed to delete batch after %s retries, aborting", self.name, failed_attempts
+                    )
+                    break
+                time.sleep(failed_attempts * self.retry_interval)
+                continue
+
+            failed_attempts = 0
+            stats.batches += 1
+            for table, count in deleted_rows.items():
+                stats.deleted_rows[table] = stats.deleted_rows.get(table, 0) + count
+            stats.elapsed = time.perf_counter() - start_at
+
+            if next_cursor is None:
+                stats.completed = True
+                redis_client.delete(self._checkpoint_key())
+                break
+
+            cursor = next_cursor
+            redis_client.setex(self._checkpoint_key(), PURGE_CHECKPOINT_TTL, self.dump_cursor(cursor))
+            logger.info(
+                "%s: batch %s deleted %s rows, %s rows in total (%.1f rows/s)",
+                self.name,
+                stats.batches,
+                sum(deleted_rows.values()),
+                stats.total_deleted_rows,
+                stats.rows_per_second,
+            )
+            if self.batch_interval > 0:
+                time.sleep(self.batch_interval)
+
+        stats.elapsed = time.perf_counter() - start_at
+        logger.info(
+            "%s: %s, %s batches, %s rows deleted in %.2fs (%.1f rows/s): %s",
+            self.name,
+            "completed" if stats.completed else "aborted",
+            stats.batches,
+            stats.total_deleted_rows,
+            stats.elapsed,
+            stats.rows_per_second,
+            stats.deleted_rows,
+        )
+        return stats
+
+    def _checkpoint_key(self) -> str:
+        return f"bulk_purge:{self.name}:checkpoint"
+
+    def _load_checkpoint(self) -> Any | None:
+        value = redis_client.get(self._checkpoint_key())
+        if value is None:
+            return None
+        return self.load_cursor(value.decode() if isinstance(value, bytes) else value)
+
+
+def delete_messages(message_ids: Sequence[str]) -> dict[str, int]:
+    """
+    Delete messages and the rows of all tables related to them, without committing.
+
+    :return: number of deleted rows per table
+    """
+    deleted_rows: dict[str, int] = {}
+    if not message_ids:
+        return deleted_rows
+    for model in (
+        AppAnnotationHitHistory,
+        MessageAgentThought,
+        MessageChain,
+        MessageFile,
+        MessageAnnotation,
+        MessageFeedback,
+        SavedMessage,
+    ):
+        result = db.session.execute(delete(model).where(model.message_id.in_(message_ids)))
+        deleted_rows[model.__tablename__] = result.rowcount
+    result = db.session.execute(delete(Message).where(Message.id.in_(message_ids)))
+    deleted_rows[Message.__tablename__] = result.rowcount
+    return deleted_rows
+
+
+class ExpiredMessagePurger(BulkPurger):
+    """
+    Delete the messages created before the cutoff in apps of workspaces on the sandbox plan.
+    """
+
+    name = "expired_messages"
+
+    def __init__(self, cutoff: datetime.datetime, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.cutoff = cutoff
+        self._plans: dict[str, str] = {}
+
+    def fetch_batch(self, cursor: tuple[datetime.datetime, str] | None) -> tuple[list[str], Any | None]:
+        stmt = select(Message.id, Message.app_id, Message.created_at).where(Message.created_at < self.cutoff)
+        if cursor is not None:
+            stmt = stmt.where(tuple_(Message.created_at, Message.id) > tuple_(*cursor))
+        rows = db.session.execute(stmt.order_by(Message.created_at, Message.id).limit(self.batch_size)).all()
+        if not rows:
+            return [], None
+
+        app_ids = {row.app_id for row in rows}
+        app_tenants = dict(db.session.execute(select(App.id, App.tenant_id).where(App.id.in_(app_ids))).tuples().all())
+        for app_id in app_ids - app_tenants.keys():
+            logger.warning("Expected App record to exist, but none was found, app_id=%s", app_id)
+
+        ids = [
+            row.id for row in rows if row.app_id in app_tenants and self._get_plan(app_tenants[row.app_id]) == "sandbox"
+        ]
+        return ids, (rows[-1].created_at, rows[-1].id)
+
+    def delete_batch(self, ids: Sequence[str]) -> dict[str, int]:
+        return delete_messages(ids)
+
+    def dump_cursor(self, cursor: tuple[datetime.datetime, str]) -> str:
+        created_at, message_id = cursor
+        return json.dumps([created_at.isoformat(), message_id])
+
+    def load_cursor(self, value: str) -> tuple[datetime.datetime, str]:
+        created_at, message_id = json.loads(value)
+        return datetime.datetime.fromisoformat(created_at), message_id
+
+    def _get_plan(self, tenant_id: str) -> str:
+        plan = self._plans.get(tenant_id)
+        if plan is not None:
+            return plan
+        features_cache_key = f"features:{tenant_id}"
+        plan_cache = redis_client.get(features_cache_key)
+        if plan_cache is None:
+            features = FeatureService.get_features(tenant_id)
+            plan = features.billing.subscription.plan
+            redis_client.setex(features_cache_key, 600, plan)
+        else:
+            plan = plan_cache.decode()
+        self._plans[tenant_id] = plan
+        return plan
+
+
+class ExpiredWorkflowRunPurger(BulkPurger):
+    """
+    Delete the workflow runs created before the cutoff with their node executions, app logs,
+    messages and conversations.
+    """
+
+    name = "expired_workflow_runs"
+
+    def __init__(self, cutoff: datetime.datetime, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.cutoff = cutoff
+        self._payload_storage_keys: list[str] = []
+
+    def fetch_batch(self, cursor: str | None) -> tuple[list[str], Any | None]:
+        # paginate on the primary key, workflow_runs has no index on created_at
+        stmt = select(WorkflowRun.id).where(WorkflowRun.created_at < self.cutoff)
+        if cursor is not None:
+            stmt = stmt.where(WorkflowRun.id > cursor)
+        ids = list(db.session.scalars(stmt.order_by(WorkflowRun.id).limit(self.batch_size)).all())
+        if not ids:
+            return [], None
+        return ids, ids[-1]
+
+    def delete_batch(self, ids: Sequence[str]) -> dict[str, int]:
+        message_data = db.session.execute(
+            select(Message.id, Message.conversation_id).where(Message.workflow_run_id.in_(ids))
+        ).all()
+        message_ids = [message.id for message in message_data]
+        conversation_ids = list({message.conversation_id for message in message_data if message.conversation_id})
+
+        # the offloaded payloads are deleted from the storage once the rows are gone
+        self._payload_storage_keys = [
+            storage_key
+            for storage_keys in db.session.scalars(
+                select(WorkflowNodeExecutionModel.payload_storage_keys).where(
+                    WorkflowNodeExecutionModel.workflow_run_id.in_(ids),
+                    WorkflowNodeExecutionModel.payload_storage_keys.is_not(None),
+                )
+            )
+            for storage_key in json.loads(storage_keys).values()
+        ]
+
+        deleted_rows = delete_messages(message_ids)
+        for model in (WorkflowAppLog, WorkflowNodeExecutionModel):
+            result = db.session.execute(delete(model).where(model.workflow_run_id.in_(ids)))
+            deleted_rows[model.__tablename__] = result.rowcount
+        if conversation_ids:
+            result = db.session.execute(
+                delete(ConversationVariable).where(ConversationVariable.conversation_id.in_(conversation_ids))
+            )
+            deleted_rows[ConversationVariable.__tablename__] = result.rowcount
+            result = db.session.execute(delete(Conversation).where(Conversation.id.in_(conversation_ids)))
+            deleted_rows[Conversation.__tablename__] = result.rowcount
+        result = db.session.execute(delete(WorkflowRun).where(WorkflowRun.id.in_(ids)))
+        deleted_rows[WorkflowRun.__tablename__] = result.rowcount
+        return deleted_rows
+
+    def on_batch_committed(self):
+        delete_offloaded_payloads(self._payload_storage_keys)
+        self._payload_storage_keys = []
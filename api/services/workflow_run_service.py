@@ -119,3 +119,17 @@ class WorkflowRunService:
             app_id=app_model.id,
             workflow_run_id=run_id,
         )
+
+    def get_workflow_run_node_execution(
+        self, app_model: App, run_id: str, node_execution_id: str
+    ) -> WorkflowNodeExecutionModel | None:
+        """
+        Get a workflow run node execution, with its offloaded payloads
+        """
+        node_execution = self._node_execution_service_repo.get_execution_by_id(
+            execution_id=node_execution_id,
+            tenant_id=app_model.tenant_id,
+        )
+        if node_execution is None or node_execution.app_id != app_model.id or node_execution.workflow_run_id != run_id:
+            return None
+        return node_execution
@@ -676,6 +676,8 @@ class WorkflowService:
             triggered_from=WorkflowNodeExecutionTriggeredFrom.SINGLE_STEP,
         )
         repository.save(node_execution)
+        # the write-behind repository only queues the write
+        repository.flush()
 
         workflow_node_execution = self._node_execution_service_repo.get_execution_by_id(node_execution.id)
         if workflow_node_execution is None:
@@ -1,10 +1,11 @@
+import gzip
 import json
 import logging
 
 from celery import shared_task
 from flask import current_app
 
-from core.ops.entities.config_entity import OPS_FILE_PATH, OPS_TRACE_FAILED_KEY
+from core.ops.entities.config_entity import OPS_FILE_PATH, OPS_TRACE_FAILED_KEY, OPS_TRACE_SEGMENT_SUFFIX
 from core.ops.entities.trace_entity import trace_info_info_map
 from core.rag.models.document import Document
 from extensions.ext_redis import redis_client
@@ -20,25 +21,45 @@ def process_trace_tasks(file_info):
     """
     Async process trace tasks
     Usage: process_trace_tasks.delay(tasks_data)
+
+    `file_info` points either to a gzip-compressed NDJSON segment of traces of the app when its
+    `segment` flag is set, or to a single trace.
     """
     from core.ops.ops_trace_manager import OpsTraceManager
 
     app_id = file_info.get("app_id")
     file_id = file_info.get("file_id")
-    file_path = f"{OPS_FILE_PATH}{app_id}/{file_id}.json"
-    file_data = json.loads(storage.load(file_path))
-    trace_info = file_data.get("trace_info")
-    trace_info_type = file_data.get("trace_info_type")
+    if file_info.get("segment"):
+        file_path = f"{OPS_FILE_PATH}{app_id}/{file_id}{OPS_TRACE_SEGMENT_SUFFIX}"
+    else:
+        file_path = f"{OPS_FILE_PATH}{app_id}/{file_id}.json"
+
+    data = storage.load(file_path)
+    if file_info.get("segment"):
+        file_data_list = [json.loads(line) for line in gzip.decompress(data).splitlines() if line]
+    else:
+        file_data_list = [json.loads(data)]
     trace_instance = OpsTraceManager.get_ops_trace_instance(app_id)
 
-    if trace_info.get("message_data"):
-        trace_info["message_data"] = Message.from_dict(data=trace_info["message_data"])
-    if trace_info.get("workflow_data"):
-        trace_info["workflow_data"] = WorkflowRun.from_dict(data=trace_info["workflow_data"])
-    if trace_info.get("documents"):
-        trace_info["documents"] = [Document(**doc) for doc in trace_info["documents"]]
+    try:
+        for file_data in file_data_list:
+            _process_trace(trace_instance, app_id, file_data)
+    finally:
+        storage.delete(file_path)
+
+
+def _process_trace(trace_instance, app_id: str, file_data: dict):
+    trace_info = file_data.get("trace_info")
+    trace_info_type = file_data.get("trace_info_type")
 
     try:
+        if trace_info.get("message_data"):
+            trace_info["message_data"] = Message.from_dict(data=trace_info["message_data"])
+        if trace_info.get("workflow_data"):
+            trace_info["workflow_data"] = WorkflowRun.from_dict(data=trace_info["workflow_data"])
+        if trace_info.get("documents"):
+            trace_info["documents"] = [Document(**doc) for doc in trace_info["documents"]]
+
         if trace_instance:
             with current_app.app_context():
                 trace_type = trace_info_info_map.get(trace_info_type)
@@ -51,5 +72,3 @@ def process_trace_tasks(file_info):
         failed_key = f"{OPS_TRACE_FAILED_KEY}_{app_id}"
         redis_client.incr(failed_key)
         logger.info("Processing trace tasks failed, app_id: %s", app_id)
-    finally:
-        storage.delete(file_path)
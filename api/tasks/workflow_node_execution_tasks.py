@@ -12,6 +12,7 @@ from celery import shared_task
 from sqlalchemy import select
 from sqlalchemy.orm import sessionmaker
 
+from core.repositories.workflow_node_execution_payload_offloader import WorkflowNodeExecutionPayloadOffloader
 from core.workflow.entities.workflow_node_execution import (
     WorkflowNodeExecution,
 )
@@ -51,6 +52,8 @@ def save_workflow_node_execution_task(
         # Create a new session for this task
         session_factory = sessionmaker(bind=db.engine, expire_on_commit=False)
 
+        payload_offloader = WorkflowNodeExecutionPayloadOffloader.from_config()
+
         with session_factory() as session:
             # Deserialize execution data
             execution = WorkflowNodeExecution.model_validate(execution_data)
@@ -63,6 +66,8 @@ def save_workflow_node_execution_task(
             if existing_execution:
                 # Update existing node execution
                 _update_node_execution_from_domain(existing_execution, execution)
+                if payload_offloader is not None:
+                    payload_offloader.offload(existing_execution)
                 logger.debug("Updated existing workflow node execution: %s", execution.id)
             else:
                 # Create new node execution
@@ -74,6 +79,8 @@ def save_workflow_node_execution_task(
                     creator_user_id=creator_user_id,
                     creator_user_role=CreatorUserRole(creator_user_role),
                 )
+                if payload_offloader is not None:
+                    payload_offloader.offload(node_execution)
                 session.add(node_execution)
                 logger.debug("Created new workflow node execution: %s", execution.id)
 
@@ -0,0 +1,95 @@
+"""Integration tests running the rate limit Lua scripts on a real Redis server."""
+
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from core.app.features.rate_limiting.rate_limit import RateLimit
+from core.errors.error import AppInvokeQuotaExceededError
+from extensions.ext_redis import redis_client
+from libs.helper import RateLimiter
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limit_instances(flask_app_with_containers):
+    RateLimit._instance_dict.clear()
+    yield
+    RateLimit._instance_dict.clear()
+
+
+class TestRateLimit:
+    def test_enter_admits_up_to_the_max_active_requests(self):
+        rate_limit = RateLimit(f"client-{uuid.uuid4()}", 2)
+
+        first = rate_limit.enter()
+        rate_limit.enter()
+        with pytest.raises(AppInvokeQuotaExceededError):
+            rate_limit.enter()
+
+        assert redis_client.zcard(rate_limit.active_requests_key) == 2
+        rate_limit.exit(first)
+        rate_limit.enter()
+        assert redis_client.zcard(rate_limit.active_requests_key) == 2
+
+    def test_enter_drops_expired_requests(self):
+        rate_limit = RateLimit(f"client-{uuid.uuid4()}", 1)
+
+        with patch("core.app.features.rate_limiting.rate_limit.time.time", return_value=1000.0):
+            rate_limit.enter()
+            with pytest.raises(AppInvokeQuotaExceededError):
+                rate_limit.enter()
+
+        # the first request never exited, it expires after the max alive time
+        expired_at = 1000.0 + RateLimit._REQUEST_MAX_ALIVE_TIME
+        with patch("core.app.features.rate_limiting.rate_limit.time.time", return_value=expired_at):
+            rate_limit.enter()
+
+        assert redis_client.zcard(rate_limit.active_requests_key) == 1
+
+    def test_flush_cache_keeps_the_stored_max_active_requests(self):
+        client_id = f"client-{uuid.uuid4()}"
+        rate_limit = RateLimit(client_id, 3)
+        assert redis_client.get(rate_limit.max_active_requests_key) == b"3"
+
+        # another process stored a new limit, which is read back on the next flush
+        redis_client.set(rate_limit.max_active_requests_key, 5)
+        rate_limit.flush_cache()
+
+        assert rate_limit.max_active_requests == 5
+        assert redis_client.ttl(rate_limit.max_active_requests_key) > 0
+
+        rate_limit.max_active_requests = 4
+        rate_limit.flush_cache(use_local_value=True)
+        assert redis_client.get(rate_limit.max_active_requests_key) == b"4"
+
+
+class TestRateLimiter:
+    def test_try_acquire_records_attempts_until_the_limit(self):
+        rate_limiter = RateLimiter(prefix=f"test_rate_limit_{uuid.uuid4()}", max_attempts=2, time_window=60)
+
+        assert rate_limiter.try_acquire("user@example.com")
+        assert rate_limiter.try_acquire("user@example.com")
+        assert not rate_limiter.try_acquire("user@example.com")
+        assert rate_limiter.is_rate_limited("user@example.com")
+        assert not rate_limiter.is_rate_limited("other@example.com")
+
+    def test_attempts_within_the_same_second_are_all_counted(self):
+        rate_limiter = RateLimiter(prefix=f"test_rate_limit_{uuid.uuid4()}", max_attempts=3, time_window=60)
+
+        with patch("libs.helper.time.time", return_value=1000):
+            rate_limiter.increment_rate_limit("user@example.com")
+            assert rate_limiter.try_acquire("user@example.com")
+            assert rate_limiter.try_acquire("user@example.com")
+            assert not rate_limiter.try_acquire("user@example.com")
+
+    def test_attempts_out_of_the_window_are_dropped(self):
+        rate_limiter = RateLimiter(prefix=f"test_rate_limit_{uuid.uuid4()}", max_attempts=1, time_window=60)
+
+        with patch("libs.helper.time.time", return_value=1000):
+            rate_limiter.increment_rate_limit("user@example.com")
+            assert rate_limiter.is_rate_limited("user@example.com")
+
+        with patch("libs.helper.time.time", return_value=1061):
+            assert not rate_limiter.is_rate_limited("user@example.com")
+            assert rate_limiter.try_acquire("user@example.com")
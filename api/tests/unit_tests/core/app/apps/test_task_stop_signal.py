@@ -0,0 +1,73 @@
+import gc
+import weakref
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.app.apps.task_stop_signal import TaskStopSignalListener
+
+
+class _Task:
+    def __init__(self):
+        self.stopped = 0
+
+    def on_stop(self):
+        self.stopped += 1
+
+
+def _listener() -> TaskStopSignalListener:
+    listener = TaskStopSignalListener(channel="test_channel")
+    # the subscription thread is exercised separately
+    listener._run = MagicMock()  # type: ignore[method-assign]
+    return listener
+
+
+def test_dispatch_calls_registered_callback_once():
+    listener = _listener()
+    task = _Task()
+    listener.register("task-1", task.on_stop)
+
+    listener._dispatch("task-1")
+    listener._dispatch("task-1")
+    listener._dispatch("task-2")
+
+    assert task.stopped == 1
+
+
+def test_unregistered_and_collected_tasks_are_ignored():
+    listener = _listener()
+    task = _Task()
+    listener.register("task-1", task.on_stop)
+    listener.unregister("task-1")
+    listener._dispatch("task-1")
+    assert task.stopped == 0
+
+    listener.register("task-2", _Task().on_stop)
+    gc.collect()
+    listener._dispatch("task-2")
+
+
+class _StopListeningError(Exception):
+    pass
+
+
+def test_subscription_dispatches_published_task_ids():
+    listener = TaskStopSignalListener(channel="test_channel")
+    task = _Task()
+    listener._callbacks["task-1"] = weakref.WeakMethod(task.on_stop)
+    pubsub = MagicMock()
+    pubsub.listen.return_value = iter([{"type": "message", "data": b"task-1"}])
+    redis = MagicMock()
+    redis.pubsub.return_value = pubsub
+
+    with (
+        patch("core.app.apps.task_stop_signal.redis_client", redis),
+        patch("core.app.apps.task_stop_signal.time.sleep", side_effect=_StopListeningError),
+        pytest.raises(_StopListeningError),
+    ):
+        listener._run()
+
+    pubsub.subscribe.assert_called_once_with("test_channel")
+    pubsub.close.assert_called_once()
+    assert task.stopped == 1
+    assert not listener.subscribed
@@ -1,77 +1,66 @@
+import threading
 import time
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from core.app.features.rate_limiting.rate_limit import RateLimit
+from core.app.features.rate_limiting.rate_limit import _ENTER_SCRIPT, _FLUSH_MAX_ACTIVE_REQUESTS_SCRIPT, RateLimit
 
 
 @pytest.fixture
 def mock_redis():
-    """Mock Redis client with realistic behavior for rate limiting tests."""
+    """Mock Redis client running the rate limit scripts on in-memory data."""
     mock_client = MagicMock()
 
     # Redis data storage for simulation
     mock_data = {}
-    mock_hashes = {}
+    mock_sorted_sets = {}
     mock_expiry = {}
-
-    def mock_setex(key, ttl, value):
-        mock_data[key] = str(value)
-        mock_expiry[key] = time.time() + ttl.total_seconds() if hasattr(ttl, "total_seconds") else time.time() + ttl
-        return True
-
-    def mock_get(key):
-        if key in mock_data and (key not in mock_expiry or time.time() < mock_expiry[key]):
-            return mock_data[key].encode("utf-8")
-        return None
-
-    def mock_exists(key):
-        return key in mock_data or key in mock_hashes
-
-    def mock_expire(key, ttl):
-        if key in mock_data or key in mock_hashes:
-            mock_expiry[key] = time.time() + ttl.total_seconds() if hasattr(ttl, "total_seconds") else time.time() + ttl
-        return True
-
-    def mock_hset(key, field, value):
-        if key not in mock_hashes:
-            mock_hashes[key] = {}
-        mock_hashes[key][field] = str(value).encode("utf-8")
-        return True
-
-    def mock_hgetall(key):
-        return mock_hashes.get(key, {})
-
-    def mock_hdel(key, *fields):
-        if key in mock_hashes:
-            count = 0
-            for field in fields:
-                if field in mock_hashes[key]:
-                    del mock_hashes[key][field]
-                    count += 1
-            return count
-        return 0
-
-    def mock_hlen(key):
-        return len(mock_hashes.get(key, {}))
+    lock = threading.Lock()
+
+    def enter(keys, args):
+        now, request_id, max_active_requests, max_alive_time = float(args[0]), args[1], int(args[2]), int(args[3])
+        active_requests = mock_sorted_sets.setdefault(keys[0], {})
+        for member, expiry in list(active_requests.items()):
+            if expiry <= now:
+                del active_requests[member]
+        if len(active_requests) >= max_active_requests:
+            return 0
+        active_requests[request_id] = now + max_alive_time
+        mock_expiry[keys[0]] = now + max_alive_time
+        return 1
+
+    def flush_max_active_requests(keys, args):
+        if args[1] == 1 or keys[0] not in mock_data:
+            mock_data[keys[0]] = str(args[0]).encode()
+        mock_expiry[keys[0]] = time.time() + args[2]
+        return mock_data[keys[0]]
+
+    scripts = {_ENTER_SCRIPT.script: enter, _FLUSH_MAX_ACTIVE_REQUESTS_SCRIPT.script: flush_max_active_requests}
+
+    def mock_register_script(script):
+        def run(keys, args):
+            with lock:
+                return scripts[script](keys, args)
+
+        return run
+
+    def mock_zrem(key, *members):
+        with lock:
+            active_requests = mock_sorted_sets.get(key, {})
+            return sum(active_requests.pop(member, None) is not None for member in members)
 
     # Configure mock methods
-    mock_client.setex = mock_setex
-    mock_client.get = mock_get
-    mock_client.exists = mock_exists
-    mock_client.expire = mock_expire
-    mock_client.hset = mock_hset
-    mock_client.hgetall = mock_hgetall
-    mock_client.hdel = mock_hdel
-    mock_client.hlen = mock_hlen
+    mock_client.register_script = mock_register_script
+    mock_client.zrem = mock_zrem
 
     # Store references for test verification
     mock_client._mock_data = mock_data
-    mock_client._mock_hashes = mock_hashes
+    mock_client._mock_sorted_sets = mock_sorted_sets
     mock_client._mock_expiry = mock_expiry
 
-    return mock_client
+    with patch("core.app.features.rate_limiting.rate_limit.redis_client", mock_client):
+        yield mock_client
 
 
 @pytest.fixture
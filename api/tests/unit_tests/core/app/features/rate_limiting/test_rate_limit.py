@@ -1,6 +1,5 @@
 import threading
 import time
-from datetime import timedelta
 from unittest.mock import patch
 
 import pytest
@@ -12,15 +11,8 @@ from core.errors.error import AppInvokeQuotaExceededError
 class TestRateLimit:
     """Core rate limiting functionality tests."""
 
-    def test_should_return_same_instance_for_same_client_id(self, redis_patch):
+    def test_should_return_same_instance_for_same_client_id(self, mock_redis):
         """Test singleton behavior for same client ID."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-            }
-        )
-
         rate_limit1 = RateLimit("client1", 5)
         rate_limit2 = RateLimit("client1", 10)  # Second instance with different limit
 
@@ -29,15 +21,8 @@ class TestRateLimit:
         # This reflects the actual behavior where __init__ always sets max_active_requests
         assert rate_limit1.max_active_requests == 10
 
-    def test_should_create_different_instances_for_different_client_ids(self, redis_patch):
+    def test_should_create_different_instances_for_different_client_ids(self, mock_redis):
         """Test different instances for different client IDs."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-            }
-        )
-
         rate_limit1 = RateLimit("client1", 5)
         rate_limit2 = RateLimit("client2", 10)
 
@@ -45,21 +30,13 @@ class TestRateLimit:
         assert rate_limit1.client_id == "client1"
         assert rate_limit2.client_id == "client2"
 
-    def test_should_initialize_with_valid_parameters(self, redis_patch):
+    def test_should_initialize_with_valid_parameters(self, mock_redis):
         """Test normal initialization."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-            }
-        )
-
         rate_limit = RateLimit("test_client", 5)
 
         assert rate_limit.client_id == "test_client"
         assert rate_limit.max_active_requests == 5
         assert hasattr(rate_limit, "initialized")
-        redis_patch.setex.assert_called_once()
 
     def test_should_skip_initialization_if_disabled(self):
         """Test no initialization when rate limiting is disabled."""
@@ -70,19 +47,14 @@ class TestRateLimit:
 
     def test_should_skip_reinitialization_of_existing_instance(self, redis_patch):
         """Test that existing instance doesn't reinitialize."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-            }
-        )
+        redis_patch.register_script.return_value.return_value = b"5"
 
         RateLimit("client1", 5)
         redis_patch.reset_mock()
 
         RateLimit("client1", 10)
 
-        redis_patch.setex.assert_not_called()
+        redis_patch.register_script.assert_not_called()
 
     def test_should_be_disabled_when_max_requests_is_zero_or_negative(self):
         """Test disabled state for zero or negative limits."""
@@ -92,116 +64,88 @@ class TestRateLimit:
         assert rate_limit_zero.disabled()
         assert rate_limit_negative.disabled()
 
-    def test_should_set_redis_keys_on_first_flush(self, redis_patch):
+    def test_should_set_redis_keys_on_first_flush(self, mock_redis):
         """Test Redis keys are set correctly on initial flush."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-            }
-        )
+        mock_redis._mock_data["dify:rate_limit:test_client:max_active_requests"] = b"10"
 
         rate_limit = RateLimit("test_client", 5)
 
-        expected_max_key = "dify:rate_limit:test_client:max_active_requests"
-        redis_patch.setex.assert_called_with(expected_max_key, timedelta(days=1), 5)
+        assert mock_redis._mock_data["dify:rate_limit:test_client:max_active_requests"] == b"5"
+        assert rate_limit.max_active_requests == 5
 
-    def test_should_sync_max_requests_from_redis_on_subsequent_flush(self, redis_patch):
+    def test_should_sync_max_requests_from_redis_on_subsequent_flush(self, mock_redis):
         """Test max requests syncs from Redis when key exists."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": True,
-                "get.return_value": b"10",
-                "expire.return_value": True,
-            }
-        )
-
         rate_limit = RateLimit("test_client", 5)
+        mock_redis._mock_data["dify:rate_limit:test_client:max_active_requests"] = b"10"
+
         rate_limit.flush_cache()
 
         assert rate_limit.max_active_requests == 10
 
-    @patch("time.time")
-    def test_should_clean_timeout_requests_from_active_list(self, mock_time, redis_patch):
-        """Test cleanup of timed-out requests."""
-        current_time = 1000.0
-        mock_time.return_value = current_time
-
-        # Setup mock Redis with timed-out requests
-        timeout_requests = {
-            b"req1": str(current_time - 700).encode(),  # 700 seconds ago (timeout)
-            b"req2": str(current_time - 100).encode(),  # 100 seconds ago (active)
-        }
-
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": True,
-                "get.return_value": b"5",
-                "expire.return_value": True,
-                "hgetall.return_value": timeout_requests,
-                "hdel.return_value": 1,
-            }
-        )
+    def test_should_flush_in_a_single_script_call(self, redis_patch):
+        """Test the flush is one round trip."""
+        redis_patch.register_script.return_value.return_value = b"5"
 
         rate_limit = RateLimit("test_client", 5)
-        redis_patch.reset_mock()  # Reset to avoid counting initialization calls
+        redis_patch.reset_mock()
         rate_limit.flush_cache()
 
-        # Verify timeout request was cleaned up
-        redis_patch.hdel.assert_called_once()
-        call_args = redis_patch.hdel.call_args[0]
-        assert call_args[0] == "dify:rate_limit:test_client:active_requests"
-        assert b"req1" in call_args  # Timeout request should be removed
-        assert b"req2" not in call_args  # Active request should remain
+        redis_patch.register_script.return_value.assert_called_once_with(
+            keys=["dify:rate_limit:test_client:max_active_requests"], args=[5, 0, 86400]
+        )
+
+    @patch("time.time")
+    def test_should_drop_timed_out_requests_on_enter(self, mock_time, mock_redis):
+        """Test requests never exited stop counting once timed out."""
+        mock_time.return_value = 1000.0
+        rate_limit = RateLimit("test_client", 1)
+        rate_limit.enter("req1")
+
+        with pytest.raises(AppInvokeQuotaExceededError):
+            rate_limit.enter("req2")
+
+        mock_time.return_value = 1000.0 + RateLimit._REQUEST_MAX_ALIVE_TIME + 1
+        rate_limit.enter("req2")
+
+        assert list(mock_redis._mock_sorted_sets[rate_limit.active_requests_key]) == ["req2"]
 
 
 class TestRateLimitEnterExit:
     """Rate limiting enter/exit logic tests."""
 
-    def test_should_allow_request_within_limit(self, redis_patch):
+    def test_should_allow_request_within_limit(self, mock_redis):
         """Test allowing requests within the rate limit."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-                "hlen.return_value": 2,
-                "hset.return_value": True,
-            }
-        )
-
         rate_limit = RateLimit("test_client", 5)
         request_id = rate_limit.enter()
 
         assert request_id != RateLimit._UNLIMITED_REQUEST_ID
-        redis_patch.hset.assert_called_once()
+        assert request_id in mock_redis._mock_sorted_sets[rate_limit.active_requests_key]
 
-    def test_should_generate_request_id_if_not_provided(self, redis_patch):
-        """Test auto-generation of request ID."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-                "hlen.return_value": 0,
-                "hset.return_value": True,
-            }
+    def test_should_enter_in_a_single_script_call(self, redis_patch):
+        """Test admitting a request is one round trip."""
+        redis_patch.register_script.return_value.return_value = b"5"
+        rate_limit = RateLimit("test_client", 5)
+        redis_patch.reset_mock()
+        redis_patch.register_script.return_value.return_value = 1
+
+        with patch("time.time", return_value=1000.0):
+            rate_limit.last_recalculate_time = 1000.0
+            rate_limit.enter("request_id")
+
+        redis_patch.register_script.return_value.assert_called_once_with(
+            keys=["dify:rate_limit:test_client:active_requests_by_expiry"],
+            args=[1000.0, "request_id", 5, RateLimit._REQUEST_MAX_ALIVE_TIME],
         )
 
+    def test_should_generate_request_id_if_not_provided(self, mock_redis):
+        """Test auto-generation of request ID."""
         rate_limit = RateLimit("test_client", 5)
         request_id = rate_limit.enter()
 
         assert len(request_id) == 36  # UUID format
 
-    def test_should_use_provided_request_id(self, redis_patch):
+    def test_should_use_provided_request_id(self, mock_redis):
         """Test using provided request ID."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-                "hlen.return_value": 0,
-                "hset.return_value": True,
-            }
-        )
-
         rate_limit = RateLimit("test_client", 5)
         custom_id = "custom_request_123"
         request_id = rate_limit.enter(custom_id)
@@ -210,28 +154,20 @@ class TestRateLimitEnterExit:
 
     def test_should_remove_request_on_exit(self, redis_patch):
         """Test request removal on exit."""
-        redis_patch.configure_mock(
-            **{
-                "hdel.return_value": 1,
-            }
-        )
+        redis_patch.register_script.return_value.return_value = b"5"
 
         rate_limit = RateLimit("test_client", 5)
         rate_limit.exit("test_request_id")
 
-        redis_patch.hdel.assert_called_once_with("dify:rate_limit:test_client:active_requests", "test_request_id")
-
-    def test_should_raise_quota_exceeded_when_at_limit(self, redis_patch):
-        """Test quota exceeded error when at limit."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-                "hlen.return_value": 5,  # At limit
-            }
+        redis_patch.zrem.assert_called_once_with(
+            "dify:rate_limit:test_client:active_requests_by_expiry", "test_request_id"
         )
 
+    def test_should_raise_quota_exceeded_when_at_limit(self, mock_redis):
+        """Test quota exceeded error when at limit."""
         rate_limit = RateLimit("test_client", 5)
+        for _ in range(5):
+            rate_limit.enter()
 
         with pytest.raises(AppInvokeQuotaExceededError) as exc_info:
             rate_limit.enter()
@@ -239,19 +175,9 @@ class TestRateLimitEnterExit:
         assert "Too many requests" in str(exc_info.value)
         assert "test_client" in str(exc_info.value)
 
-    def test_should_allow_request_after_previous_exit(self, redis_patch):
+    def test_should_allow_request_after_previous_exit(self, mock_redis):
         """Test allowing new request after previous exit."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-                "hlen.return_value": 4,  # Under limit after exit
-                "hset.return_value": True,
-                "hdel.return_value": 1,
-            }
-        )
-
-        rate_limit = RateLimit("test_client", 5)
+        rate_limit = RateLimit("test_client", 1)
 
         request_id = rate_limit.enter()
         rate_limit.exit(request_id)
@@ -260,27 +186,18 @@ class TestRateLimitEnterExit:
         assert new_request_id is not None
 
     @patch("time.time")
-    def test_should_flush_cache_when_interval_exceeded(self, mock_time, redis_patch):
+    def test_should_flush_cache_when_interval_exceeded(self, mock_time, mock_redis):
         """Test cache flush when time interval exceeded."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-                "hlen.return_value": 0,
-            }
-        )
-
         mock_time.return_value = 1000.0
         rate_limit = RateLimit("test_client", 5)
+        mock_redis._mock_data["dify:rate_limit:test_client:max_active_requests"] = b"1"
 
         # Advance time beyond flush interval
         mock_time.return_value = 1400.0  # 400 seconds later
-        redis_patch.reset_mock()
-
         rate_limit.enter()
 
-        # Should have called setex again due to cache flush
-        redis_patch.setex.assert_called()
+        # Should have synced max_active_requests due to cache flush
+        assert rate_limit.max_active_requests == 1
 
     def test_should_return_unlimited_id_when_disabled(self):
         """Test unlimited ID return when rate limiting disabled."""
@@ -294,7 +211,7 @@ class TestRateLimitEnterExit:
         rate_limit = RateLimit("test_client", 0)
         rate_limit.exit(RateLimit._UNLIMITED_REQUEST_ID)
 
-        redis_patch.hdel.assert_not_called()
+        redis_patch.zrem.assert_not_called()
 
 
 class TestRateLimitGenerator:
@@ -302,13 +219,7 @@ class TestRateLimitGenerator:
 
     def test_should_wrap_generator_and_iterate_normally(self, redis_patch, sample_generator):
         """Test normal generator iteration with rate limit wrapper."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-                "hdel.return_value": 1,
-            }
-        )
+        redis_patch.register_script.return_value.return_value = b"5"
 
         rate_limit = RateLimit("test_client", 5)
         generator = sample_generator()
@@ -318,7 +229,7 @@ class TestRateLimitGenerator:
         result = list(wrapped_gen)
 
         assert result == ["item1", "item2", "item3"]
-        redis_patch.hdel.assert_called_once_with("dify:rate_limit:test_client:active_requests", request_id)
+        redis_patch.zrem.assert_called_once_with("dify:rate_limit:test_client:active_requests_by_expiry", request_id)
 
     def test_should_handle_mapping_input_directly(self, sample_mapping):
         """Test direct return of mapping input."""
@@ -329,13 +240,7 @@ class TestRateLimitGenerator:
 
     def test_should_cleanup_on_exception_during_iteration(self, redis_patch, sample_generator):
         """Test cleanup when exception occurs during iteration."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-                "hdel.return_value": 1,
-            }
-        )
+        redis_patch.register_script.return_value.return_value = b"5"
 
         rate_limit = RateLimit("test_client", 5)
         generator = sample_generator(raise_error=True)
@@ -346,17 +251,11 @@ class TestRateLimitGenerator:
         with pytest.raises(ValueError):
             list(wrapped_gen)
 
-        redis_patch.hdel.assert_called_once_with("dify:rate_limit:test_client:active_requests", request_id)
+        redis_patch.zrem.assert_called_once_with("dify:rate_limit:test_client:active_requests_by_expiry", request_id)
 
     def test_should_cleanup_on_explicit_close(self, redis_patch, sample_generator):
         """Test cleanup on explicit generator close."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-                "hdel.return_value": 1,
-            }
-        )
+        redis_patch.register_script.return_value.return_value = b"5"
 
         rate_limit = RateLimit("test_client", 5)
         generator = sample_generator()
@@ -365,17 +264,11 @@ class TestRateLimitGenerator:
         wrapped_gen = rate_limit.generate(generator, request_id)
         wrapped_gen.close()
 
-        redis_patch.hdel.assert_called_once()
+        redis_patch.zrem.assert_called_once()
 
     def test_should_handle_generator_without_close_method(self, redis_patch):
         """Test handling generator without close method."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-                "hdel.return_value": 1,
-            }
-        )
+        redis_patch.register_script.return_value.return_value = b"5"
 
         # Create a generator-like object without close method
         class SimpleGenerator:
@@ -399,17 +292,11 @@ class TestRateLimitGenerator:
         wrapped_gen = rate_limit.generate(generator, "test_request")
         wrapped_gen.close()  # Should not raise error
 
-        redis_patch.hdel.assert_called_once()
+        redis_patch.zrem.assert_called_once()
 
     def test_should_prevent_iteration_after_close(self, redis_patch, sample_generator):
         """Test StopIteration after generator is closed."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-                "hdel.return_value": 1,
-            }
-        )
+        redis_patch.register_script.return_value.return_value = b"5"
 
         rate_limit = RateLimit("test_client", 5)
         generator = sample_generator()
@@ -424,15 +311,8 @@ class TestRateLimitGenerator:
 class TestRateLimitConcurrency:
     """Concurrent access safety tests."""
 
-    def test_should_handle_concurrent_instance_creation(self, redis_patch):
+    def test_should_handle_concurrent_instance_creation(self, mock_redis):
         """Test thread-safe singleton instance creation."""
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-            }
-        )
-
         instances = []
         errors = []
 
@@ -453,29 +333,8 @@ class TestRateLimitConcurrency:
         assert len(errors) == 0
         assert len({id(inst) for inst in instances}) == 1  # All same instance
 
-    def test_should_handle_concurrent_enter_requests(self, redis_patch):
-        """Test concurrent enter requests handling."""
-        # Setup mock to simulate realistic Redis behavior
-        request_count = 0
-
-        def mock_hlen(key):
-            nonlocal request_count
-            return request_count
-
-        def mock_hset(key, field, value):
-            nonlocal request_count
-            request_count += 1
-            return True
-
-        redis_patch.configure_mock(
-            **{
-                "exists.return_value": False,
-                "setex.return_value": True,
-                "hlen.side_effect": mock_hlen,
-                "hset.side_effect": mock_hset,
-            }
-        )
-
+    def test_should_handle_concurrent_enter_requests(self, mock_redis):
+        """Test concurrent enter requests never exceed the limit."""
         rate_limit = RateLimit("concurrent_client", 3)
         results = []
         errors = []
@@ -494,19 +353,12 @@ class TestRateLimitConcurrency:
         for t in threads:
             t.join()
 
-        # Should have some successful requests and some quota exceeded
-        assert len(results) + len(errors) == 5
-        assert len(errors) > 0  # Some should be rejected
+        # the check and the insert are atomic, exactly the limit is admitted
+        assert len(results) == 3
+        assert len(errors) == 2
 
-    @patch("time.time")
-    def test_should_maintain_accurate_count_under_load(self, mock_time, redis_patch):
+    def test_should_maintain_accurate_count_under_load(self, mock_redis):
         """Test accurate count maintenance under concurrent load."""
-        mock_time.return_value = 1000.0
-
-        # Use real mock_redis fixture for better simulation
-        mock_client = self._create_mock_redis()
-        redis_patch.configure_mock(**mock_client)
-
         rate_limit = RateLimit("load_test_client", 10)
         active_requests = []
 
@@ -529,41 +381,4 @@ class TestRateLimitConcurrency:
 
         # All requests should have been cleaned up
         assert len(active_requests) == 0
-
-    def _create_mock_redis(self):
-        """Create a thread-safe mock Redis for concurrency tests."""
-        import threading
-
-        lock = threading.Lock()
-        data = {}
-        hashes = {}
-
-        def mock_hlen(key):
-            with lock:
-                return len(hashes.get(key, {}))
-
-        def mock_hset(key, field, value):
-            with lock:
-                if key not in hashes:
-                    hashes[key] = {}
-                hashes[key][field] = str(value).encode("utf-8")
-                return True
-
-        def mock_hdel(key, *fields):
-            with lock:
-                if key in hashes:
-                    count = 0
-                    for field in fields:
-                        if field in hashes[key]:
-                            del hashes[key][field]
-                            count += 1
-                    return count
-                return 0
-
-        return {
-            "exists.return_value": False,
-            "setex.return_value": True,
-            "hlen.side_effect": mock_hlen,
-            "hset.side_effect": mock_hset,
-            "hdel.side_effect": mock_hdel,
-        }
+        assert mock_redis._mock_sorted_sets[rate_limit.active_requests_key] == {}
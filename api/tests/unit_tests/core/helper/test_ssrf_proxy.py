@@ -1,9 +1,15 @@
 import secrets
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
 
-from core.helper.ssrf_proxy import SSRF_DEFAULT_MAX_RETRIES, STATUS_FORCELIST, make_request
+from core.helper.ssrf_proxy import (
+    SSRF_DEFAULT_MAX_RETRIES,
+    STATUS_FORCELIST,
+    make_request,
+    ssrf_proxy_client_pool,
+)
 
 
 @patch("httpx.Client.request")
@@ -50,3 +56,52 @@ def test_retry_logic_success(mock_request):
     assert response.status_code == 200
     assert mock_request.call_count == SSRF_DEFAULT_MAX_RETRIES + 1
     assert mock_request.call_args_list[0][1].get("method") == "GET"
+
+
+@patch("httpx.Client.request")
+def test_requests_reuse_pooled_client(mock_request):
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_request.return_value = mock_response
+
+    make_request("GET", "http://example.com", ssl_verify=True)
+    make_request("GET", "http://example.com", ssl_verify=True)
+    make_request("GET", "http://example.com", ssl_verify=False)
+
+    assert ssrf_proxy_client_pool.get_client(True) is ssrf_proxy_client_pool.get_client(True)
+    assert ssrf_proxy_client_pool.get_client(True) is not ssrf_proxy_client_pool.get_client(False)
+    assert mock_request.call_count == 3
+
+
+def test_response_cookies_are_not_sent_on_next_requests():
+    received_cookies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        received_cookies.append(request.headers.get("cookie"))
+        return httpx.Response(200, headers={"set-cookie": "session=tenant-a; Path=/"})
+
+    client = ssrf_proxy_client_pool.get_client(True)
+    with patch.object(client, "_transport", httpx.MockTransport(handler)), patch.object(client, "_mounts", {}):
+        make_request("GET", "http://example.com/a", ssl_verify=True)
+        make_request("GET", "http://example.com/b", ssl_verify=True)
+
+    assert received_cookies == [None, None]
+    assert not client.cookies
+
+
+@patch("httpx.Client.request")
+def test_stats_count_requests_and_retries(mock_request):
+    failed_response = MagicMock()
+    failed_response.status_code = 503
+    ok_response = MagicMock()
+    ok_response.status_code = 200
+    mock_request.side_effect = [failed_response, ok_response]
+    before = ssrf_proxy_client_pool.stats()
+
+    with patch("core.helper.ssrf_proxy.time.sleep"):
+        make_request("GET", "http://example.com", max_retries=1)
+
+    after = ssrf_proxy_client_pool.stats()
+    assert after["requests"] - before["requests"] == 2
+    assert after["retries"] - before["retries"] == 1
+    assert after["active_requests"] == before["active_requests"]
@@ -0,0 +1,91 @@
+from unittest.mock import MagicMock, patch
+
+from core.memory.token_buffer_memory import TokenBufferMemory
+from core.model_runtime.entities import AssistantPromptMessage, UserPromptMessage
+
+
+def _count_tokens(prompt_messages):
+    # one token per character plus a fixed request overhead
+    return sum(len(prompt_message.content) for prompt_message in prompt_messages) + 3
+
+
+def _memory() -> TokenBufferMemory:
+    model_instance = MagicMock(provider="openai", model="gpt-4o")
+    model_instance.get_llm_num_tokens.side_effect = _count_tokens
+    return TokenBufferMemory(conversation=MagicMock(), model_instance=model_instance)
+
+
+def _prompt_messages(count: int):
+    messages = []
+    keys = []
+    for i in range(count):
+        messages.append(UserPromptMessage(content="q" * 10))
+        messages.append(AssistantPromptMessage(content="a" * 10))
+        keys.extend([f"message-{i}:user", f"message-{i}:assistant"])
+    return messages, keys
+
+
+@patch("core.memory.token_buffer_memory.redis_client")
+def test_prune_keeps_the_most_recent_messages_within_the_limit(mock_redis):
+    memory = _memory()
+    prompt_messages, keys = _prompt_messages(50)
+    mock_redis.mget.return_value = [None] * len(keys)
+
+    pruned = memory._prune_prompt_messages(prompt_messages, keys, _count_tokens(prompt_messages), 45)
+
+    assert pruned == prompt_messages[-4:]
+    # each count of a single message includes the request overhead, so messages are only counted until the
+    # estimate fits, which keeps too many of them, and the search corrects it with a few more counts
+    pipeline = mock_redis.pipeline.return_value
+    assert pipeline.setex.call_count == 74
+    pipeline.setex.assert_any_call("memory_message_tokens:openai:gpt-4o:message-0:user", 86400, 13)
+    assert memory.model_instance.get_llm_num_tokens.call_count < 74 + 10
+
+
+@patch("core.memory.token_buffer_memory.redis_client")
+def test_prune_uses_cached_token_counts(mock_redis):
+    memory = _memory()
+    prompt_messages, keys = _prompt_messages(50)
+    mock_redis.mget.return_value = [b"10"] * len(keys)
+
+    pruned = memory._prune_prompt_messages(prompt_messages, keys, _count_tokens(prompt_messages), 45)
+
+    assert pruned == prompt_messages[-4:]
+    # an exact estimate is confirmed by counting it and the history with one more message
+    assert memory.model_instance.get_llm_num_tokens.call_count == 2
+    mock_redis.pipeline.assert_not_called()
+
+
+@patch("core.memory.token_buffer_memory.redis_client")
+def test_prune_restores_messages_dropped_by_inaccurate_counts(mock_redis):
+    memory = _memory()
+    prompt_messages, keys = _prompt_messages(50)
+    # counts lower than the real ones drop too many messages
+    mock_redis.mget.return_value = [b"5"] * len(keys)
+
+    pruned = memory._prune_prompt_messages(prompt_messages, keys, _count_tokens(prompt_messages), 45)
+
+    assert pruned == prompt_messages[-4:]
+
+
+@patch("core.memory.token_buffer_memory.redis_client")
+def test_prune_corrects_inaccurate_counts(mock_redis):
+    memory = _memory()
+    prompt_messages, keys = _prompt_messages(5)
+    # counts that do not add up to the real total
+    mock_redis.mget.return_value = [b"100"] * len(keys)
+
+    pruned = memory._prune_prompt_messages(prompt_messages, keys, _count_tokens(prompt_messages), 25)
+
+    assert pruned == prompt_messages[-2:]
+
+
+@patch("core.memory.token_buffer_memory.redis_client")
+def test_prune_keeps_at_least_one_message(mock_redis):
+    memory = _memory()
+    prompt_messages, keys = _prompt_messages(2)
+    mock_redis.mget.return_value = [None] * len(keys)
+
+    pruned = memory._prune_prompt_messages(prompt_messages, keys, _count_tokens(prompt_messages), 1)
+
+    assert pruned == prompt_messages[-1:]
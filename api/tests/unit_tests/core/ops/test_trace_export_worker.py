@@ -0,0 +1,96 @@
+import gzip
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.ops.ops_trace_manager import TraceExportWorker
+
+
+def _trace_task(app_id: str | None, trace_info: dict | None = None, error: Exception | None = None):
+    task = MagicMock()
+    task.app_id = app_id
+    if error is not None:
+        task.execute.side_effect = error
+    elif trace_info is None:
+        task.execute.return_value = {}
+    else:
+        task.execute.return_value.model_dump.return_value = trace_info
+    return task
+
+
+@pytest.fixture
+def mock_export():
+    with (
+        patch("core.ops.ops_trace_manager.storage") as mock_storage,
+        patch("core.ops.ops_trace_manager.process_trace_tasks") as mock_process_trace_tasks,
+        patch.object(TraceExportWorker, "_ensure_started"),
+    ):
+        yield mock_storage, mock_process_trace_tasks
+
+
+def _worker(batch_size: int = 10, max_size: int = 100) -> TraceExportWorker:
+    return TraceExportWorker(flask_app=MagicMock(), interval=5, batch_size=batch_size, max_size=max_size)
+
+
+def test_traces_are_exported_in_one_segment_per_app(mock_export):
+    mock_storage, mock_process_trace_tasks = mock_export
+    worker = _worker()
+    worker.add(_trace_task("app-1", {"n": 1}))
+    worker.add(_trace_task("app-2", {"n": 2}))
+    worker.add(_trace_task("app-1", {"n": 3}))
+
+    worker.flush()
+
+    segments = {}
+    for call in mock_storage.save.call_args_list:
+        file_path, data = call.args
+        segments[file_path.split("/")[1]] = [json.loads(line) for line in gzip.decompress(data).splitlines()]
+    assert [line["trace_info"] for line in segments["app-1"]] == [{"n": 1}, {"n": 3}]
+    assert [line["trace_info"] for line in segments["app-2"]] == [{"n": 2}]
+    assert mock_storage.save.call_args_list[0].args[0].endswith(".ndjson.gz")
+
+    assert mock_process_trace_tasks.delay.call_count == 2
+    file_info = mock_process_trace_tasks.delay.call_args_list[0].args[0]
+    assert file_info["app_id"] == "app-1"
+    assert file_info["segment"] is True
+    assert worker.stats() == {"queued": 3, "dropped": 0, "exported": 3, "failed": 0, "segments": 2, "pending": 0}
+
+
+def test_failed_and_empty_traces_do_not_abort_the_batch(mock_export):
+    mock_storage, _ = mock_export
+    worker = _worker()
+    worker.add(_trace_task("app-1", error=RuntimeError("boom")))
+    worker.add(_trace_task("app-1"))
+    worker.add(_trace_task(None, {"n": 0}))
+    worker.add(_trace_task("app-1", {"n": 1}))
+
+    worker.flush()
+
+    (file_path, data), _ = mock_storage.save.call_args
+    assert [json.loads(line)["trace_info"] for line in gzip.decompress(data).splitlines()] == [{"n": 1}]
+    assert worker.stats()["failed"] == 1
+    assert worker.stats()["exported"] == 1
+
+
+def test_traces_are_dropped_when_the_queue_is_full(mock_export):
+    worker = _worker(max_size=2)
+
+    assert worker.add(_trace_task("app-1", {"n": 1}))
+    assert worker.add(_trace_task("app-1", {"n": 2}))
+    assert not worker.add(_trace_task("app-1", {"n": 3}))
+
+    assert worker.stats()["dropped"] == 1
+    assert worker.stats()["pending"] == 2
+
+
+def test_flush_exports_all_batches(mock_export):
+    _, mock_process_trace_tasks = mock_export
+    worker = _worker(batch_size=2)
+    for n in range(5):
+        worker.add(_trace_task("app-1", {"n": n}))
+
+    worker.flush()
+
+    assert mock_process_trace_tasks.delay.call_count == 3
+    assert worker.stats()["pending"] == 0
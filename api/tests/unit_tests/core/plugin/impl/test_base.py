@@ -0,0 +1,32 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from core.plugin.entities.plugin_daemon import PluginDaemonInnerError
+from core.plugin.impl.base import BasePluginClient, get_plugin_daemon_session
+from core.plugin.impl.metrics import plugin_daemon_request_metrics
+
+
+def test_session_is_shared():
+    assert get_plugin_daemon_session() is get_plugin_daemon_session()
+
+
+def test_request_uses_pooled_session_and_records_latency():
+    plugin_daemon_request_metrics.reset()
+    response = MagicMock(status_code=200)
+    with patch.object(requests.Session, "request", return_value=response) as mock_request:
+        assert BasePluginClient()._request("GET", "plugin/tenant-1/management/list") is response
+
+    assert mock_request.call_args.kwargs["timeout"] is not None
+    snapshot = plugin_daemon_request_metrics.snapshot()
+    assert snapshot["GET plugin/tenant-1/management/list"]["count"] == 1
+
+
+def test_request_connection_error_is_recorded():
+    plugin_daemon_request_metrics.reset()
+    with patch.object(requests.Session, "request", side_effect=requests.ConnectionError()):
+        with pytest.raises(PluginDaemonInnerError):
+            BasePluginClient()._request("POST", "plugin/tenant-1/dispatch/llm/invoke")
+
+    assert plugin_daemon_request_metrics.snapshot()["POST plugin/tenant-1/dispatch/llm/invoke"]["errors"] == 1
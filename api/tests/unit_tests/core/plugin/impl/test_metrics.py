@@ -0,0 +1,43 @@
+import pytest
+
+from core.plugin.impl.metrics import LatencyHistogram, PluginDaemonRequestMetrics
+
+
+def test_endpoint_replaces_id_segments():
+    endpoint = PluginDaemonRequestMetrics.endpoint(
+        "post", "plugin/6f1c2d3e-4a5b-4c6d-8e7f-9a0b1c2d3e4f/dispatch/llm/invoke"
+    )
+
+    assert endpoint == "POST plugin/{id}/dispatch/llm/invoke"
+    assert PluginDaemonRequestMetrics.endpoint("GET", "plugin/tenant/management/list/42") == (
+        "GET plugin/tenant/management/list/{id}"
+    )
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = LatencyHistogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 0.7, 5.0):
+        histogram.observe(seconds)
+    histogram.observe(0.2, error=True)
+
+    data = histogram.to_dict()
+    assert data["buckets"] == {"0.1": 2, "1.0": 3, "+Inf": 1}
+    assert data["count"] == 6
+    assert data["errors"] == 1
+    assert data["avg"] == pytest.approx(6.55 / 6)
+    assert data["p50"] == 1.0
+    assert data["p99"] == float("inf")
+
+
+def test_metrics_group_requests_per_endpoint():
+    metrics = PluginDaemonRequestMetrics()
+    metrics.observe("POST", "plugin/1/dispatch/llm/invoke", 0.02)
+    metrics.observe("POST", "plugin/2/dispatch/llm/invoke", 0.03)
+    metrics.observe("GET", "plugin/1/management/list", 0.01)
+
+    snapshot = metrics.snapshot()
+
+    assert snapshot["POST plugin/{id}/dispatch/llm/invoke"]["count"] == 2
+    assert snapshot["GET plugin/{id}/management/list"]["count"] == 1
+    metrics.reset()
+    assert metrics.snapshot() == {}
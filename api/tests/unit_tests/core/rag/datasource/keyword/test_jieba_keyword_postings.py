@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from core.rag.datasource.keyword.jieba.jieba_keyword_postings import JiebaKeywordPostings
+
+
+@patch("core.rag.datasource.keyword.jieba.jieba_keyword_postings.redis_client")
+@patch("core.rag.datasource.keyword.jieba.jieba_keyword_postings.insert")
+@patch("core.rag.datasource.keyword.jieba.jieba_keyword_postings.db")
+def test_add_writes_one_posting_per_unique_keyword(mock_db, mock_insert, mock_redis):
+    postings = JiebaKeywordPostings("dataset-1")
+
+    postings.add([("node-1", ["dify", "rag", "dify"]), ("node-2", ["rag", "x" * 256, ""])])
+
+    assert mock_db.session.execute.call_count == 1
+    values = mock_insert.return_value.values.call_args.args[0]
+    assert all(row["dataset_id"] == "dataset-1" for row in values)
+    rows = {(row["keyword"], row["node_id"]) for row in values}
+    assert rows == {("dify", "node-1"), ("rag", "node-1"), ("rag", "node-2")}
+    mock_db.session.commit.assert_called_once()
+    # cached search results of the dataset are dropped
+    mock_redis.delete.assert_called_once_with("keyword_postings_search:dataset-1")
+
+
+@patch("core.rag.datasource.keyword.jieba.jieba_keyword_postings.db")
+def test_add_with_no_entries_only_commits(mock_db):
+    JiebaKeywordPostings("dataset-1").add([])
+
+    mock_db.session.execute.assert_not_called()
+    mock_db.session.commit.assert_called_once()
+
+
+@patch("core.rag.datasource.keyword.jieba.jieba_keyword_postings.redis_client")
+@patch("core.rag.datasource.keyword.jieba.jieba_keyword_postings.db")
+def test_search_without_keywords_skips_query(mock_db, mock_redis):
+    assert JiebaKeywordPostings("dataset-1").search([], k=4) == []
+    mock_db.session.execute.assert_not_called()
+    mock_redis.hget.assert_not_called()
+
+
+@patch("core.rag.datasource.keyword.jieba.jieba_keyword_postings.redis_client")
+@patch("core.rag.datasource.keyword.jieba.jieba_keyword_postings.db")
+def test_search_caches_the_results_of_a_query(mock_db, mock_redis):
+    cache: dict[str, str] = {}
+    mock_redis.hget.side_effect = lambda key, field: cache.get(field)
+    mock_redis.pipeline.return_value.hset.side_effect = lambda key, field, value: cache.__setitem__(field, value)
+    mock_db.session.execute.return_value = [SimpleNamespace(node_id="node-2"), SimpleNamespace(node_id="node-1")]
+    postings = JiebaKeywordPostings("dataset-1")
+
+    assert postings.search(["rag", "dify"], k=2) == ["node-2", "node-1"]
+    # the same keywords in another order hit the cache
+    assert postings.search(["dify", "rag", "rag"], k=2) == ["node-2", "node-1"]
+    assert mock_db.session.execute.call_count == 1
+    mock_redis.pipeline.return_value.expire.assert_called_once_with("keyword_postings_search:dataset-1", 600)
+
+    # another k is another query
+    postings.search(["rag", "dify"], k=4)
+    assert mock_db.session.execute.call_count == 2
+
+
+@patch("core.rag.datasource.keyword.jieba.jieba_keyword_postings.redis_client")
+@patch("core.rag.datasource.keyword.jieba.jieba_keyword_postings.db")
+def test_deletes_drop_the_cached_results(mock_db, mock_redis):
+    postings = JiebaKeywordPostings("dataset-1")
+
+    postings.delete_node_ids(["node-1"])
+    postings.delete_all()
+
+    assert mock_redis.delete.call_count == 2
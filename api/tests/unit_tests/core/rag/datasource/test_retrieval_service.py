@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+from core.rag.datasource.retrieval_service import RetrievalService
+from core.rag.index_processor.constant.index_type import IndexType
+from core.rag.models.document import Document
+from models.dataset import ChildChunk, DocumentSegment
+from models.dataset import Document as DatasetDocument
+
+
+def _document(document_id: str, index_node_id: str, score: float) -> Document:
+    return Document(page_content="", metadata={"document_id": document_id, "doc_id": index_node_id, "score": score})
+
+
+def _child_chunk(chunk_id: str, segment_id: str, position: int) -> ChildChunk:
+    return ChildChunk(
+        id=chunk_id, index_node_id=f"node-{chunk_id}", segment_id=segment_id, content=chunk_id, position=position
+    )
+
+
+@patch("core.rag.datasource.retrieval_service.db")
+def test_format_retrieval_documents_groups_child_chunks_by_segment(mock_db):
+    mock_db.session.query.return_value.where.return_value.options.return_value.all.return_value = [
+        DatasetDocument(id="parent-child-doc", doc_form=IndexType.PARENT_CHILD_INDEX, dataset_id="dataset"),
+        DatasetDocument(id="paragraph-doc", doc_form=IndexType.PARAGRAPH_INDEX, dataset_id="dataset"),
+    ]
+    parent_1 = DocumentSegment(id="parent-1", dataset_id="dataset", content="parent 1")
+    parent_2 = DocumentSegment(id="parent-2", dataset_id="dataset", content="parent 2")
+    paragraph = DocumentSegment(id="paragraph", dataset_id="dataset", index_node_id="node-paragraph")
+    mock_db.session.scalars.side_effect = [
+        [
+            _child_chunk("child-1", "parent-1", 1),
+            _child_chunk("child-2", "parent-2", 1),
+            _child_chunk("child-3", "parent-1", 2),
+            _child_chunk("child-4", "parent-2", 2),
+        ],
+        [parent_1, parent_2],
+        [paragraph],
+    ]
+    documents = [
+        _document("parent-child-doc", "node-child-1", 0.9),
+        _document("paragraph-doc", "node-paragraph", 0.8),
+        _document("parent-child-doc", "node-child-2", 0.7),
+        _document("parent-child-doc", "node-child-3", 0.6),
+        _document("parent-child-doc", "node-child-4", 0.85),
+    ]
+
+    result = RetrievalService.format_retrieval_documents(documents)
+
+    # segments keep the order of their first retrieved chunk, scored by their best chunk
+    assert [(item.segment.id, item.score) for item in result] == [
+        ("parent-1", 0.9),
+        ("paragraph", 0.8),
+        ("parent-2", 0.85),
+    ]
+    assert [(chunk.id, chunk.score) for chunk in result[0].child_chunks] == [("child-1", 0.9), ("child-3", 0.6)]
+    assert result[1].child_chunks is None
+    assert [(chunk.id, chunk.score) for chunk in result[2].child_chunks] == [("child-2", 0.7), ("child-4", 0.85)]
+    # child chunks, parent segments and paragraph segments are each loaded in one query
+    assert mock_db.session.scalars.call_count == 3
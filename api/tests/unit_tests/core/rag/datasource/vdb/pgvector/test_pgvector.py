@@ -0,0 +1,153 @@
+import hashlib
+import json
+import struct
+import uuid
+from unittest.mock import MagicMock, patch
+
+import psycopg2.errors
+import pytest
+
+from core.rag.datasource.vdb.pgvector.pgvector import PGVector, PGVectorConfig, _encode_copy_row
+from core.rag.datasource.vdb.vector_factory import Vector
+from core.rag.models.document import Document
+
+
+@pytest.fixture
+def pgvector():
+    with patch("core.rag.datasource.vdb.pgvector.pgvector.vector_store_pool_registry") as mock_registry:
+        vector = PGVector(
+            "collection",
+            PGVectorConfig(
+                host="localhost",
+                port=5432,
+                user="postgres",
+                password="postgres",
+                database="postgres",
+                min_connection=1,
+                max_connection=2,
+                hnsw_ef_search=100,
+            ),
+        )
+    conn = mock_registry.get_psycopg2_pool.return_value.connection.return_value.__enter__.return_value
+    conn.prepared_statements = set()
+    cur = conn.cursor.return_value
+    cur.connection = conn
+    cur.__iter__.return_value = iter([])
+    conn.cursor.return_value.__enter__.return_value = cur
+    return vector, cur
+
+
+def _statements(cur) -> list[str]:
+    return [call.args[0] for call in cur.execute.call_args_list]
+
+
+def test_search_by_vector_prepares_the_statement_once_per_connection(pgvector):
+    vector, cur = pgvector
+
+    vector.search_by_vector([0.1, 0.2], top_k=3)
+    vector.search_by_vector([0.3, 0.4], top_k=3)
+
+    statements = _statements(cur)
+    assert sum(statement.startswith("PREPARE") for statement in statements) == 1
+    assert cur.execute.call_args.args == (
+        f"EXECUTE search_by_vector_{vector.statement_hash} (%s, %s)",
+        ("[0.3,0.4]", 3),
+    )
+    assert statements.count("SET LOCAL hnsw.ef_search = 100") == 2
+
+
+def test_search_by_vector_passes_the_document_ids_as_an_array(pgvector):
+    vector, cur = pgvector
+
+    vector.search_by_vector([0.1], top_k=2, document_ids_filter=["a'b", "c"], ef_search=200)
+
+    prepare = next(statement for statement in _statements(cur) if statement.startswith("PREPARE"))
+    assert "(vector, text[], int)" in prepare
+    assert "= ANY($2)" in prepare
+    assert cur.execute.call_args.args[1] == ("[0.1]", ["a'b", "c"], 2)
+    assert "SET LOCAL hnsw.ef_search = 200" in _statements(cur)
+
+
+def test_prepared_statement_names_use_the_full_digest_of_the_table_name(pgvector):
+    vector, cur = pgvector
+    vector.search_by_vector([0.1], top_k=1, document_ids_filter=["a"])
+
+    name = cur.execute.call_args.args[0].split()[1]
+    assert name == f"search_by_vector_filtered_{hashlib.md5(b'embedding_collection').hexdigest()}"
+    # PostgreSQL truncates longer identifiers, which would make the names of different tables collide
+    assert len(name) <= 63
+
+
+def test_prepared_statements_are_deallocated_past_the_limit(pgvector):
+    vector, cur = pgvector
+    cur.connection.prepared_statements.update(f"statement_{i}" for i in range(3))
+
+    with patch("core.rag.datasource.vdb.pgvector.pgvector.MAX_PREPARED_STATEMENTS_PER_CONNECTION", 3):
+        vector.search_by_vector([0.1], top_k=1)
+
+    assert "DEALLOCATE ALL" in _statements(cur)
+    assert cur.connection.prepared_statements == {f"search_by_vector_{vector.statement_hash}"}
+
+
+def test_add_texts_copies_rows_in_binary_format(pgvector):
+    vector, cur = pgvector
+    doc_id = str(uuid.uuid4())
+
+    pks = vector.add_texts([Document(page_content="text", metadata={"doc_id": doc_id})], [[0.5, 1.0]])
+
+    assert pks == [doc_id]
+    sql, buffer = cur.copy_expert.call_args.args
+    assert sql.endswith("FROM STDIN WITH (FORMAT BINARY)")
+    data = buffer.read()
+    assert data.startswith(b"PGCOPY\n\xff\r\n\x00")
+    assert data.endswith(struct.pack(">h", -1))
+    assert _encode_copy_row(doc_id, "text", json.dumps({"doc_id": doc_id}), [0.5, 1.0]) in data
+
+
+def test_encode_copy_row():
+    doc_id = str(uuid.uuid4())
+
+    row = _encode_copy_row(doc_id, "é", "{}", [1.5])
+
+    assert row == b"".join(
+        [
+            struct.pack(">h", 4),
+            struct.pack(">i", 16) + uuid.UUID(doc_id).bytes,
+            struct.pack(">i", 2) + "é".encode(),
+            struct.pack(">i", 3) + b"\x01{}",
+            struct.pack(">i", 8) + struct.pack(">HHf", 1, 0, 1.5),
+        ]
+    )
+
+
+def test_search_by_full_text_passes_the_document_ids_as_parameters(pgvector):
+    vector, cur = pgvector
+
+    vector.search_by_full_text("query", top_k=2, document_ids_filter=["a'b"])
+
+    sql, params = cur.execute.call_args.args
+    assert "= ANY(%s)" in sql
+    assert "a'b" not in sql
+    assert params == ("'query'", "'query'", ["a'b"], 2)
+
+
+def test_create_with_duplicate_check_on_a_missing_table(pgvector):
+    vector, cur = pgvector
+    cur.execute.side_effect = psycopg2.errors.UndefinedTable()
+    documents = [Document(page_content="text", metadata={"doc_id": str(uuid.uuid4())})]
+    factory_vector = Vector.__new__(Vector)
+    factory_vector._dataset = MagicMock(embedding_model_provider="openai")
+    factory_vector._vector_processor = vector
+    factory_vector._embeddings = MagicMock()
+    factory_vector._embeddings.embed_documents.return_value = [[0.5, 1.0]]
+
+    with (
+        patch("core.rag.datasource.vdb.vector_factory.dify_config") as mock_config,
+        patch.object(vector, "create") as mock_create,
+    ):
+        mock_config.VECTOR_CREATE_PIPELINE_DEPTH = 0
+        mock_config.VECTOR_CREATE_EMBEDDING_CONCURRENCY_PER_PROVIDER = 8
+        factory_vector.create(documents, duplicate_check=True)
+
+    # the first texts of a collection create its table instead of failing the duplicate check
+    assert mock_create.call_args.kwargs["texts"] == documents
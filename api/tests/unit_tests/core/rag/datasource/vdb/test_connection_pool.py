@@ -0,0 +1,102 @@
+import itertools
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+import psycopg2.pool
+import pytest
+
+from core.rag.datasource.vdb.connection_pool import ConnectionPoolRegistry, Psycopg2ConnectionPool
+
+
+class _FakeThreadedConnectionPool:
+    def __init__(self, minconn, maxconn, **kwargs):
+        self.created = 0
+        self.closed_connections = []
+        self.idle = []
+
+    def getconn(self):
+        if self.idle:
+            return self.idle.pop()
+        self.created += 1
+        conn = MagicMock()
+        conn.closed = 0
+        return conn
+
+    def putconn(self, conn, close=False):
+        if close:
+            self.closed_connections.append(conn)
+        else:
+            self.idle.append(conn)
+
+    def closeall(self):
+        pass
+
+
+@pytest.fixture
+def pool():
+    with patch("psycopg2.pool.ThreadedConnectionPool", _FakeThreadedConnectionPool):
+        yield Psycopg2ConnectionPool(1, 2, timeout=0.01, health_check_interval=60, host="localhost")
+
+
+def test_connections_are_reused(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert pool.stats()["in_use"] == 1
+
+    assert first is second
+    stats = pool.stats()
+    assert stats["checkouts"] == 2
+    assert stats["in_use"] == 0
+    assert stats["max_in_use"] == 1
+
+
+def test_checkout_times_out_when_all_connections_are_in_use(pool):
+    with pool.connection(), pool.connection():
+        with pytest.raises(psycopg2.pool.PoolError):
+            with pool.connection():
+                pass
+
+    assert pool.stats()["timeouts"] == 1
+    # the slots are released, connections can be checked out again
+    with pool.connection():
+        pass
+
+
+def test_failed_block_rolls_back_and_closed_connections_are_discarded(pool):
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            raise RuntimeError("query failed")
+    conn.rollback.assert_called_once()
+    assert pool._pool.idle == [conn]
+
+    with pool.connection() as conn:
+        conn.closed = 1
+    assert pool._pool.closed_connections == [conn]
+
+
+def test_idle_connections_failing_the_health_check_are_replaced(pool):
+    with pool.connection() as conn:
+        pass
+    conn.cursor.return_value.__enter__.return_value.execute.side_effect = psycopg2.OperationalError("gone")
+
+    with patch("core.rag.datasource.vdb.connection_pool.time.monotonic", return_value=10**9):
+        with pool.connection() as replacement:
+            pass
+
+    assert replacement is not conn
+    assert pool._pool.closed_connections == [conn]
+    assert pool.stats()["replaced"] == 1
+
+
+def test_registry_shares_pools_by_key():
+    registry = ConnectionPoolRegistry()
+    counter = itertools.count()
+
+    first = registry.get(("pg", "host-a"), lambda: next(counter), name="pg:host-a")
+    assert registry.get(("pg", "host-a"), lambda: next(counter), name="pg:host-a") == first
+    assert registry.get(("pg", "host-b"), lambda: next(counter), name="pg:host-b") != first
+
+    # a forked process creates its own pools
+    with patch("core.rag.datasource.vdb.connection_pool.os.getpid", return_value=-1):
+        assert registry.get(("pg", "host-a"), lambda: next(counter), name="pg:host-a") == 2
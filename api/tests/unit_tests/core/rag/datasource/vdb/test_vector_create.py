@@ -0,0 +1,99 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.rag.datasource.vdb.vector_factory import Vector
+from core.rag.models.document import Document
+
+
+def _documents(count: int) -> list[Document]:
+    return [Document(page_content=str(i), metadata={"doc_id": str(i)}) for i in range(count)]
+
+
+def _vector(embeddings) -> Vector:
+    vector = Vector.__new__(Vector)
+    vector._dataset = MagicMock(embedding_model_provider="openai")
+    vector._embeddings = embeddings
+    vector._vector_processor = MagicMock()
+    return vector
+
+
+@pytest.fixture
+def mock_config():
+    with (
+        patch("core.rag.datasource.vdb.vector_factory.dify_config") as mock_config,
+        patch("core.rag.datasource.vdb.vector_factory.CREATE_BATCH_SIZE", 2),
+        patch("core.rag.datasource.vdb.vector_factory.has_app_context", return_value=True),
+        patch("core.rag.datasource.vdb.vector_factory.current_app", new_callable=MagicMock),
+    ):
+        mock_config.VECTOR_CREATE_EMBEDDING_CONCURRENCY_PER_PROVIDER = 8
+        yield mock_config
+
+
+def _written_ids(vector: Vector) -> list[list[str]]:
+    return [
+        [document.metadata["doc_id"] for document in call.kwargs["texts"]]
+        for call in vector._vector_processor.create.call_args_list
+    ]
+
+
+def test_batches_are_written_in_order(mock_config):
+    mock_config.VECTOR_CREATE_PIPELINE_DEPTH = 2
+    embeddings = MagicMock()
+    embeddings.embed_documents.side_effect = lambda texts: [[float(text)] for text in texts]
+    vector = _vector(embeddings)
+
+    vector.create(_documents(5))
+
+    assert _written_ids(vector) == [["0", "1"], ["2", "3"], ["4"]]
+    for call in vector._vector_processor.create.call_args_list:
+        assert call.kwargs["embeddings"] == [[float(document.page_content)] for document in call.kwargs["texts"]]
+
+
+def test_next_batch_is_embedded_while_the_previous_one_is_written(mock_config):
+    mock_config.VECTOR_CREATE_PIPELINE_DEPTH = 1
+    second_batch_embedding = threading.Event()
+    embeddings = MagicMock()
+
+    def embed_documents(texts):
+        if texts == ["2", "3"]:
+            second_batch_embedding.set()
+        return [[0.0] for _ in texts]
+
+    embeddings.embed_documents.side_effect = embed_documents
+    vector = _vector(embeddings)
+    overlapped = []
+    vector._vector_processor.create.side_effect = lambda texts, embeddings, **kwargs: overlapped.append(
+        second_batch_embedding.wait(timeout=5)
+    )
+
+    vector.create(_documents(4))
+
+    # the second batch was embedded during the write of the first one
+    assert overlapped[0] is True
+
+
+def test_depth_zero_embeds_and_writes_serially(mock_config):
+    mock_config.VECTOR_CREATE_PIPELINE_DEPTH = 0
+    embeddings = MagicMock()
+    embeddings.embed_documents.side_effect = lambda texts: [[0.0] for _ in texts]
+    vector = _vector(embeddings)
+
+    with patch("core.rag.datasource.vdb.vector_factory.concurrent.futures.ThreadPoolExecutor") as mock_executor:
+        vector.create(_documents(3))
+
+    mock_executor.assert_not_called()
+    assert _written_ids(vector) == [["0", "1"], ["2"]]
+
+
+def test_embedding_failure_stops_the_pipeline(mock_config):
+    mock_config.VECTOR_CREATE_PIPELINE_DEPTH = 1
+    embeddings = MagicMock()
+    embeddings.embed_documents.side_effect = [[[0.0], [0.0]], RuntimeError("rate limited"), [[0.0], [0.0]]]
+    vector = _vector(embeddings)
+
+    with pytest.raises(RuntimeError):
+        vector.create(_documents(6))
+
+    assert _written_ids(vector) == [["0", "1"]]
@@ -0,0 +1,107 @@
+from unittest.mock import MagicMock, patch
+
+from core.rag.datasource.vdb.vector_base import BaseVector
+from core.rag.datasource.vdb.vector_factory import Vector
+from core.rag.models.document import Document
+
+
+def _document(doc_id: str | None) -> Document:
+    return Document(page_content=f"text of {doc_id}", metadata={"doc_id": doc_id} if doc_id else {})
+
+
+class _InMemoryVector(BaseVector):
+    def __init__(self, existing_ids: set[str]):
+        super().__init__("collection")
+        self.existing_ids = existing_ids
+        self.checked_ids: list[str] = []
+
+    def get_type(self) -> str:
+        return "memory"
+
+    def create(self, texts, embeddings, **kwargs):
+        pass
+
+    def add_texts(self, documents, embeddings, **kwargs):
+        pass
+
+    def text_exists(self, id: str) -> bool:
+        self.checked_ids.append(id)
+        return id in self.existing_ids
+
+    def delete_by_ids(self, ids):
+        pass
+
+    def delete_by_metadata_field(self, key, value):
+        pass
+
+    def search_by_vector(self, query_vector, **kwargs):
+        return []
+
+    def search_by_full_text(self, query, **kwargs):
+        return []
+
+    def delete(self):
+        pass
+
+
+def _vector(vector_processor) -> Vector:
+    vector = Vector.__new__(Vector)
+    vector._dataset = MagicMock()
+    vector._vector_processor = vector_processor
+    vector._embeddings = MagicMock()
+    return vector
+
+
+def test_get_existing_ids_falls_back_to_text_exists():
+    vector_processor = _InMemoryVector({"a", "c"})
+
+    assert vector_processor.get_existing_ids(["a", "b", "c"]) == {"a", "c"}
+    assert vector_processor.checked_ids == ["a", "b", "c"]
+
+
+def test_duplicates_are_checked_in_batches():
+    vector_processor = MagicMock()
+    vector_processor.get_existing_ids.side_effect = lambda ids: {id for id in ids if id in {"1", "3"}}
+    documents = [_document(str(i)) for i in range(5)] + [_document(None)]
+
+    with patch("core.rag.datasource.vdb.vector_factory.DUPLICATE_CHECK_BATCH_SIZE", 2):
+        filtered = _vector(vector_processor)._filter_duplicate_texts(documents)
+
+    assert [document.metadata.get("doc_id") for document in filtered] == ["0", "2", "4", None]
+    checked_ids = [call.args[0] for call in vector_processor.get_existing_ids.call_args_list]
+    assert checked_ids == [["0", "1"], ["2", "3"], ["4"]]
+
+
+def test_create_skips_existing_documents_when_checking_duplicates():
+    vector_processor = MagicMock()
+    vector_processor.get_existing_ids.return_value = {"a"}
+    vector = _vector(vector_processor)
+    vector._embeddings.embed_documents.return_value = [[0.1]]
+
+    vector.create([_document("a"), _document("b")], duplicate_check=True)
+
+    created = vector_processor.create.call_args.kwargs["texts"]
+    assert [document.metadata["doc_id"] for document in created] == ["b"]
+
+
+def test_create_with_duplicate_check_on_a_missing_elasticsearch_index():
+    from core.rag.datasource.vdb.elasticsearch.elasticsearch_vector import ElasticSearchVector
+
+    vector_processor = ElasticSearchVector.__new__(ElasticSearchVector)
+    vector_processor._collection_name = "collection"
+    vector_processor._client = MagicMock()
+    vector_processor._client.indices.exists.return_value = False
+    vector = _vector(vector_processor)
+    vector._embeddings.embed_documents.return_value = [[0.5]]
+    documents = [_document("a")]
+
+    with (
+        patch("core.rag.datasource.vdb.vector_factory.dify_config") as mock_config,
+        patch.object(vector_processor, "create") as mock_create,
+    ):
+        mock_config.VECTOR_CREATE_PIPELINE_DEPTH = 0
+        mock_config.VECTOR_CREATE_EMBEDDING_CONCURRENCY_PER_PROVIDER = 8
+        vector.create(documents, duplicate_check=True)
+
+    vector_processor._client.mget.assert_not_called()
+    assert mock_create.call_args.kwargs["texts"] == documents
@@ -0,0 +1,105 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+from core.rag.embedding import cached_embedding
+from core.rag.embedding.cached_embedding import CacheEmbedding
+from libs import helper
+from models.dataset import Embedding
+
+
+def _make_model_instance(embeddings: list[list[float]]) -> MagicMock:
+    model_instance = MagicMock()
+    model_instance.model = "text-embedding-3-small"
+    model_instance.provider = "openai"
+    model_instance.model_type_instance.get_model_schema.return_value = None
+    model_instance.invoke_text_embedding.return_value = MagicMock(embeddings=embeddings)
+    return model_instance
+
+
+def _cached_row(text: str, vector: list[float]) -> Embedding:
+    embedding = Embedding(
+        model_name="text-embedding-3-small", hash=helper.generate_text_hash(text), provider_name="openai"
+    )
+    embedding.set_embedding(vector)
+    return embedding
+
+
+@patch("core.rag.embedding.cached_embedding.db")
+def test_embed_documents_uses_single_lookup_for_cache_hits(mock_db):
+    mock_db.session.scalars.return_value.all.return_value = [
+        _cached_row("hello", [1.0, 0.0]),
+        _cached_row("world", [0.0, 1.0]),
+    ]
+    model_instance = _make_model_instance([])
+
+    cache_embedding = CacheEmbedding(model_instance)
+    result = cache_embedding.embed_documents(["hello", "world", "hello"])
+
+    assert result == [[1.0, 0.0], [0.0, 1.0], [1.0, 0.0]]
+    assert mock_db.session.scalars.call_count == 1
+    model_instance.invoke_text_embedding.assert_not_called()
+    mock_db.session.execute.assert_not_called()
+    assert cache_embedding.cache_hits == 3
+    assert cache_embedding.cache_misses == 0
+
+
+@patch("core.rag.embedding.cached_embedding.db")
+def test_embed_documents_embeds_and_bulk_stores_misses(mock_db):
+    mock_db.session.scalars.return_value.all.return_value = [_cached_row("hello", [1.0, 0.0])]
+    model_instance = _make_model_instance([[3.0, 4.0]])
+
+    cache_embedding = CacheEmbedding(model_instance)
+    result = cache_embedding.embed_documents(["hello", "world"])
+
+    assert result[0] == [1.0, 0.0]
+    assert result[1] == [0.6, 0.8]
+    model_instance.invoke_text_embedding.assert_called_once()
+    assert model_instance.invoke_text_embedding.call_args.kwargs["texts"] == ["world"]
+    assert mock_db.session.execute.call_count == 1
+    mock_db.session.commit.assert_called_once()
+    assert cache_embedding.cache_hits == 1
+    assert cache_embedding.cache_misses == 1
+
+
+@pytest.fixture
+def local_query_cache():
+    assert cached_embedding._query_embedding_local_cache is not None
+    cached_embedding._query_embedding_local_cache.clear()
+    yield cached_embedding._query_embedding_local_cache
+    cached_embedding._query_embedding_local_cache.clear()
+
+
+@patch("core.rag.embedding.cached_embedding.dify_config.EMBEDDING_QUERY_CACHE_TTL", 30)
+@patch("core.rag.embedding.cached_embedding.redis_client")
+def test_embed_query_reads_float32_bytes_from_redis_in_one_round_trip(mock_redis, local_query_cache):
+    pipeline = mock_redis.pipeline.return_value
+    pipeline.execute.return_value = [np.asarray([0.6, 0.8], dtype="<f4").tobytes(), True]
+    model_instance = _make_model_instance([])
+
+    result = CacheEmbedding(model_instance).embed_query("hello")
+
+    assert result == pytest.approx([0.6, 0.8])
+    pipeline.expire.assert_called_once()
+    assert pipeline.expire.call_args.args[1] == 30
+    pipeline.execute.assert_called_once()
+    mock_redis.get.assert_not_called()
+    model_instance.invoke_text_embedding.assert_not_called()
+
+
+@patch("core.rag.embedding.cached_embedding.redis_client")
+def test_embed_query_serves_repeated_queries_from_local_cache(mock_redis, local_query_cache):
+    mock_redis.pipeline.return_value.execute.return_value = [None, False]
+    model_instance = _make_model_instance([[3.0, 4.0]])
+
+    first = CacheEmbedding(model_instance).embed_query("hello")
+    second = CacheEmbedding(model_instance).embed_query("hello")
+
+    assert first == pytest.approx([0.6, 0.8])
+    # fresh and cached embeddings are the same float32 values
+    assert second == first
+    model_instance.invoke_text_embedding.assert_called_once()
+    mock_redis.pipeline.assert_called_once()
+    stored = mock_redis.setex.call_args.args[2]
+    assert np.frombuffer(stored, dtype="<f4").tolist() == pytest.approx([0.6, 0.8])
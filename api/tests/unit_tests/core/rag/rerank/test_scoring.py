@@ -0,0 +1,52 @@
+import math
+from collections import Counter
+
+import pytest
+
+from core.rag.rerank.scoring import cosine_similarities, keyword_tfidf_similarities
+
+
+def _reference_keyword_similarities(query_keywords, documents_keywords, total_documents):
+    keyword_idf = {}
+    for keyword in set().union(*documents_keywords):
+        doc_count = sum(1 for doc_keywords in documents_keywords if keyword in doc_keywords)
+        keyword_idf[keyword] = math.log((1 + total_documents) / (1 + doc_count)) + 1
+    query_tfidf = {k: c * keyword_idf.get(k, 0) for k, c in Counter(query_keywords).items()}
+    similarities = []
+    for doc_keywords in documents_keywords:
+        doc_tfidf = {k: c * keyword_idf.get(k, 0) for k, c in Counter(doc_keywords).items()}
+        numerator = sum(query_tfidf[k] * doc_tfidf[k] for k in set(query_tfidf) & set(doc_tfidf))
+        denominator = math.sqrt(sum(v**2 for v in query_tfidf.values())) * math.sqrt(
+            sum(v**2 for v in doc_tfidf.values())
+        )
+        similarities.append(numerator / denominator if denominator else 0.0)
+    return similarities
+
+
+def test_keyword_similarities_match_reference_implementation():
+    query_keywords = {"dify", "workflow", "rag"}
+    documents_keywords = [
+        {"dify", "workflow", "agent"},
+        {"rag", "embedding"},
+        {"unrelated"},
+        {"dify", "rag", "workflow"},
+    ]
+
+    result = keyword_tfidf_similarities(query_keywords, documents_keywords, total_documents=5)
+
+    assert result == pytest.approx(_reference_keyword_similarities(query_keywords, documents_keywords, 5))
+    assert result[2] == 0.0
+    assert result[3] == pytest.approx(max(result))
+
+
+def test_keyword_similarities_handle_empty_inputs():
+    assert keyword_tfidf_similarities({"a"}, []) == []
+    assert keyword_tfidf_similarities({"a"}, [set(), set()]) == [0.0, 0.0]
+    assert keyword_tfidf_similarities(set(), [{"a"}]) == [0.0]
+
+
+def test_cosine_similarities():
+    result = cosine_similarities([1.0, 0.0], [[1.0, 0.0], [0.0, 2.0], [1.0, 1.0], [0.0, 0.0]])
+
+    assert result == pytest.approx([1.0, 0.0, math.sqrt(0.5), 0.0])
+    assert cosine_similarities([1.0, 0.0], []) == []
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from core.rag.retrieval.retrieval_executor import RetrievalExecutor
+
+
+def test_submit_runs_tasks_and_tracks_stats():
+    executor = RetrievalExecutor(name="test", max_workers=2, max_tasks_per_tenant=2)
+
+    futures = [executor.submit("tenant-1", lambda x: x * 2, i) for i in range(4)]
+
+    assert executor.wait(futures, timeout=5)
+    assert [future.result() for future in futures] == [0, 2, 4, 6]
+    stats = executor.stats()
+    assert stats["completed"] == 4
+    assert stats["queued"] == 0
+    assert stats["active"] == 0
+
+
+def test_tenant_cannot_exceed_its_task_limit():
+    executor = RetrievalExecutor(name="test", max_workers=4, max_tasks_per_tenant=1)
+    release = threading.Event()
+    running = []
+
+    def task():
+        running.append(1)
+        release.wait(5)
+        running.pop()
+
+    first = executor.submit("tenant-1", task)
+    submitted_second = threading.Event()
+
+    def submit_second():
+        executor.submit("tenant-1", task)
+        submitted_second.set()
+
+    threading.Thread(target=submit_second, daemon=True).start()
+    other_tenant = executor.submit("tenant-2", lambda: "ok")
+
+    assert other_tenant.result(timeout=5) == "ok"
+    assert not submitted_second.wait(0.2)
+    release.set()
+    assert submitted_second.wait(5)
+    first.result(timeout=5)
+
+
+def test_wait_cancels_queued_tasks_on_timeout():
+    executor = RetrievalExecutor(name="test", max_workers=1, max_tasks_per_tenant=10)
+    release = threading.Event()
+
+    blocking = executor.submit("tenant-1", release.wait, 5)
+    queued = executor.submit("tenant-1", time.sleep, 0)
+
+    assert not executor.wait([blocking, queued], timeout=0.1)
+    assert queued.cancelled()
+    release.set()
+    blocking.result(timeout=5)
+    assert executor.stats()["cancelled"] == 1
@@ -0,0 +1,41 @@
+from core.rag.splitter.fixed_text_splitter import FixedRecursiveCharacterTextSplitter
+from core.rag.splitter.text_splitter import RecursiveCharacterTextSplitter
+
+
+def test_merge_splits_with_overlap():
+    splitter = RecursiveCharacterTextSplitter(chunk_size=10, chunk_overlap=4, keep_separator=False)
+    splits = ["aaa", "bbb", "ccc", "dd", "e"]
+
+    chunks = splitter._merge_splits(splits, " ", [len(s) for s in splits])
+
+    assert chunks == ["aaa bbb", "bbb ccc dd", "dd e"]
+
+
+def test_merge_splits_uses_the_given_lengths():
+    calls = []
+
+    def length_function(texts: list[str]) -> list[int]:
+        calls.append(list(texts))
+        return [len(text) for text in texts]
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=10, chunk_overlap=4, length_function=length_function)
+    splits = ["aaaa"] * 20
+
+    splitter._merge_splits(splits, "", [4] * 20)
+    splitter._merge_splits(splits, "", [4] * 20)
+
+    # only the separator is measured, and only once
+    assert calls == [[""]]
+
+
+def test_fixed_splitter_keeps_chunks_within_size():
+    splitter = FixedRecursiveCharacterTextSplitter.from_encoder(
+        embedding_model_instance=None, chunk_size=50, chunk_overlap=10, fixed_separator="\n\n"
+    )
+    text = "\n\n".join(" ".join(f"word{i}" for i in range(n)) for n in (3, 40, 5))
+
+    chunks = splitter.split_text(text)
+
+    assert chunks[0] == "word0 word1 word2"
+    assert chunks[-1] == "word0 word1 word2 word3 word4"
+    assert all(len(chunk) <= 50 for chunk in chunks)
@@ -0,0 +1,151 @@
+"""Unit tests for the offloading of workflow node execution payloads to the storage."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+import zstandard
+from flask_restx import marshal
+
+from core.repositories.workflow_node_execution_payload_offloader import WorkflowNodeExecutionPayloadOffloader
+from fields.workflow_run_fields import (
+    workflow_run_node_execution_fields,
+    workflow_run_node_execution_list_item_fields,
+)
+from models import WorkflowNodeExecutionModel
+
+
+class _MemoryStorage:
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+        self.saves = 0
+        self.loads = 0
+
+    def save(self, filename: str, data: bytes):
+        self.saves += 1
+        self.objects[filename] = data
+
+    def load_once(self, filename: str) -> bytes:
+        self.loads += 1
+        return self.objects[filename]
+
+
+@pytest.fixture
+def memory_storage():
+    memory_storage = _MemoryStorage()
+    with (
+        patch("core.repositories.workflow_node_execution_payload_offloader.storage", memory_storage),
+        patch("models.workflow.storage", memory_storage),
+    ):
+        yield memory_storage
+
+
+def _db_model(outputs: dict | None) -> WorkflowNodeExecutionModel:
+    db_model = WorkflowNodeExecutionModel()
+    db_model.id = "execution-id"
+    db_model.tenant_id = "tenant-id"
+    db_model.inputs = json.dumps({"query": "hello"})
+    db_model.process_data = None
+    db_model.outputs = json.dumps(outputs) if outputs is not None else None
+    return db_model
+
+
+def test_large_payloads_are_offloaded(memory_storage):
+    offloader = WorkflowNodeExecutionPayloadOffloader(threshold=100, preview_length=20)
+    outputs = {"text": "x" * 1000}
+    db_model = _db_model(outputs)
+
+    offloader.offload(db_model)
+
+    storage_key = "workflow_node_executions/tenant-id/execution-id/outputs.json.zst"
+    assert db_model.outputs is None
+    assert db_model.payload_storage_keys_dict == {"outputs": storage_key}
+    assert db_model.payload_preview_dict == {"outputs": {"text": "x" * 20}}
+    assert json.loads(zstandard.ZstdDecompressor().decompress(memory_storage.objects[storage_key])) == outputs
+    # small payloads stay in the database
+    assert db_model.inputs_dict == {"query": "hello"}
+
+    # the payload is loaded once, when it is read
+    assert memory_storage.loads == 0
+    assert db_model.outputs_dict == outputs
+    assert db_model.outputs_dict == outputs
+    assert memory_storage.loads == 1
+
+
+def test_unchanged_payloads_are_not_uploaded_again(memory_storage):
+    offloader = WorkflowNodeExecutionPayloadOffloader(threshold=100, preview_length=20)
+
+    offloader.offload(_db_model({"text": "x" * 1000}))
+    offloader.offload(_db_model({"text": "x" * 1000}))
+    assert memory_storage.saves == 1
+
+    offloader.offload(_db_model({"text": "y" * 1000}))
+    assert memory_storage.saves == 2
+
+
+def test_payloads_stay_inline_when_the_upload_fails(memory_storage):
+    offloader = WorkflowNodeExecutionPayloadOffloader(threshold=100, preview_length=20)
+    outputs = {"text": "x" * 1000}
+    db_model = _db_model(outputs)
+
+    with patch.object(memory_storage, "save", side_effect=ConnectionError("storage is down")):
+        offloader.offload(db_model)
+
+    assert db_model.outputs == json.dumps(outputs)
+    assert db_model.payload_storage_keys is None
+    assert db_model.payload_preview is None
+
+    # the payload is uploaded on the next save
+    offloader.offload(_db_model(outputs))
+    assert memory_storage.saves == 1
+
+
+def test_pointers_are_cleared_when_nothing_is_offloaded(memory_storage):
+    offloader = WorkflowNodeExecutionPayloadOffloader(threshold=100, preview_length=20)
+    db_model = _db_model({"text": "short"})
+    db_model.payload_storage_keys = json.dumps({"outputs": "stale"})
+
+    offloader.offload(db_model)
+
+    assert db_model.payload_storage_keys is None
+    assert db_model.payload_preview is None
+    assert db_model.outputs_dict == {"text": "short"}
+    assert memory_storage.saves == 0
+
+
+def test_list_fields_serve_previews_without_loading_payloads(memory_storage):
+    offloader = WorkflowNodeExecutionPayloadOffloader(threshold=100, preview_length=20)
+    outputs = {"text": "x" * 1000}
+    db_model = _db_model(outputs)
+    offloader.offload(db_model)
+
+    payload_fields = ("inputs", "process_data", "outputs", "offloaded_fields")
+    item = marshal(db_model, {key: workflow_run_node_execution_list_item_fields[key] for key in payload_fields})
+
+    assert memory_storage.loads == 0
+    assert item["inputs"] == {"query": "hello"}
+    # previews keep the shape of the payload
+    assert item["outputs"] == {"text": "x" * 20}
+    assert item["offloaded_fields"] == ["outputs"]
+    # the detail fields load the full payload
+    assert marshal(db_model, {"outputs": workflow_run_node_execution_fields["outputs"]})["outputs"] == outputs
+    assert memory_storage.loads == 1
+
+
+def test_previews_truncate_values_within_the_preview_length():
+    offloader = WorkflowNodeExecutionPayloadOffloader(threshold=100, preview_length=20)
+    payload = {"count": 3, "items": [{"id": i} for i in range(10)], "text": "y" * 100}
+
+    assert offloader.preview(json.dumps(payload)) == {"count": 3, "items": json.dumps(payload["items"])[:19]}
+    assert offloader.preview(json.dumps(["not", "an", "object"])) == {}
+
+
+def test_offloader_is_only_created_in_hybrid_mode():
+    with patch("core.repositories.workflow_node_execution_payload_offloader.dify_config") as mock_config:
+        mock_config.WORKFLOW_NODE_EXECUTION_STORAGE = "rdbms"
+        assert WorkflowNodeExecutionPayloadOffloader.from_config() is None
+
+        mock_config.WORKFLOW_NODE_EXECUTION_STORAGE = "hybrid"
+        mock_config.WORKFLOW_NODE_EXECUTION_OFFLOAD_THRESHOLD = 100
+        mock_config.WORKFLOW_NODE_EXECUTION_PREVIEW_LENGTH = 20
+        assert WorkflowNodeExecutionPayloadOffloader.from_config() is not None
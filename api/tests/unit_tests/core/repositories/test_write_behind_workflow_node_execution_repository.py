@@ -0,0 +1,143 @@
+"""Unit tests for the write-behind workflow node execution repository."""
+
+import threading
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from core.repositories.write_behind_workflow_node_execution_repository import (
+    PendingNodeExecutionWrite,
+    WorkflowNodeExecutionWriter,
+    WriteBehindWorkflowNodeExecutionRepository,
+)
+from core.workflow.entities.workflow_node_execution import WorkflowNodeExecution, WorkflowNodeExecutionStatus
+from core.workflow.nodes.enums import NodeType
+from models import Account, WorkflowNodeExecutionTriggeredFrom
+
+
+def _execution(execution_id: str, status=WorkflowNodeExecutionStatus.RUNNING) -> WorkflowNodeExecution:
+    return WorkflowNodeExecution(
+        id=execution_id,
+        workflow_id="test-workflow-id",
+        workflow_execution_id="test-workflow-execution-id",
+        node_execution_id=f"node-execution-{execution_id}",
+        node_id="test-node-id",
+        node_type=NodeType.START,
+        title="Test Node",
+        index=1,
+        status=status,
+        created_at=datetime(2025, 1, 1),
+    )
+
+
+def _write(owner: object, execution_id: str, status: str = "running") -> PendingNodeExecutionWrite:
+    return PendingNodeExecutionWrite(
+        owner=owner,
+        session_factory=Mock(spec=sessionmaker),
+        row={"id": execution_id, "status": status},
+        execution=_execution(execution_id),
+        db_model=Mock(),
+    )
+
+
+class _RecordingWriter(WorkflowNodeExecutionWriter):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches: list[list[dict]] = []
+        self.conflicting_ids: set[str] = set()
+        self.failures = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def _upsert(self, session_factory, rows):
+        self.release.wait(timeout=5)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("connection reset")
+        self.batches.append([dict(row) for row in rows])
+        return {row["id"] for row in rows if row["id"] not in self.conflicting_ids}
+
+
+@pytest.fixture
+def writer():
+    return _RecordingWriter(batch_size=10, interval=5.0, max_pending=100)
+
+
+def test_updates_of_an_execution_are_coalesced(writer):
+    owner = object()
+    writer.release.clear()
+    for status in ("running", "succeeded"):
+        writer.enqueue(_write(owner, "a", status))
+    writer.enqueue(_write(owner, "b"))
+    writer.release.set()
+
+    assert writer.flush(owner, timeout=5)
+
+    rows = [row for batch in writer.batches for row in batch]
+    assert {row["id"]: row["status"] for row in rows} == {"a": "succeeded", "b": "running"}
+    assert writer.stats()["coalesced"] == 1
+
+
+def test_flush_writes_without_waiting_for_the_interval(writer):
+    owner = object()
+    writer.enqueue(_write(owner, "a"))
+
+    # the interval is 5 seconds, the flush must not wait for it
+    assert writer.flush(owner, timeout=1)
+    assert writer.stats()["written"] == 1
+
+
+def test_failed_batches_are_retried(writer):
+    owner = object()
+    writer.failures = 1
+    writer.enqueue(_write(owner, "a"))
+
+    with patch("core.repositories.write_behind_workflow_node_execution_repository.time.sleep"):
+        assert writer.flush(owner, timeout=5)
+
+    assert [row["id"] for batch in writer.batches for row in batch] == ["a"]
+
+
+def test_id_collision_regenerates_the_id(writer):
+    owner = object()
+    writer.conflicting_ids = {"taken"}
+    write = _write(owner, "taken")
+    writer.enqueue(write)
+
+    with patch("core.repositories.write_behind_workflow_node_execution_repository.time.sleep"):
+        assert writer.flush(owner, timeout=5)
+
+    assert write.execution.id != "taken"
+    assert writer.batches[-1] == [{"id": write.execution.id, "status": "running"}]
+
+
+def test_repository_save_queues_the_row():
+    user = Mock(spec=Account)
+    user.id = "test-user-id"
+    user.current_tenant_id = "test-tenant-id"
+    writer = Mock()
+    with patch(
+        "core.repositories.write_behind_workflow_node_execution_repository.get_workflow_node_execution_writer",
+        return_value=writer,
+    ):
+        repository = WriteBehindWorkflowNodeExecutionRepository(
+            session_factory=Mock(spec=sessionmaker),
+            user=user,
+            app_id="test-app-id",
+            triggered_from=WorkflowNodeExecutionTriggeredFrom.WORKFLOW_RUN,
+        )
+
+    repository.save(_execution("a"))
+
+    write = writer.enqueue.call_args.args[0]
+    assert write.owner is repository
+    assert write.row["id"] == "a"
+    assert write.row["tenant_id"] == "test-tenant-id"
+    assert write.row["workflow_run_id"] == "test-workflow-execution-id"
+    assert "_sa_instance_state" not in write.row
+
+    writer.flush.return_value = True
+    assert repository.flush(timeout=1)
+    writer.flush.assert_called_once_with(owner=repository, timeout=1)
@@ -0,0 +1,99 @@
+import queue
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.indexing_runner import IndexingRunner
+from core.rag.index_processor.constant.index_type import IndexType
+
+
+@pytest.mark.parametrize(
+    ("doc_form", "parent_mode", "expected"),
+    [
+        (IndexType.PARAGRAPH_INDEX, None, True),
+        (IndexType.PARENT_CHILD_INDEX, "paragraph", True),
+        (IndexType.PARENT_CHILD_INDEX, "full-doc", False),
+        (IndexType.QA_INDEX, None, False),
+    ],
+)
+def test_can_run_pipeline(doc_form, parent_mode, expected):
+    dataset_document = MagicMock(doc_form=doc_form)
+    process_rule = {"mode": "custom", "rules": {"parent_mode": parent_mode}}
+
+    with patch("core.indexing_runner.dify_config.INDEXING_PIPELINE_ENABLED", True):
+        assert IndexingRunner._can_run_pipeline(dataset_document, process_rule) is expected
+    with patch("core.indexing_runner.dify_config.INDEXING_PIPELINE_ENABLED", False):
+        assert IndexingRunner._can_run_pipeline(dataset_document, process_rule) is False
+
+
+def test_put_pipeline_batch_gives_up_when_stopped():
+    batches: queue.Queue = queue.Queue(maxsize=1)
+    stop = threading.Event()
+    IndexingRunner._put_pipeline_batch(batches, [MagicMock()], stop)
+
+    stop.set()
+    IndexingRunner._put_pipeline_batch(batches, [MagicMock()], stop)
+    IndexingRunner._put_pipeline_batch(batches, None, stop)
+
+    assert batches.qsize() == 1
+
+
+def test_pipeline_worker_indexes_batches_until_the_end_marker():
+    runner = IndexingRunner.__new__(IndexingRunner)
+    runner._process_chunk = MagicMock(return_value=5)  # type: ignore[method-assign]
+    batches: queue.Queue = queue.Queue()
+    for batch in ([MagicMock()], [MagicMock()], None):
+        batches.put(batch)
+    dataset = MagicMock(indexing_technique="high_quality")
+
+    stop = threading.Event()
+
+    tokens = runner._run_pipeline_worker(
+        MagicMock(), batches, stop, MagicMock(), dataset, MagicMock(), None, {"index": 0.0}, threading.Lock()
+    )
+
+    assert tokens == 10
+    assert runner._process_chunk.call_count == 2
+
+
+def test_pipeline_worker_collects_the_keyword_batches_in_economy_mode():
+    runner = IndexingRunner.__new__(IndexingRunner)
+    runner._process_chunk = MagicMock(return_value=0)  # type: ignore[method-assign]
+    batches: queue.Queue = queue.Queue()
+    documents = [MagicMock(), MagicMock(), MagicMock()]
+    for batch in (documents[:2], documents[2:], None):
+        batches.put(batch)
+    keyword_documents: list = []
+
+    runner._run_pipeline_worker(
+        MagicMock(),
+        batches,
+        threading.Event(),
+        MagicMock(),
+        MagicMock(indexing_technique="economy"),
+        MagicMock(),
+        None,
+        {"index": 0.0},
+        threading.Lock(),
+        keyword_documents,
+    )
+
+    # the keyword table is written once after the pipeline instead of once per batch
+    runner._process_chunk.assert_not_called()
+    assert keyword_documents == documents
+
+
+def test_pipeline_worker_failure_stops_the_pipeline():
+    runner = IndexingRunner.__new__(IndexingRunner)
+    runner._process_chunk = MagicMock(side_effect=RuntimeError("embedding failed"))  # type: ignore[method-assign]
+    batches: queue.Queue = queue.Queue()
+    batches.put([MagicMock()])
+    stop = threading.Event()
+
+    with pytest.raises(RuntimeError):
+        runner._run_pipeline_worker(
+            MagicMock(), batches, stop, MagicMock(), MagicMock(), MagicMock(), None, {"index": 0.0}, threading.Lock()
+        )
+
+    assert stop.is_set()
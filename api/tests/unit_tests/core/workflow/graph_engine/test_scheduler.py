@@ -0,0 +1,96 @@
+import threading
+
+from core.workflow.graph_engine.graph_engine import GraphEngineThreadPool
+from core.workflow.graph_engine.scheduler import GraphEngineScheduler
+
+
+def test_thread_pool_runs_tasks_on_shared_scheduler():
+    scheduler = GraphEngineScheduler(max_workers=2, max_queue_size=10)
+    thread_pool = GraphEngineThreadPool(max_workers=2, max_submit_count=10, scheduler=scheduler)
+
+    futures = [thread_pool.submit(lambda x: x + 1, i) for i in range(5)]
+
+    assert [future.result(timeout=5) for future in futures] == [1, 2, 3, 4, 5]
+    assert scheduler.stats()["rejected"] == 0
+
+
+def test_thread_pool_limits_concurrency_per_run():
+    scheduler = GraphEngineScheduler(max_workers=4, max_queue_size=10)
+    thread_pool = GraphEngineThreadPool(max_workers=1, max_submit_count=10, scheduler=scheduler)
+    release = threading.Event()
+
+    first = thread_pool.submit(release.wait, 5)
+    second = thread_pool.submit(lambda: "done")
+
+    assert not second.done()
+    assert thread_pool.stats()["pending"] == 1
+    release.set()
+    assert second.result(timeout=5) == "done"
+    assert first.result(timeout=5)
+
+
+def test_submit_runs_inline_instead_of_failing_when_run_is_full():
+    scheduler = GraphEngineScheduler(max_workers=1, max_queue_size=10)
+    thread_pool = GraphEngineThreadPool(max_workers=1, max_submit_count=1, scheduler=scheduler)
+    release = threading.Event()
+
+    thread_pool.submit(release.wait, 5)
+    caller_thread = thread_pool.submit(threading.get_ident)
+
+    assert caller_thread.result(timeout=0) == threading.get_ident()
+    assert scheduler.stats()["inline"] == 1
+    release.set()
+
+
+def test_waiting_caller_can_run_its_own_queued_task():
+    scheduler = GraphEngineScheduler(max_workers=1, max_queue_size=10)
+    thread_pool = GraphEngineThreadPool(max_workers=2, max_submit_count=10, scheduler=scheduler)
+    release = threading.Event()
+
+    blocker = thread_pool.submit(release.wait, 5)
+    queued = thread_pool.submit(threading.get_ident)
+
+    assert thread_pool.run_pending_task([queued])
+    assert queued.result(timeout=0) == threading.get_ident()
+    release.set()
+    blocker.result(timeout=5)
+
+
+def test_full_scheduler_queue_keeps_tasks_for_the_caller():
+    scheduler = GraphEngineScheduler(max_workers=1, max_queue_size=1)
+    thread_pool = GraphEngineThreadPool(max_workers=3, max_submit_count=10, scheduler=scheduler)
+    release = threading.Event()
+
+    blocker = thread_pool.submit(release.wait, 5)
+    while scheduler.stats()["active"] == 0:
+        pass
+    queued = thread_pool.submit(lambda: "queued")
+    kept = thread_pool.submit(lambda: "kept")
+
+    assert scheduler.stats()["rejected"] == 1
+    assert thread_pool.run_pending_task([kept])
+    assert kept.result(timeout=0) == "kept"
+    release.set()
+    assert queued.result(timeout=5) == "queued"
+    blocker.result(timeout=5)
+
+
+def test_stall_timeout_only_while_tasks_wait_for_a_worker():
+    scheduler = GraphEngineScheduler(max_workers=1, max_queue_size=10)
+    thread_pool = GraphEngineThreadPool(max_workers=1, max_submit_count=10, scheduler=scheduler)
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+
+    first = thread_pool.submit(blocking)
+    second = thread_pool.submit(lambda: "done")
+    assert started.wait(5)
+
+    assert thread_pool.stall_timeout([first]) is None
+    assert thread_pool.stall_timeout([first, second]) == GraphEngineThreadPool.STALL_TIMEOUT
+    release.set()
+    assert second.result(timeout=5) == "done"
+    assert thread_pool.stall_timeout([first, second]) is None
@@ -442,3 +442,62 @@ class TestVariablePoolSerialization:
         loaded = VariablePool.model_validate(pool_dict)
         assert isinstance(loaded.variable_dictionary, defaultdict)
         loaded.add(["non_exist_node", "a"], 1)
+
+
+class TestVariablePoolChild:
+    def test_child_reads_through_to_parent(self, pool):
+        pool.add(("node_1", "a"), "parent")
+        child = pool.create_child()
+
+        assert child.get(("node_1", "a")).value == "parent"
+        assert child.get([SYSTEM_VARIABLE_NODE_ID, "user_id"]).value == "test_user_id"
+        assert not child.variable_dictionary
+
+    def test_child_writes_are_isolated(self, pool):
+        pool.add(("node_1", "a"), "parent")
+        child = pool.create_child()
+        child.add(("node_1", "a"), "child")
+        child.add(("node_2", "b"), 1)
+
+        assert child.get(("node_1", "a")).value == "child"
+        assert child.get(("node_2", "b")).value == 1
+        assert pool.get(("node_1", "a")).value == "parent"
+        assert pool.get(("node_2", "b")) is None
+
+    def test_child_removals_are_isolated(self, pool):
+        pool.add(("node_1", "a"), "a")
+        pool.add(("node_1", "b"), "b")
+        pool.add(("node_2", "c"), "c")
+        child = pool.create_child()
+
+        child.remove(("node_1", "a"))
+        child.remove(("node_2",))
+
+        assert child.get(("node_1", "a")) is None
+        assert child.get(("node_1", "b")).value == "b"
+        assert child.get(("node_2", "c")) is None
+        assert pool.get(("node_1", "a")).value == "a"
+        assert pool.get(("node_2", "c")).value == "c"
+
+        child.add(("node_1", "a"), "again")
+        assert child.get(("node_1", "a")).value == "again"
+
+    def test_parent_writes_are_visible_to_child(self, pool):
+        child = pool.create_child()
+        pool.add(("node_1", "a"), "late")
+
+        assert child.get(("node_1", "a")).value == "late"
+
+    def test_child_serialization_includes_inherited_variables(self, pool):
+        pool.add(("node_1", "a"), "a")
+        pool.add(("node_1", "b"), "b")
+        child = pool.create_child()
+        child.remove(("node_1", "b"))
+        child.add(("node_2", "c"), "c")
+
+        loaded = VariablePool.model_validate_json(child.model_dump_json())
+
+        assert loaded.get(("node_1", "a")).value == "a"
+        assert loaded.get(("node_1", "b")) is None
+        assert loaded.get(("node_2", "c")).value == "c"
+        assert loaded.get([SYSTEM_VARIABLE_NODE_ID, "user_id"]).value == "test_user_id"
@@ -1,5 +1,5 @@
 import json
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 from sqlalchemy.orm import Session
@@ -234,6 +234,37 @@ def test_handle_workflow_run_success(workflow_cycle_manager, mock_workflow_execu
     assert result.finished_at is not None
 
 
+def test_node_executions_are_flushed_before_the_run_is_traced(
+    workflow_cycle_manager, mock_node_execution_repository, mock_workflow_execution_repository
+):
+    """Test the trace task is added after the node executions are persisted"""
+    workflow_execution = WorkflowExecution(
+        id_="test-workflow-run-id",
+        workflow_id="test-workflow-id",
+        workflow_version="1.0",
+        workflow_type=WorkflowType.CHAT,
+        graph={"nodes": [], "edges": []},
+        inputs={"query": "test query"},
+        started_at=naive_utc_now(),
+    )
+    workflow_cycle_manager._workflow_execution_cache[workflow_execution.id_] = workflow_execution
+    calls = []
+    mock_node_execution_repository.flush.side_effect = lambda *args, **kwargs: calls.append("flush")
+    mock_workflow_execution_repository.save.side_effect = lambda *args, **kwargs: calls.append("save")
+
+    with patch.object(
+        workflow_cycle_manager, "_add_trace_task_if_needed", side_effect=lambda *args: calls.append("trace")
+    ):
+        workflow_cycle_manager.handle_workflow_run_success(
+            workflow_run_id="test-workflow-run-id",
+            total_tokens=100,
+            total_steps=5,
+            trace_manager=MagicMock(),
+        )
+
+    assert calls == ["flush", "trace", "save"]
+
+
 def test_handle_workflow_run_failed(workflow_cycle_manager, mock_workflow_execution_repository):
     """Test handle_workflow_run_failed method"""
     # Create a real WorkflowExecution
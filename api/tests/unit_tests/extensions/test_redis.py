@@ -1,6 +1,8 @@
+from unittest.mock import MagicMock
+
 from redis import RedisError
 
-from extensions.ext_redis import redis_fallback
+from extensions.ext_redis import RedisScript, redis_fallback
 
 
 def test_redis_fallback_success():
@@ -51,3 +53,20 @@ def test_redis_fallback_preserves_function_metadata():
 
     assert test_func.__name__ == "test_func"
     assert test_func.__doc__ == "Test function docstring"
+
+
+def test_redis_script_is_registered_once_per_client():
+    script = RedisScript("return 1")
+    client = MagicMock()
+
+    script(client, keys=["key"], args=[1])
+    script(client, keys=["key"], args=[2])
+
+    client.register_script.assert_called_once_with("return 1")
+    assert client.register_script.return_value.call_count == 2
+    client.register_script.return_value.assert_called_with(keys=["key"], args=[2])
+
+    # a new client, e.g. a patched one, gets the script registered on it
+    other_client = MagicMock()
+    script(other_client, keys=["key"], args=[3])
+    other_client.register_script.assert_called_once_with("return 1")
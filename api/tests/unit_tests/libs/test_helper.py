@@ -1,6 +1,8 @@
+from unittest.mock import ANY, patch
+
 import pytest
 
-from libs.helper import extract_tenant_id
+from libs.helper import RateLimiter, extract_tenant_id
 from models.account import Account
 from models.model import EndUser
 
@@ -63,3 +65,50 @@ class TestExtractTenantId:
 
         with pytest.raises(ValueError, match="Invalid user type.*Expected Account or EndUser"):
             extract_tenant_id(dict_user)
+
+
+class TestRateLimiter:
+    """Test cases for RateLimiter, whose checks are single Redis scripts."""
+
+    @pytest.fixture
+    def mock_redis(self):
+        with patch("libs.helper.redis_client") as mock_redis:
+            yield mock_redis
+
+    @pytest.fixture
+    def rate_limiter(self):
+        return RateLimiter(prefix="test_rate_limit", max_attempts=2, time_window=60)
+
+    @patch("libs.helper.time.time", return_value=1000)
+    def test_is_rate_limited_counts_attempts_in_window(self, mock_time, mock_redis, rate_limiter):
+        script = mock_redis.register_script.return_value
+        script.return_value = 2
+
+        assert rate_limiter.is_rate_limited("user@example.com")
+        script.assert_called_once_with(keys=["test_rate_limit:user@example.com"], args=[940])
+
+        script.return_value = 1
+        assert not rate_limiter.is_rate_limited("user@example.com")
+
+    @patch("libs.helper.time.time", return_value=1000)
+    def test_increment_rate_limit(self, mock_time, mock_redis, rate_limiter):
+        rate_limiter.increment_rate_limit("user@example.com")
+
+        script = mock_redis.register_script.return_value
+        script.assert_called_once_with(keys=["test_rate_limit:user@example.com"], args=[1000, ANY, 120])
+        assert script.call_args.kwargs["args"][1].startswith("1000:")
+
+    @patch("libs.helper.time.time", return_value=1000)
+    def test_try_acquire(self, mock_time, mock_redis, rate_limiter):
+        script = mock_redis.register_script.return_value
+        script.return_value = 1
+
+        assert rate_limiter.try_acquire("user@example.com")
+        script.assert_called_once_with(keys=["test_rate_limit:user@example.com"], args=[1000, 940, 2, 120, ANY])
+        first_member = script.call_args.kwargs["args"][4]
+        assert first_member.startswith("1000:")
+
+        script.return_value = 0
+        assert not rate_limiter.try_acquire("user@example.com")
+        # attempts within the same second are distinct members
+        assert script.call_args.kwargs["args"][4] != first_member
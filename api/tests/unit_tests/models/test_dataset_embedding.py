@@ -0,0 +1,51 @@
+import pickle
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from models.dataset import Embedding
+
+
+def test_set_embedding_writes_compact_float32_format():
+    embedding = Embedding()
+    embedding.set_embedding([0.5, -0.25, 1.0])
+
+    assert Embedding.is_compact_format(embedding.embedding)
+    assert len(embedding.embedding) == Embedding.COMPACT_FORMAT_HEADER_SIZE + 3 * 4
+    assert embedding.get_embedding() == [0.5, -0.25, 1.0]
+
+
+def test_get_embedding_array_is_zero_copy_view():
+    embedding = Embedding()
+    embedding.set_embedding([0.5, -0.25, 1.0])
+
+    array = embedding.get_embedding_array()
+
+    assert array.dtype == np.dtype("<f4")
+    assert not array.flags.writeable
+    assert not array.flags.owndata
+
+
+def test_set_embedding_supports_float16():
+    with patch("models.dataset.dify_config") as mock_config:
+        mock_config.EMBEDDING_CACHE_STORAGE_DTYPE = "float16"
+        embedding = Embedding()
+        embedding.set_embedding([0.5, -0.25, 1.0])
+
+    assert len(embedding.embedding) == Embedding.COMPACT_FORMAT_HEADER_SIZE + 3 * 2
+    assert embedding.get_embedding() == [0.5, -0.25, 1.0]
+
+
+def test_get_embedding_reads_legacy_pickled_rows():
+    embedding = Embedding(embedding=pickle.dumps([0.1, 0.2, 0.3], protocol=pickle.HIGHEST_PROTOCOL))
+
+    assert not Embedding.is_compact_format(embedding.embedding)
+    assert embedding.get_embedding() == [0.1, 0.2, 0.3]
+
+
+def test_get_embedding_rejects_unknown_version():
+    embedding = Embedding(embedding=Embedding.COMPACT_FORMAT_MAGIC + bytes([99, 1]) + b"\x00" * 4)
+
+    with pytest.raises(ValueError):
+        embedding.get_embedding()
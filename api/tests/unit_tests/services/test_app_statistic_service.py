@@ -0,0 +1,271 @@
+import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+import pytz
+
+from services.app_statistic_service import AppStatisticService, DailyStatistic
+
+NOW = datetime.datetime(2025, 9, 10, 12, 0)
+SHANGHAI = pytz.timezone("Asia/Shanghai")
+
+
+@pytest.fixture
+def mock_config():
+    with (
+        patch("services.app_statistic_service.dify_config") as mock_config,
+        patch("services.app_statistic_service.naive_utc_now", return_value=NOW),
+        patch("services.app_statistic_service.redis_client"),
+    ):
+        mock_config.APP_STATISTICS_ROLLUP_ENABLED = True
+        mock_config.APP_STATISTICS_ROLLUP_SETTLE_HOURS = 24
+        yield mock_config
+
+
+def test_settled_date_follows_timezone(mock_config):
+    # 2025-09-09 12:00 UTC is 20:00 in Shanghai, so 09-08 is the last settled day there
+    assert AppStatisticService.get_settled_date(SHANGHAI) == datetime.date(2025, 9, 9)
+    assert AppStatisticService.get_settled_date(pytz.utc) == datetime.date(2025, 9, 9)
+    assert AppStatisticService.get_settled_date(pytz.timezone("America/Los_Angeles")) == datetime.date(2025, 9, 9)
+    assert AppStatisticService.get_settled_date(pytz.timezone("Pacific/Kiritimati")) == datetime.date(2025, 9, 10)
+
+
+def test_rollup_range_only_contains_whole_settled_days(mock_config):
+    since = datetime.datetime(2025, 1, 1)
+
+    assert AppStatisticService._get_rollup_range(
+        pytz.utc, since, datetime.datetime(2025, 9, 1, 0, 0), datetime.datetime(2025, 9, 5, 0, 0)
+    ) == (datetime.date(2025, 9, 1), datetime.date(2025, 9, 5))
+    # partial first and last days are excluded
+    assert AppStatisticService._get_rollup_range(
+        pytz.utc, since, datetime.datetime(2025, 9, 1, 8, 30), datetime.datetime(2025, 9, 5, 8, 30)
+    ) == (datetime.date(2025, 9, 2), datetime.date(2025, 9, 5))
+    # days that are not settled yet are excluded
+    assert AppStatisticService._get_rollup_range(pytz.utc, since, datetime.datetime(2025, 9, 1, 0, 0), None) == (
+        datetime.date(2025, 9, 1),
+        datetime.date(2025, 9, 9),
+    )
+    # without a start the history begins on the day the app was created
+    assert AppStatisticService._get_rollup_range(pytz.utc, datetime.datetime(2025, 9, 3, 15, 0), None, None) == (
+        datetime.date(2025, 9, 3),
+        datetime.date(2025, 9, 9),
+    )
+    assert (
+        AppStatisticService._get_rollup_range(
+            pytz.utc, since, datetime.datetime(2025, 9, 9, 0, 0), datetime.datetime(2025, 9, 10, 0, 0)
+        )
+        is None
+    )
+
+
+def test_rollup_disabled_aggregates_the_whole_range(mock_config):
+    mock_config.APP_STATISTICS_ROLLUP_ENABLED = False
+    with (
+        patch.object(AppStatisticService, "roll_up") as mock_roll_up,
+        patch.object(AppStatisticService, "aggregate", return_value={}) as mock_aggregate,
+    ):
+        AppStatisticService.get_daily_statistics(
+            "app-1", "UTC", datetime.datetime(2025, 1, 1), start=datetime.datetime(2025, 9, 1, 0, 0)
+        )
+
+    mock_roll_up.assert_not_called()
+    mock_aggregate.assert_called_once_with("app-1", "UTC", datetime.datetime(2025, 9, 1), None, None)
+
+
+def test_daily_statistics_combine_rollup_and_live_days(mock_config):
+    rolled_up = {
+        datetime.date(2025, 9, 2): DailyStatistic(date=datetime.date(2025, 9, 2), message_count=5),
+        datetime.date(2025, 9, 3): DailyStatistic(date=datetime.date(2025, 9, 3)),
+    }
+    live = [
+        {datetime.date(2025, 9, 1): DailyStatistic(date=datetime.date(2025, 9, 1), message_count=1)},
+        {datetime.date(2025, 9, 10): DailyStatistic(date=datetime.date(2025, 9, 10), message_count=2)},
+    ]
+    rolled_up.update(
+        {datetime.date(2025, 9, d): DailyStatistic(date=datetime.date(2025, 9, d)) for d in range(4, 9) if d != 6}
+    )
+    live = [
+        live[0],
+        {datetime.date(2025, 9, 6): DailyStatistic(date=datetime.date(2025, 9, 6), message_count=3)},
+        live[1],
+    ]
+    with (
+        patch.object(AppStatisticService, "get_rolled_up", return_value=rolled_up) as mock_get_rolled_up,
+        patch.object(AppStatisticService, "roll_up") as mock_roll_up,
+        patch.object(AppStatisticService, "aggregate", side_effect=live) as mock_aggregate,
+    ):
+        statistics = AppStatisticService.get_daily_statistics(
+            "app-1",
+            "Asia/Shanghai",
+            datetime.datetime(2025, 1, 1),
+            start=datetime.datetime(2025, 9, 1, 12, 0),
+            metrics=("message_count",),
+        )
+
+    mock_get_rolled_up.assert_called_once_with(
+        "app-1", "Asia/Shanghai", datetime.date(2025, 9, 2), datetime.date(2025, 9, 9)
+    )
+    # reads never write the rollup table
+    mock_roll_up.assert_not_called()
+    # live ranges are in UTC: from the start to the first rolled up day, the days not rolled up yet,
+    # and from the first unsettled day on
+    assert [call.args[2:] for call in mock_aggregate.call_args_list] == [
+        (datetime.datetime(2025, 9, 1, 4, 0), datetime.datetime(2025, 9, 1, 16, 0), ("message_count",)),
+        (datetime.datetime(2025, 9, 5, 16, 0), datetime.datetime(2025, 9, 6, 16, 0), ("message_count",)),
+        (datetime.datetime(2025, 9, 8, 16, 0), None, ("message_count",)),
+    ]
+    # days without messages are left out
+    assert [(s.date, s.message_count) for s in statistics] == [
+        (datetime.date(2025, 9, 1), 1),
+        (datetime.date(2025, 9, 2), 5),
+        (datetime.date(2025, 9, 6), 3),
+        (datetime.date(2025, 9, 10), 2),
+    ]
+
+
+def test_daily_statistics_aggregate_days_not_rolled_up_in_one_query(mock_config):
+    with (
+        patch.object(AppStatisticService, "get_rolled_up", return_value={}),
+        patch.object(AppStatisticService, "aggregate", return_value={}) as mock_aggregate,
+    ):
+        AppStatisticService.get_daily_statistics("app-1", "UTC", datetime.datetime(2025, 1, 1))
+
+    mock_aggregate.assert_called_once_with("app-1", "UTC", None, None, None)
+
+
+def test_roll_up_aggregates_and_stores_missing_days(mock_config):
+    aggregated = [
+        {datetime.date(2025, 9, 1): DailyStatistic(date=datetime.date(2025, 9, 1), message_count=4)},
+        {},
+    ]
+    with (
+        patch("services.app_statistic_service.db") as mock_db,
+        patch.object(AppStatisticService, "aggregate", side_effect=aggregated) as mock_aggregate,
+    ):
+        mock_db.session.scalars.return_value.all.return_value = [datetime.date(2025, 9, 3)]
+        rolled_up = AppStatisticService.roll_up("app-1", "UTC", datetime.date(2025, 9, 1), datetime.date(2025, 9, 5))
+
+    # one aggregation per run of consecutive missing days
+    assert [call.args[2:] for call in mock_aggregate.call_args_list] == [
+        (datetime.datetime(2025, 9, 1), datetime.datetime(2025, 9, 3)),
+        (datetime.datetime(2025, 9, 4), datetime.datetime(2025, 9, 5)),
+    ]
+    # days without messages are stored as well, so they are not aggregated again
+    assert rolled_up == 3
+    mock_db.session.execute.assert_called_once()
+    mock_db.session.commit.assert_called_once()
+
+
+def test_roll_up_backfills_the_most_recent_missing_days_first(mock_config):
+    with (
+        patch("services.app_statistic_service.db") as mock_db,
+        patch.object(AppStatisticService, "aggregate", return_value={}) as mock_aggregate,
+    ):
+        mock_db.session.scalars.return_value.all.return_value = [datetime.date(2025, 9, 8)]
+        rolled_up = AppStatisticService.roll_up(
+            "app-1", "UTC", datetime.date(2025, 1, 1), datetime.date(2025, 9, 9), max_days=3
+        )
+
+    assert [call.args[2:] for call in mock_aggregate.call_args_list] == [
+        (datetime.datetime(2025, 9, 5), datetime.datetime(2025, 9, 8)),
+    ]
+    assert rolled_up == 3
+
+
+def test_aggregate_only_runs_the_queries_of_the_metrics(mock_config):
+    with patch("services.app_statistic_service.db") as mock_db:
+        conn = mock_db.engine.begin.return_value.__enter__.return_value
+        conn.execute.return_value = []
+        AppStatisticService.aggregate("app-1", "UTC", None, None, ("conversation_count",))
+        AppStatisticService.aggregate("app-1", "UTC", None, None, ("like_count",))
+        AppStatisticService.aggregate("app-1", "UTC", None, None, ("session_count",))
+
+    queries = [str(call.args[0]) for call in conn.execute.call_args_list]
+    assert len(queries) == 3
+    assert "COUNT(*) AS message_count" in queries[0]
+    assert "conversation_count" in queries[0]
+    assert "message_feedbacks" not in queries[0]
+    assert "answer_tokens" not in queries[0]
+    assert "message_feedbacks" in queries[1]
+    assert "FROM\n    messages m" not in queries[2]
+    assert "session_count" in queries[2]
+
+
+def test_roll_up_does_not_write_when_all_days_are_stored(mock_config):
+    with (
+        patch("services.app_statistic_service.db") as mock_db,
+        patch.object(AppStatisticService, "aggregate") as mock_aggregate,
+    ):
+        mock_db.session.scalars.return_value.all.return_value = [datetime.date(2025, 9, 1)]
+        AppStatisticService.roll_up("app-1", "UTC", datetime.date(2025, 9, 1), datetime.date(2025, 9, 2))
+
+    mock_aggregate.assert_not_called()
+    mock_db.session.execute.assert_not_called()
+
+
+def test_get_rolled_up_reads_stored_days():
+    stored = SimpleNamespace(
+        date=datetime.date(2025, 9, 3),
+        message_count=3,
+        conversation_count=1,
+        end_user_count=1,
+        message_tokens=10,
+        answer_tokens=20,
+        total_price=Decimal("0.1"),
+        provider_response_latency=1.5,
+        like_count=0,
+        session_count=1,
+        session_message_count=3,
+    )
+    with patch("services.app_statistic_service.db") as mock_db:
+        mock_db.session.scalars.return_value.all.return_value = [stored]
+        statistics = AppStatisticService.get_rolled_up(
+            "app-1", "UTC", datetime.date(2025, 9, 1), datetime.date(2025, 9, 5)
+        )
+
+    assert list(statistics) == [datetime.date(2025, 9, 3)]
+    assert statistics[datetime.date(2025, 9, 3)].token_count == 30
+    mock_db.session.commit.assert_not_called()
+
+
+def test_rollup_targets_are_the_recently_viewed_apps(mock_config):
+    with patch("services.app_statistic_service.redis_client") as mock_redis:
+        AppStatisticService.track_rollup_target("app-1", "America/Los_Angeles")
+        mock_redis.zrangebyscore.return_value = [b"app-1:America/Los_Angeles"]
+        targets = AppStatisticService.get_rollup_targets(NOW - datetime.timedelta(days=30))
+
+    assert mock_redis.zadd.call_args.args[1] == {"app-1:America/Los_Angeles": 1757505600.0}
+    assert targets == [("app-1", "America/Los_Angeles")]
+    # targets that were not viewed within the window are forgotten
+    mock_redis.zremrangebyscore.assert_called_once()
+    assert mock_redis.zremrangebyscore.call_args.args[2] == "(1754913600.0"
+
+
+def test_derived_metrics():
+    statistic = DailyStatistic(
+        date=datetime.date(2025, 9, 1),
+        message_count=4,
+        answer_tokens=100,
+        provider_response_latency=2.0,
+        like_count=1,
+        session_count=3,
+        session_message_count=7,
+    )
+
+    assert statistic.interactions == 2.33
+    assert statistic.satisfaction_rate == 250.0
+    assert statistic.average_response_time == 500.0
+    assert statistic.tokens_per_second == 50.0
+    assert DailyStatistic(date=datetime.date(2025, 9, 1)).tokens_per_second == 0.0
+
+
+def test_runs_group_consecutive_days():
+    dates = [datetime.date(2025, 9, d) for d in (1, 2, 3, 5, 7, 8)]
+
+    assert AppStatisticService._runs(dates) == [
+        (datetime.date(2025, 9, 1), datetime.date(2025, 9, 4)),
+        (datetime.date(2025, 9, 5), datetime.date(2025, 9, 6)),
+        (datetime.date(2025, 9, 7), datetime.date(2025, 9, 9)),
+    ]
@@ -0,0 +1,106 @@
+import datetime
+from collections.abc import Sequence
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.bulk_purge_service import BulkPurger, ExpiredMessagePurger
+
+
+class _ListPurger(BulkPurger):
+    name = "test_purger"
+
+    def __init__(self, ids: list[str], fail_times: int = 0, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.ids = ids
+        self.deleted: list[list[str]] = []
+        self.fail_times = fail_times
+
+    def fetch_batch(self, cursor: int | None) -> tuple[list[str], Any | None]:
+        start = cursor or 0
+        batch = self.ids[start : start + self.batch_size]
+        if not batch:
+            return [], None
+        return batch, start + len(batch)
+
+    def delete_batch(self, ids: Sequence[str]) -> dict[str, int]:
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("deadlock detected")
+        self.deleted.append(list(ids))
+        return {"rows": len(ids)}
+
+
+@pytest.fixture
+def mock_redis():
+    with patch("services.bulk_purge_service.redis_client") as mock_redis, patch("services.bulk_purge_service.db"):
+        mock_redis.get.return_value = None
+        yield mock_redis
+
+
+def test_run_deletes_all_batches_and_clears_checkpoint(mock_redis):
+    purger = _ListPurger([str(i) for i in range(5)], batch_size=2)
+
+    stats = purger.run()
+
+    assert purger.deleted == [["0", "1"], ["2", "3"], ["4"]]
+    assert stats.completed
+    assert stats.deleted_rows == {"rows": 5}
+    assert mock_redis.setex.call_args_list[-1].args[2] == "5"
+    mock_redis.delete.assert_called_once_with("bulk_purge:test_purger:checkpoint")
+
+
+def test_run_resumes_from_checkpoint(mock_redis):
+    mock_redis.get.return_value = b"4"
+    purger = _ListPurger([str(i) for i in range(5)], batch_size=2)
+
+    purger.run()
+
+    assert purger.deleted == [["4"]]
+
+
+@patch("services.bulk_purge_service.time.sleep")
+def test_run_retries_failed_batches_then_aborts(mock_sleep, mock_redis):
+    purger = _ListPurger(["0", "1"], fail_times=1, batch_size=2, retry_interval=10)
+    stats = purger.run()
+    assert stats.completed
+    assert stats.failed_batches == 1
+    mock_sleep.assert_called_once_with(10)
+
+    purger = _ListPurger(["0", "1"], fail_times=3, batch_size=2, max_retries=3)
+    stats = purger.run()
+    assert not stats.completed
+    assert purger.deleted == []
+    mock_redis.delete.assert_called_once()
+
+
+def test_message_cursor_round_trip():
+    purger = ExpiredMessagePurger(cutoff=datetime.datetime(2025, 1, 1), batch_size=10)
+    cursor = (datetime.datetime(2024, 12, 1, 8, 30), "message-id")
+
+    assert purger.load_cursor(purger.dump_cursor(cursor)) == cursor
+
+
+@patch("services.bulk_purge_service.FeatureService")
+def test_message_purger_only_selects_sandbox_messages(mock_feature_service, mock_redis):
+    purger = ExpiredMessagePurger(cutoff=datetime.datetime(2025, 1, 1), batch_size=10)
+    created_at = datetime.datetime(2024, 12, 1)
+    rows = [
+        MagicMock(id="m1", app_id="sandbox-app", created_at=created_at),
+        MagicMock(id="m2", app_id="paid-app", created_at=created_at),
+        MagicMock(id="m3", app_id="deleted-app", created_at=created_at),
+    ]
+    mock_redis.get.side_effect = lambda key: {"features:t1": b"sandbox", "features:t2": b"professional"}.get(key)
+
+    with patch("services.bulk_purge_service.db") as mock_db:
+        mock_db.session.execute.return_value.all.return_value = rows
+        mock_db.session.execute.return_value.tuples.return_value.all.return_value = [
+            ("sandbox-app", "t1"),
+            ("paid-app", "t2"),
+        ]
+        ids, cursor = purger.fetch_batch(None)
+
+    assert ids == ["m1"]
+    assert cursor == (created_at, "m3")
+    mock_feature_service.get_features.assert_not_called()